@@ -53,7 +53,45 @@ def create_app(config_name='development'):
     
     from app.middleware.error_handler import register_error_handlers
     register_error_handlers(app)
-    
+
+    # Bảng hotel_stats được cập nhật theo sự kiện flush của session
+    from app.services.hotel_stats_service import HotelStatsService
+    HotelStatsService.init_app(app)
+
+    # Sổ room_nights được nhả/giữ lại khi booking đổi trạng thái hoặc đổi ngày
+    from app.services.room_night_service import RoomNightService
+    RoomNightService.init_app(app)
+
+    # Giữ chỗ chờ thanh toán PayPal; luồng nền hủy hold hết hạn để nhả phòng và xóa khóa idempotency hết hạn
+    from app.services.booking_hold_service import booking_hold_sweeper
+    booking_hold_sweeper.init_app(app)
+
+    # Chỉ mục gợi ý tìm kiếm được dựng lại khi khách sạn thay đổi
+    from app.services.suggestion_index import suggestion_index
+    suggestion_index.init_app(app)
+
+    # Cache kết quả tìm kiếm, bị xóa theo điểm đến khi khách sạn/phòng/khuyến mãi/đánh giá thay đổi
+    from app.services.search_cache import count_cache, search_cache
+    search_cache.init_app(app)
+    # Cache số đếm kết quả riêng (giới hạn và thống kê không lẫn với cache kết quả)
+    count_cache.init_app(app, config_prefix='SEARCH_COUNT_CACHE')
+
+    # Chỉ mục khoảng thời gian khuyến mãi trong bộ nhớ, dựng lại khi khuyến mãi thay đổi
+    from app.services.promotion_index import promotion_index
+    promotion_index.init_app(app)
+
+    # Lịch sử tìm kiếm được ghi theo lô bởi luồng nền thay vì commit trong request
+    from app.services.search_history_writer import search_history_writer
+    search_history_writer.init_app(app)
+
+    # Dữ liệu trang chủ dựng sẵn ở luồng nền, dựng lại khi khách sạn/khuyến mãi thay đổi
+    from app.services.home_snapshot import home_snapshot
+    home_snapshot.init_app(app)
+
+    # Thẻ {% cache %} cho template: cache đoạn HTML theo phiên bản dữ liệu
+    from app.services.fragment_cache import fragment_cache
+    fragment_cache.init_app(app)
+
     # Context processor để tự động có biến user_logged_in trong tất cả templates
     @app.context_processor
     def inject_user_logged_in():
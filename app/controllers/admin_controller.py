@@ -12,6 +12,7 @@ from app.models.hotel import Hotel
 from app.models.booking import Booking
 from app.models.payment import Payment
 from app.models.review import Review
+from app.services.destination_index import destination_index
 from app.utils.response import success_response, error_response, validation_error_response
 
 
@@ -263,6 +264,7 @@ class AdminPanelController:
                 hotel.is_featured = featured
 
             db.session.commit()
+            destination_index.sync_hotel(hotel)
             return hotel, None
         except Exception as exc:
             db.session.rollback()
@@ -12,6 +12,11 @@ from app.schemas.booking_schema import (
     BookingCreateSchema, BookingUpdateSchema, CheckPriceSchema, 
     BookingValidateSchema, BookingCancelSchema
 )
+from app.services.booking_hold_service import BookingHoldService
+from app.services.idempotency_service import IdempotencyError, IdempotencyService
+from app.services.pricing_service import PricingError, PricingService
+from app.services.room_night_service import RoomNightConflict, RoomNightService
+from app.utils.pagination import CursorError, paginate
 from app.utils.response import success_response, error_response, paginated_response, validation_error_response
 from app.utils.validators import validate_required_fields
 from marshmallow import ValidationError
@@ -91,6 +96,7 @@ class BookingController:
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 10, type=int)
             status = request.args.get('status')
+            cursor = request.args.get('cursor')
             
             user = User.query.get(session['user_id'])
             
@@ -102,10 +108,11 @@ class BookingController:
             if status:
                 query = query.filter_by(status=status)
             
-            query = query.order_by(Booking.created_at.desc())
-            
             total = query.count()
-            bookings = query.offset((page - 1) * per_page).limit(per_page).all()
+            bookings, next_cursor = paginate(
+                query, [(Booking.created_at, True), (Booking.booking_id, True)],
+                page, per_page, cursor=cursor
+            )
             
             bookings_data = []
             for booking in bookings:
@@ -115,8 +122,10 @@ class BookingController:
                 booking_dict['details'] = [detail.to_dict() for detail in booking.booking_details]
                 bookings_data.append(booking_dict)
             
-            return paginated_response(bookings_data, page, per_page, total)
+            return paginated_response(bookings_data, page, per_page, total, next_cursor=next_cursor)
             
+        except CursorError as e:
+            return error_response(str(e), 400)
         except Exception as e:
             return error_response(f'Lỗi khi lấy danh sách booking: {str(e)}', 500)
     
@@ -158,13 +167,22 @@ class BookingController:
             return error_response(f'Lỗi khi lấy chi tiết booking: {str(e)}', 500)
     
     @staticmethod
-    def create_booking():
+    def create_booking(hold=False):
+        """hold=True: booking chờ thanh toán online, giữ phòng đến BOOKING_HOLD_TTL thay vì xác nhận ngay"""
         if 'user_id' not in session:
             return error_response('Chưa đăng nhập', 401)
         
         try:
             data = BookingController._get_request_data()
             
+            # Request lặp lại (double-click, thử lại sau PayPal) nhận lại phản hồi đã lưu của khóa idempotency
+            idempotency_key = IdempotencyService.key_from_request(data)
+            if idempotency_key:
+                request_hash = IdempotencyService.fingerprint(data)
+                replayed = IdempotencyService.lookup(session['user_id'], idempotency_key, request_hash)
+                if replayed is not None:
+                    return replayed
+            
             required_fields = ['hotel_id', 'check_in_date', 'check_out_date', 'num_guests', 'rooms']
             is_valid, error_msg = validate_required_fields(data, required_fields)
             if not is_valid:
@@ -182,81 +200,31 @@ class BookingController:
             if check_in < date.today():
                 return error_response('Ngày check-in không được trong quá khứ', 400)
             
-            num_nights = (check_out - check_in).days
-            total_amount = 0
-            booking_details = []
-            check_in_datetime = datetime.combine(check_in, datetime.min.time())
-            check_out_datetime = datetime.combine(check_out, datetime.min.time())
-            
-            # Calculate base prices first
-            for room_data in validated_data['rooms']:
-                room = Room.query.get(room_data['room_id'])
-                if not room:
-                    return error_response(f'Không tìm thấy phòng ID {room_data["room_id"]}', 404)
-                
-                if room.hotel_id != validated_data['hotel_id']:
-                    return error_response('Phòng không thuộc khách sạn này', 400)
-                
-                quantity = room_data['quantity']
-                price_per_night = room.base_price
-                subtotal = float(price_per_night) * quantity * num_nights
-                total_amount += subtotal
-                
-                booking_details.append({
-                    'room_id': room.room_id,
-                    'quantity': quantity,
-                    'price_per_night': price_per_night,
-                    'num_nights': num_nights,
-                    'subtotal': subtotal
-                })
-            
-            # Apply promotions (check for each room)
-            promotion_discount_total = 0
-            from app.models.promotion import Promotion
-            from sqlalchemy import or_, and_
-            
-            for room_data in validated_data['rooms']:
-                room = Room.query.get(room_data['room_id'])
-                quantity = room_data['quantity']
-                room_subtotal = float(room.base_price) * quantity * num_nights
-                
-                # Find active promotions for this room
-                promotion_query = Promotion.query.filter(
-                    Promotion.is_active == True,
-                    Promotion.start_date <= check_out_datetime,
-                    Promotion.end_date >= check_in_datetime,
-                    or_(
-                        Promotion.room_id == room.room_id,
-                        and_(Promotion.hotel_id == validated_data['hotel_id'], Promotion.room_id.is_(None))
-                    )
+            # Giữ khóa idempotency đầu transaction: request trùng song song chờ ở chỉ mục duy nhất
+            idempotency_record = None
+            if idempotency_key:
+                idempotency_record, replayed = IdempotencyService.claim(
+                    session['user_id'], idempotency_key, request_hash
                 )
-                
-                best_discount = 0
-                for promo in promotion_query.all():
-                    # Check min_nights
-                    if promo.min_nights and num_nights < promo.min_nights:
-                        continue
-                    
-                    # Check applicable_days if specified
-                    if promo.applicable_days:
-                        check_in_weekday = check_in.weekday()
-                        applicable_days_list = [int(d.strip()) for d in promo.applicable_days.split(',') if d.strip().isdigit()]
-                        if applicable_days_list and check_in_weekday not in applicable_days_list:
-                            continue
-                    
-                    # Calculate discount for this room
-                    if promo.discount_type == 'percentage':
-                        discount = room_subtotal * (float(promo.discount_value) / 100)
-                    else:  # fixed
-                        discount = float(promo.discount_value) * quantity  # Apply per room
-                    
-                    if discount > best_discount:
-                        best_discount = discount
-                
-                promotion_discount_total += best_discount
+                if replayed is not None:
+                    return replayed
+            
+            # Báo giá: nạp phòng một lần, giá cuối tuần, khuyến mãi tốt nhất cho từng phòng
+            # (khuyến mãi được chọn đối chiếu lại với CSDL vì chỉ mục trong bộ nhớ có thể cũ)
+            quote = PricingService.quote(validated_data['hotel_id'], validated_data['rooms'], check_in, check_out,
+                                         verify_promotions=True)
+            total_amount = quote['total_amount']
+            promotion_discount_total = quote['promotion_discount']
+            booking_details = [{
+                'room_id': item['room_id'],
+                'quantity': item['quantity'],
+                'price_per_night': item['price_per_night'],
+                'num_nights': item['num_nights'],
+                'subtotal': item['subtotal']
+            } for item in quote['items']]
             
             # Apply promotion discount
-            total_amount_after_promotion = total_amount - promotion_discount_total
+            total_amount_after_promotion = quote['amount_after_promotion']
             
             # Xử lý discount code nếu có (áp dụng sau promotion)
             discount_amount = 0
@@ -307,12 +275,21 @@ class BookingController:
                 discount_amount=total_discount,
                 final_amount=final_amount,
                 special_requests=validated_data.get('special_requests'),
-                status='confirmed'  # INSTANT CONFIRM - Changed from 'pending'
+                status='pending' if hold else 'confirmed'  # Thanh toán online: chờ thanh toán (giữ chỗ); còn lại xác nhận ngay
             )
             
             db.session.add(booking)
             db.session.flush()
             
+            # Giữ các đêm của mọi phòng bằng một lệnh chèn; khóa (room_id, stay_date) chặn đặt trùng
+            RoomNightService.claim(
+                booking.booking_id,
+                [detail_data['room_id'] for detail_data in booking_details],
+                check_in, check_out
+            )
+            if hold:
+                BookingHoldService.place(booking)
+            
             for detail_data in booking_details:
                 detail = BookingDetail(
                     booking_id=booking.booking_id,
@@ -333,16 +310,29 @@ class BookingController:
                 # Tăng used_count
                 discount_code_obj.used_count += 1
             
-            db.session.commit()
-            
-            return success_response(
+            result = success_response(
                 data={'booking': booking.to_dict()},
                 message='Tạo booking thành công',
                 status_code=201
             )
+            if idempotency_record is not None:
+                IdempotencyService.store(idempotency_record, result, booking_id=booking.booking_id)
+            
+            db.session.commit()
+            
+            return result
             
         except ValidationError as e:
             return validation_error_response(e.messages)
+        except IdempotencyError as e:
+            db.session.rollback()
+            return error_response(str(e), e.status_code)
+        except PricingError as e:
+            db.session.rollback()
+            return error_response(str(e), e.status_code)
+        except RoomNightConflict as e:
+            db.session.rollback()
+            return error_response(str(e), 409)
         except Exception as e:
             db.session.rollback()
             return error_response(f'Tạo booking thất bại: {str(e)}', 500)
@@ -360,34 +350,26 @@ class BookingController:
             
             check_in = validated_data.get('check_in_date', booking.check_in_date)
             check_out = validated_data.get('check_out_date', booking.check_out_date)
-            num_nights = (check_out - check_in).days
+            if check_in >= check_out:
+                return error_response('Ngày check-out phải sau ngày check-in', 400)
             
-            total_amount = 0
-            breakdown = []
-            
-            for detail in booking.booking_details:
-                room = Room.query.get(detail.room_id)
-                price = room.base_price
-                subtotal = price * detail.quantity * num_nights
-                total_amount += subtotal
-                
-                breakdown.append({
-                    'room_id': room.room_id,
-                    'room_name': room.room_name,
-                    'quantity': detail.quantity,
-                    'price_per_night': float(price),
-                    'num_nights': num_nights,
-                    'subtotal': float(subtotal)
-                })
+            quote = PricingService.quote(booking.hotel_id, [
+                {'room_id': detail.room_id, 'quantity': detail.quantity} for detail in booking.booking_details
+            ], check_in, check_out)
+            data = PricingService.serialize(quote)
             
             return success_response(data={
-                'total_amount': float(total_amount),
-                'breakdown': breakdown,
-                'num_nights': num_nights
+                'total_amount': data['total_amount'],
+                'promotion_discount': data['promotion_discount'],
+                'amount_after_promotion': data['amount_after_promotion'],
+                'breakdown': data['items'],
+                'num_nights': data['num_nights']
             })
             
         except ValidationError as e:
             return validation_error_response(e.messages)
+        except PricingError as e:
+            return error_response(str(e), e.status_code)
         except Exception as e:
             return error_response(f'Lỗi kiểm tra giá: {str(e)}', 500)
     
@@ -424,6 +406,9 @@ class BookingController:
             
         except ValidationError as e:
             return validation_error_response(e.messages)
+        except RoomNightConflict as e:
+            db.session.rollback()
+            return error_response(str(e), 409)
         except Exception as e:
             db.session.rollback()
             return error_response(f'Cập nhật booking thất bại: {str(e)}', 500)
@@ -632,18 +617,18 @@ class BookingController:
             if not hotel:
                 return error_response('Không tìm thấy khách sạn', 404)
             
-            for room_data in validated_data['rooms']:
-                room = Room.query.get(room_data['room_id'])
-                if not room:
-                    return error_response(f'Không tìm thấy phòng ID {room_data["room_id"]}', 404)
-                
-                if room.hotel_id != validated_data['hotel_id']:
-                    return error_response('Phòng không thuộc khách sạn này', 400)
+            # Báo giá cũng kiểm tra phòng tồn tại và thuộc khách sạn
+            quote = PricingService.quote(validated_data['hotel_id'], validated_data['rooms'], check_in, check_out)
             
-            return success_response(message='Dữ liệu booking hợp lệ')
+            return success_response(
+                data={'quote': PricingService.serialize(quote)},
+                message='Dữ liệu booking hợp lệ'
+            )
             
         except ValidationError as e:
             return validation_error_response(e.messages)
+        except PricingError as e:
+            return error_response(str(e), e.status_code)
         except Exception as e:
             return error_response(f'Lỗi validate: {str(e)}', 500)
     
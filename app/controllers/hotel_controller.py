@@ -13,9 +13,14 @@ from app.schemas.hotel_schema import (
     HotelCreateSchema, HotelUpdateSchema, HotelSearchSchema,
     AmenityUpdateSchema, PolicyCreateSchema
 )
+from app.services.destination_index import destination_index
+from app.services.freshness_service import FreshnessService
+from app.services.search_service import SearchService
+from app.utils.pagination import CursorError, paginate
 from app.utils.response import success_response, error_response, paginated_response, validation_error_response
 from app.utils.validators import validate_required_fields
 from marshmallow import ValidationError
+from sqlalchemy.orm import selectinload
 from werkzeug.utils import secure_filename
 from datetime import datetime, time, date
 import os
@@ -51,6 +56,8 @@ class HotelController:
             max_rating = request.args.get('max_rating', type=int)
             is_featured = request.args.get('is_featured', type=lambda v: v.lower() == 'true')
             search = request.args.get('search')
+            sort = request.args.get('sort')
+            cursor = request.args.get('cursor')
             
             query = Hotel.query.filter_by(status='active')
             
@@ -71,8 +78,14 @@ class HotelController:
                     )
                 )
             
-            total = query.count()
-            hotels = query.offset((page - 1) * per_page).limit(per_page).all()
+            # Tổng số khách sạn có sẵn trong dấu vết dùng làm ETag
+            validator, total = FreshnessService.hotel_list(query, extra=[request.full_path])
+            not_modified = validator.not_modified()
+            if not_modified:
+                return not_modified
+            
+            query, sort_key, order_by = SearchService.hotel_sort(query, sort)
+            hotels, next_cursor = paginate(query, order_by, page, per_page, cursor=cursor, sort_key=sort_key)
             hotels_data = []
             
             for hotel in hotels:
@@ -80,8 +93,10 @@ class HotelController:
                 hotel_dict['images'] = [img.to_dict() for img in hotel.images]
                 hotels_data.append(hotel_dict)
             
-            return paginated_response(hotels_data, page, per_page, total)
+            return validator.apply(paginated_response(hotels_data, page, per_page, total, next_cursor=next_cursor))
             
+        except CursorError as e:
+            return error_response(str(e), 400)
         except Exception as e:
             return error_response(f'Lỗi khi lấy danh sách khách sạn: {str(e)}', 500)
     
@@ -106,7 +121,19 @@ class HotelController:
     @staticmethod
     def get_hotel(hotel_id):
         try:
-            hotel = Hotel.query.get(hotel_id)
+            validator = FreshnessService.hotel(hotel_id, user_id=session.get('user_id'))
+            if validator is None:
+                return error_response('Không tìm thấy khách sạn', 404)
+            not_modified = validator.not_modified()
+            if not_modified:
+                return not_modified
+            
+            # Ảnh, tiện nghi, chính sách nạp cùng lúc (selectinload), không lazy load từng quan hệ
+            hotel = Hotel.query.options(
+                selectinload(Hotel.images),
+                selectinload(Hotel.amenities),
+                selectinload(Hotel.cancellation_policies)
+            ).filter_by(hotel_id=hotel_id).first()
             
             if not hotel:
                 return error_response('Không tìm thấy khách sạn', 404)
@@ -116,15 +143,18 @@ class HotelController:
             hotel_dict['amenities'] = [amenity.to_dict() for amenity in hotel.amenities]
             hotel_dict['cancellation_policies'] = [policy.to_dict() for policy in hotel.cancellation_policies]
             
-            # Tính avg_rating và review_count
+            # avg_rating, review_count và trung bình từng tiêu chí trong một dòng tổng hợp
+            # (AVG bỏ qua NULL nên không cần lọc riêng từng tiêu chí)
             from sqlalchemy import func
-            avg_rating = db.session.query(func.avg(Review.rating))\
-                .filter(Review.hotel_id == hotel_id, Review.status == 'active')\
-                .scalar()
-            review_count = Review.query.filter_by(
-                hotel_id=hotel_id, 
-                status='active'
-            ).count()
+            (avg_rating, review_count, avg_cleanliness, avg_service,
+             avg_facilities, avg_location) = db.session.query(
+                func.avg(Review.rating),
+                func.count(Review.review_id),
+                func.avg(Review.cleanliness_rating),
+                func.avg(Review.service_rating),
+                func.avg(Review.facilities_rating),
+                func.avg(Review.location_rating)
+            ).filter(Review.hotel_id == hotel_id, Review.status == 'active').one()
             # Chuyển đổi avg_rating sang float trước khi làm tròn
             if avg_rating is not None:
                 avg_rating_float = float(avg_rating)
@@ -135,29 +165,19 @@ class HotelController:
                 hotel_dict['average_rating'] = 0
             hotel_dict['review_count'] = review_count
             
-            # Tính đánh giá trung bình theo từng tiêu chí
-            avg_cleanliness = db.session.query(func.avg(Review.cleanliness_rating))\
-                .filter(Review.hotel_id == hotel_id, Review.status == 'active', Review.cleanliness_rating.isnot(None))\
-                .scalar()
-            avg_service = db.session.query(func.avg(Review.service_rating))\
-                .filter(Review.hotel_id == hotel_id, Review.status == 'active', Review.service_rating.isnot(None))\
-                .scalar()
-            avg_facilities = db.session.query(func.avg(Review.facilities_rating))\
-                .filter(Review.hotel_id == hotel_id, Review.status == 'active', Review.facilities_rating.isnot(None))\
-                .scalar()
-            avg_location = db.session.query(func.avg(Review.location_rating))\
-                .filter(Review.hotel_id == hotel_id, Review.status == 'active', Review.location_rating.isnot(None))\
-                .scalar()
-            
             hotel_dict['avg_cleanliness_rating'] = round(float(avg_cleanliness), 1) if avg_cleanliness is not None else None
             hotel_dict['avg_service_rating'] = round(float(avg_service), 1) if avg_service is not None else None
             hotel_dict['avg_facilities_rating'] = round(float(avg_facilities), 1) if avg_facilities is not None else None
             hotel_dict['avg_location_rating'] = round(float(avg_location), 1) if avg_location is not None else None
             
-            # Lấy rooms với xử lý lỗi
+            # Lấy rooms với xử lý lỗi; ảnh, tiện nghi, loại phòng của mọi phòng nạp theo lô
             rooms_data = []
             try:
-                rooms_query = Room.query.filter_by(hotel_id=hotel_id, status='available').order_by(Room.base_price.asc()).all()
+                rooms_query = Room.query.options(
+                    selectinload(Room.images),
+                    selectinload(Room.amenities),
+                    selectinload(Room.room_type)
+                ).filter_by(hotel_id=hotel_id, status='available').order_by(Room.base_price.asc()).all()
                 for room in rooms_query:
                     try:
                         room_dict = room.to_dict()
@@ -250,18 +270,16 @@ class HotelController:
             if user_id:
                 today = date.today()
                 
+                # Booking chưa có đánh giá: anti-join với reviews thay vì kiểm tra từng booking
                 bookings_query = Booking.query.filter(
                     Booking.user_id == user_id,
                     Booking.hotel_id == hotel_id,
                     Booking.status == 'checked_out',
-                    Booking.check_out_date <= today
+                    Booking.check_out_date <= today,
+                    ~Booking.reviews.any()
                 ).order_by(Booking.check_out_date.desc()).limit(10).all()
 
                 for booking in bookings_query:
-                    has_review = Review.query.filter_by(booking_id=booking.booking_id).first()
-                    if has_review:
-                        continue
-
                     booking_dict = booking.to_dict()
                     eligible_bookings.append({
                         'booking_id': booking.booking_id,
@@ -271,12 +289,14 @@ class HotelController:
                         'created_at': booking_dict.get('created_at')
                     })
             
-            return success_response(data={
+            return validator.apply(success_response(data={
                 'hotel': hotel_dict,
                 'rooms': rooms_data,
+                # Khóa cache đoạn HTML danh sách phòng (đổi khi phòng/ảnh/tiện nghi phòng thay đổi)
+                'rooms_version': FreshnessService.version(validator, FreshnessService.ROOM_PARTS),
                 'reviews': reviews_data,
                 'eligible_bookings': eligible_bookings
-            })
+            }))
             
         except Exception as e:
             return error_response(f'Lỗi khi lấy chi tiết khách sạn: {str(e)}', 500)
@@ -356,6 +376,7 @@ class HotelController:
                         uploaded_images.append(image)
             
             db.session.commit()
+            destination_index.sync_hotel(hotel)
             
             hotel_dict = hotel.to_dict()
             hotel_dict['images'] = [img.to_dict() for img in uploaded_images]
@@ -432,6 +453,7 @@ class HotelController:
                         uploaded_images.append(image)
             
             db.session.commit()
+            destination_index.sync_hotel(hotel)
             
             return success_response(
                 data={'hotel': hotel.to_dict()},
@@ -460,6 +482,7 @@ class HotelController:
             
             db.session.delete(hotel)
             db.session.commit()
+            destination_index.remove(hotel_id)
             
             return success_response(message='Xóa khách sạn thành công')
             
@@ -595,15 +618,19 @@ class HotelController:
         try:
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 10, type=int)
+            cursor = request.args.get('cursor')
             
             hotel = Hotel.query.get(hotel_id)
             if not hotel:
                 return error_response('Không tìm thấy khách sạn', 404)
             
-            reviews_query = Review.query.filter_by(hotel_id=hotel_id, status='active').order_by(Review.created_at.desc())
+            reviews_query = Review.query.filter_by(hotel_id=hotel_id, status='active')
             total = reviews_query.count()
             
-            reviews = reviews_query.offset((page - 1) * per_page).limit(per_page).all()
+            reviews, next_cursor = paginate(
+                reviews_query, [(Review.created_at, True), (Review.review_id, True)],
+                page, per_page, cursor=cursor
+            )
             reviews_data = []
             
             for review in reviews:
@@ -611,17 +638,22 @@ class HotelController:
                 review_dict['user'] = review.user.to_dict() if review.user else None
                 reviews_data.append(review_dict)
             
-            return paginated_response(reviews_data, page, per_page, total)
+            return paginated_response(reviews_data, page, per_page, total, next_cursor=next_cursor)
             
+        except CursorError as e:
+            return error_response(str(e), 400)
         except Exception as e:
             return error_response(f'Lỗi khi lấy đánh giá: {str(e)}', 500)
     
     @staticmethod
     def get_hotel_rooms(hotel_id):
         try:
-            hotel = Hotel.query.get(hotel_id)
-            if not hotel:
+            validator = FreshnessService.hotel_rooms(hotel_id)
+            if validator is None:
                 return error_response('Không tìm thấy khách sạn', 404)
+            not_modified = validator.not_modified()
+            if not_modified:
+                return not_modified
             
             rooms = Room.query.filter_by(hotel_id=hotel_id, status='available').all()
             rooms_data = []
@@ -633,7 +665,7 @@ class HotelController:
                 room_dict['room_type'] = room.room_type.to_dict() if room.room_type else None
                 rooms_data.append(room_dict)
             
-            return success_response(data={'rooms': rooms_data})
+            return validator.apply(success_response(data={'rooms': rooms_data}))
             
         except Exception as e:
             return error_response(f'Lỗi khi lấy danh sách phòng: {str(e)}', 500)
@@ -1,101 +1,21 @@
 from flask import request, session
-from app import db
-from app.models.hotel import Hotel
-from app.models.room import Room
-from app.models.review import Review
-from app.models.promotion import Promotion
 from app.models.amenity import Amenity
-from app.models.cancellation_policy import CancellationPolicy
-from sqlalchemy import func
-from datetime import datetime
+from app.services.home_snapshot import HomeSnapshot, home_snapshot
+from app.services.promotion_index import promotion_index
+from app.services.search_service import SearchService
 
 class MainController:
     
     @staticmethod
     def get_home_data():
         try:
-            featured_hotels = Hotel.query.filter_by(status='active', is_featured=True).limit(6).all()
-            
-            hotels_data = []
-            for hotel in featured_hotels:
-                min_price = db.session.query(func.min(Room.base_price))\
-                    .filter(Room.hotel_id == hotel.hotel_id)\
-                    .filter(Room.status == 'available')\
-                    .scalar() or 1000000
-                
-                review_count = Review.query.filter_by(hotel_id=hotel.hotel_id, status='active').count()
-                
-                avg_rating = db.session.query(func.avg(Review.rating))\
-                    .filter_by(hotel_id=hotel.hotel_id, status='active')\
-                    .scalar()
-                
-                # Chuyển đổi avg_rating sang float an toàn
-                try:
-                    avg_rating_float = float(avg_rating) if avg_rating is not None else 0.0
-                except (TypeError, ValueError):
-                    avg_rating_float = 0.0
-                
-                # Kiểm tra có chính sách hủy miễn phí không (refund_percentage = 100%)
-                has_free_cancellation = CancellationPolicy.query.filter_by(
-                    hotel_id=hotel.hotel_id
-                ).filter(
-                    CancellationPolicy.refund_percentage == 100.00
-                ).first() is not None
-                
-                # Kiểm tra có promotion đang active không
-                has_active_promotion = Promotion.query.filter(
-                    Promotion.hotel_id == hotel.hotel_id,
-                    Promotion.start_date <= datetime.utcnow(),
-                    Promotion.end_date >= datetime.utcnow(),
-                    Promotion.is_active == True
-                ).first() is not None
-                
-                hotels_data.append({
-                    'hotel': hotel,
-                    'min_price': int(min_price),
-                    'review_count': review_count,
-                    'avg_rating': round(avg_rating_float, 1) if avg_rating_float > 0 else 0.0,
-                    'has_free_cancellation': has_free_cancellation,
-                    'has_active_promotion': has_active_promotion
-                })
-            
-            cities = db.session.query(
-                Hotel.city,
-                func.count(Hotel.hotel_id).label('hotel_count')
-            ).filter_by(status='active')\
-            .group_by(Hotel.city)\
-            .order_by(func.count(Hotel.hotel_id).desc())\
-            .limit(6).all()
-            
-            popular_cities = []
-            for city_name, count in cities:
-                sample_hotel = Hotel.query.filter_by(city=city_name, status='active').first()
-                popular_cities.append({
-                    'name': city_name,
-                    'count': count,
-                    'image': sample_hotel.images[0].image_url if sample_hotel and sample_hotel.images else None
-                })
-            
-            # Get total count of active promotions
-            total_promotions_count = Promotion.query.filter(
-                Promotion.start_date <= datetime.utcnow(),
-                Promotion.end_date >= datetime.utcnow(),
-                Promotion.is_active == True
-            ).count()
-            
-            # Get limited promotions for display (2 items)
-            active_promotions = Promotion.query.filter(
-                Promotion.start_date <= datetime.utcnow(),
-                Promotion.end_date >= datetime.utcnow(),
-                Promotion.is_active == True
-            ).limit(2).all()
-            
-            return {
-                'featured_hotels': hotels_data,
-                'popular_cities': popular_cities,
-                'active_promotions': active_promotions,
-                'total_promotions_count': total_promotions_count
-            }
+            # Đọc ảnh chụp dựng sẵn ở luồng nền; lần đầu (chưa có ảnh chụp) mới truy vấn trực tiếp
+            data = home_snapshot.get()
+            if data is None:
+                data = HomeSnapshot.build()
+                if home_snapshot.enabled:
+                    home_snapshot.swap(data)
+            return data
             
         except Exception as e:
             print(f'Lỗi lấy dữ liệu trang chủ: {str(e)}')
@@ -111,26 +31,18 @@ class MainController:
             if not query_text:
                 return {'suggestions': []}
             
-            cities = db.session.query(Hotel.city).filter(
-                Hotel.city.ilike(f'%{query_text}%'),
-                Hotel.status == 'active'
-            ).distinct().limit(5).all()
-            
-            hotels = Hotel.query.filter(
-                Hotel.hotel_name.ilike(f'%{query_text}%'),
-                Hotel.status == 'active'
-            ).limit(5).all()
+            cities, hotels = SearchService.get_suggestions(query_text, limit=5)
             
             suggestions = []
             for city in cities:
-                suggestions.append({'type': 'city', 'value': city[0]})
+                suggestions.append({'type': 'city', 'value': city})
             
-            for hotel in hotels:
+            for hotel_id, hotel_name, city in hotels:
                 suggestions.append({
                     'type': 'hotel', 
-                    'value': hotel.hotel_name, 
-                    'id': hotel.hotel_id,
-                    'city': hotel.city
+                    'value': hotel_name, 
+                    'id': hotel_id,
+                    'city': city
                 })
             
             return {'suggestions': suggestions}
@@ -150,11 +62,7 @@ class MainController:
     @staticmethod
     def get_promotions_data():
         try:
-            active_promotions = Promotion.query.filter(
-                Promotion.start_date <= datetime.utcnow(),
-                Promotion.end_date >= datetime.utcnow(),
-                Promotion.is_active == True
-            ).order_by(Promotion.start_date.desc()).all()
+            active_promotions = promotion_index.active()
             
             return {
                 'promotions': active_promotions
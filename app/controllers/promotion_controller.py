@@ -5,6 +5,8 @@ from app.models.hotel import Hotel
 from app.models.room import Room
 from app.models.user import User
 from app.schemas.promotion_schema import PromotionCreateSchema, PromotionUpdateSchema
+from app.services.freshness_service import FreshnessService
+from app.services.promotion_index import promotion_index
 from app.utils.response import success_response, error_response, paginated_response, validation_error_response
 from app.utils.validators import validate_required_fields
 from marshmallow import ValidationError
@@ -240,23 +242,31 @@ class PromotionController:
     def get_active_promotions():
         try:
             now = datetime.utcnow()
+            validator = FreshnessService.active_promotions(now)
+            not_modified = validator.not_modified()
+            if not_modified:
+                return not_modified
             
-            promotions = Promotion.query.filter(
-                Promotion.is_active == True,
-                Promotion.start_date <= now,
-                Promotion.end_date >= now
-            ).all()
+            promotions = promotion_index.active(now)
+            
+            # Khách sạn/phòng kèm theo được nạp một lần cho tất cả khuyến mãi
+            hotel_ids = {promo['hotel_id'] for promo in promotions if promo['hotel_id'] is not None}
+            room_ids = {promo['room_id'] for promo in promotions if promo['room_id'] is not None}
+            hotels = {hotel.hotel_id: hotel.to_dict()
+                      for hotel in Hotel.query.filter(Hotel.hotel_id.in_(hotel_ids)).all()} if hotel_ids else {}
+            rooms = {room.room_id: room.to_dict()
+                     for room in Room.query.filter(Room.room_id.in_(room_ids)).all()} if room_ids else {}
             
             promotions_data = []
             for promo in promotions:
-                promo_dict = promo.to_dict()
-                if promo.hotel:
-                    promo_dict['hotel'] = promo.hotel.to_dict()
-                if promo.room:
-                    promo_dict['room'] = promo.room.to_dict()
+                promo_dict = dict(promo['payload'])
+                if promo['hotel_id'] in hotels:
+                    promo_dict['hotel'] = hotels[promo['hotel_id']]
+                if promo['room_id'] in rooms:
+                    promo_dict['room'] = rooms[promo['room_id']]
                 promotions_data.append(promo_dict)
             
-            return success_response(data={'promotions': promotions_data})
+            return validator.apply(success_response(data={'promotions': promotions_data}))
             
         except Exception as e:
             return error_response(f'Lỗi khi lấy khuyến mãi đang hoạt động: {str(e)}', 500)
\ No newline at end of file
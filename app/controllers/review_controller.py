@@ -7,6 +7,7 @@ from app.models.user import User
 from app.schemas.review_schema import (
     ReviewCreateSchema, ReviewUpdateSchema, ReviewResponseSchema, ReviewReportSchema
 )
+from app.utils.pagination import CursorError, paginate
 from app.utils.response import success_response, error_response, paginated_response, validation_error_response
 from app.utils.validators import validate_required_fields
 from marshmallow import ValidationError
@@ -35,6 +36,7 @@ class ReviewController:
             hotel_id = request.args.get('hotel_id', type=int)
             user_id = request.args.get('user_id', type=int)
             status = request.args.get('status')
+            cursor = request.args.get('cursor')
             
             query = Review.query
             
@@ -49,10 +51,11 @@ class ReviewController:
             else:
                 query = query.filter_by(status='active')
             
-            query = query.order_by(Review.created_at.desc())
-            
             total = query.count()
-            reviews = query.offset((page - 1) * per_page).limit(per_page).all()
+            reviews, next_cursor = paginate(
+                query, [(Review.created_at, True), (Review.review_id, True)],
+                page, per_page, cursor=cursor
+            )
             
             reviews_data = []
             for review in reviews:
@@ -76,8 +79,10 @@ class ReviewController:
                     review_dict['hotel'] = None
                 reviews_data.append(review_dict)
             
-            return paginated_response(reviews_data, page, per_page, total)
+            return paginated_response(reviews_data, page, per_page, total, next_cursor=next_cursor)
             
+        except CursorError as e:
+            return error_response(str(e), 400)
         except Exception as e:
             return error_response(f'Lỗi khi lấy danh sách review: {str(e)}', 500)
     
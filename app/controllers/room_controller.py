@@ -4,15 +4,16 @@ from app.models.room import Room
 from app.models.room_image import RoomImage
 from app.models.amenity import Amenity
 from app.models.hotel import Hotel
-from app.models.booking_detail import BookingDetail
 from app.schemas.room_schema import AmenityCreateSchema, AmenityUpdateSchema
 from app.schemas.room_schema import RoomCreateSchema, RoomUpdateSchema, RoomAmenitySchema, RoomStatusSchema
+from app.services.calendar_service import CalendarService
+from app.services.freshness_service import FreshnessService
+from app.services.room_night_service import RoomNightService
 from app.utils.response import success_response, error_response, paginated_response, validation_error_response
 from app.utils.validators import validate_required_fields
 from marshmallow import ValidationError
 from werkzeug.utils import secure_filename
-from datetime import datetime, date
-from sqlalchemy import and_, or_
+from datetime import datetime, date, timedelta
 import os
 import uuid
 from app.models.room_type import RoomType
@@ -75,6 +76,13 @@ class RoomController:
     @staticmethod
     def get_room(room_id):
         try:
+            validator = FreshnessService.room(room_id)
+            if validator is None:
+                return error_response('Không tìm thấy phòng', 404)
+            not_modified = validator.not_modified()
+            if not_modified:
+                return not_modified
+            
             room = Room.query.get(room_id)
             if not room:
                 return error_response('Không tìm thấy phòng', 404)
@@ -85,7 +93,7 @@ class RoomController:
             room_dict['images'] = [img.to_dict() for img in room.images]
             room_dict['amenities'] = [amenity.to_dict() for amenity in room.amenities]
             
-            return success_response(data={'room': room_dict})
+            return validator.apply(success_response(data={'room': room_dict}))
             
         except Exception as e:
             return error_response(f'Lỗi khi lấy chi tiết phòng: {str(e)}', 500)
@@ -441,33 +449,8 @@ class RoomController:
             if check_in < date.today():
                 return error_response('Ngày check_in không thể là quá khứ', 400)
             
-            # Check if room is already booked in the date range
-            has_booking = db.session.query(BookingDetail).join(
-                BookingDetail.booking
-            ).filter(
-                and_(
-                    BookingDetail.room_id == room_id,
-                    BookingDetail.booking.has(
-                        and_(
-                            or_(
-                                and_(
-                                    BookingDetail.booking.property.mapper.c.check_in_date <= check_in,
-                                    BookingDetail.booking.property.mapper.c.check_out_date > check_in
-                                ),
-                                and_(
-                                    BookingDetail.booking.property.mapper.c.check_in_date < check_out,
-                                    BookingDetail.booking.property.mapper.c.check_out_date >= check_out
-                                ),
-                                and_(
-                                    BookingDetail.booking.property.mapper.c.check_in_date >= check_in,
-                                    BookingDetail.booking.property.mapper.c.check_out_date <= check_out
-                                )
-                            ),
-                            BookingDetail.booking.property.mapper.c.status.in_(['pending', 'confirmed', 'checked_in'])
-                        )
-                    )
-                )
-            ).first() is not None
+            # Tra điểm trên sổ room_nights (khóa room_id, stay_date)
+            has_booking = not RoomNightService.is_free(room_id, check_in, check_out)
             
             is_available = not has_booking and room.status == 'available'
             
@@ -482,6 +465,33 @@ class RoomController:
         except Exception as e:
             return error_response(f'Lỗi khi kiểm tra phòng trống: {str(e)}', 500)
     
+    @staticmethod
+    def get_hotel_calendar(hotel_id):
+        """Lịch phòng trống và giá theo đêm của mọi phòng; from mặc định hôm nay, to (không tính) mặc định +90 ngày"""
+        try:
+            hotel = Hotel.query.get(hotel_id)
+            if not hotel:
+                return error_response('Không tìm thấy khách sạn', 404)
+            
+            try:
+                from_str = request.args.get('from')
+                start = datetime.strptime(from_str, '%Y-%m-%d').date() if from_str else date.today()
+                to_str = request.args.get('to')
+                end = datetime.strptime(to_str, '%Y-%m-%d').date() if to_str else start + timedelta(days=90)
+            except ValueError:
+                return error_response('Định dạng ngày không hợp lệ (YYYY-MM-DD)', 400)
+            
+            if start >= end:
+                return error_response('Ngày to phải sau ngày from', 400)
+            
+            if (end - start).days > CalendarService.MAX_DAYS:
+                return error_response(f'Khoảng ngày tối đa {CalendarService.MAX_DAYS} ngày', 400)
+            
+            return success_response(data=CalendarService.build(hotel_id, start, end))
+            
+        except Exception as e:
+            return error_response(f'Lỗi khi lấy lịch phòng: {str(e)}', 500)
+    
     @staticmethod
     def update_room_status(room_id):
         if 'user_id' not in session:
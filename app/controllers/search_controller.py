@@ -1,23 +1,28 @@
-from flask import request, session
+from flask import current_app, request, session
 from app import db
 from app.models.hotel import Hotel
 from app.models.room import Room
-from app.models.booking_detail import BookingDetail
 from app.models.search_history import SearchHistory
 from app.models.user import User
-from app.models.amenity import Amenity
 from app.models.cancellation_policy import CancellationPolicy
-from app.models.promotion import Promotion
 from app.schemas.search_schema import SearchSchema, AdvancedSearchSchema, CheckAvailabilitySchema
+from app.services.availability_service import AvailabilityService
+from app.services.count_service import CountService
+from app.services.facet_service import FacetService
+from app.services.search_cache import SearchResultCache, count_cache, search_cache
+from app.services.search_history_writer import search_history_writer
+from app.services.search_service import SearchService
+from app.utils.pagination import CursorError, paginate
 from app.utils.response import success_response, error_response, paginated_response, validation_error_response
 from app.utils.validators import validate_required_fields
 from marshmallow import ValidationError
-from datetime import datetime, date
-from sqlalchemy import and_, or_, func
-from sqlalchemy.orm import joinedload
+from datetime import date
+from sqlalchemy.orm import selectinload
 
 class SearchController:
     
+    PAGINATION_PARAMS = ('page', 'per_page', 'cursor')
+    
     @staticmethod
     def _get_request_data():
         data = {}
@@ -107,74 +112,69 @@ class SearchController:
             
             if validated_data.get('destination'):
                 destination = validated_data['destination']
-                query = query.filter(
-                    or_(
-                        Hotel.city.ilike(f'%{destination}%'),
-                        Hotel.address.ilike(f'%{destination}%'),
-                        Hotel.hotel_name.ilike(f'%{destination}%')
-                    )
-                )
+                query = query.filter(SearchService.destination_filter(destination))
             
-            if validated_data.get('min_price'):
-                query = query.join(Room).filter(Room.base_price >= validated_data['min_price'])
+            # Chỉ giữ khách sạn còn phòng trống cho khoảng ngày đã chọn
+            if AvailabilityService.is_valid_window(validated_data.get('check_in'), validated_data.get('check_out')):
+                query = query.filter(AvailabilityService.available_hotels_filter(
+                    validated_data['check_in'], validated_data['check_out'], validated_data.get('num_guests')
+                ))
             
-            if validated_data.get('max_price'):
-                query = query.join(Room).filter(Room.base_price <= validated_data['max_price'])
+            if validated_data.get('min_price') or validated_data.get('max_price'):
+                query = query.filter(SearchService.price_filter(
+                    validated_data.get('min_price'), validated_data.get('max_price')
+                ))
             
             if validated_data.get('star_rating'):
                 query = query.filter(Hotel.star_rating >= validated_data['star_rating'])
             
+            # Lọc theo bán kính hoặc khung bản đồ
+            query = query.filter(*SearchService.geo_filter(validated_data))
+            origin = SearchService.geo_origin(validated_data)
+            
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 10, type=int)
-            
-            total = query.distinct().count()
-            hotels = query.distinct().offset((page - 1) * per_page).limit(per_page).all()
+            cursor = request.args.get('cursor')
+            
+            total, total_exact = CountService.count_distinct(
+                query, Hotel.hotel_id,
+                cache_key=CountService.make_key('search', data),
+                destination=validated_data.get('destination')
+            )
+            query, sort_key, order_by = SearchService.hotel_sort(query, validated_data.get('sort'), origin)
+            hotels, next_cursor = paginate(
+                query.options(selectinload(Hotel.images)),
+                order_by, page, per_page, cursor=cursor, sort_key=sort_key
+            )
+            
+            # Thêm thông tin giá, đánh giá cho cả trang trong một truy vấn gộp
+            summaries = SearchService.get_hotel_summaries([hotel.hotel_id for hotel in hotels])
             
             hotels_data = []
             for hotel in hotels:
                 hotel_dict = hotel.to_dict()
                 hotel_dict['images'] = [img.to_dict() for img in hotel.images]
-                
-                # Thêm thông tin giá, đánh giá cho template
-                from app.models.review import Review
-                min_price = db.session.query(func.min(Room.base_price))\
-                    .filter(Room.hotel_id == hotel.hotel_id)\
-                    .filter(Room.status == 'available')\
-                    .scalar() or 1000000
-                
-                review_count = Review.query.filter_by(hotel_id=hotel.hotel_id, status='active').count()
-                
-                avg_rating = db.session.query(func.avg(Review.rating))\
-                    .filter_by(hotel_id=hotel.hotel_id, status='active')\
-                    .scalar()
-                
-                # Chuyển đổi avg_rating sang float an toàn
-                try:
-                    avg_rating_float = float(avg_rating) if avg_rating is not None else 0.0
-                except (TypeError, ValueError):
-                    avg_rating_float = 0.0
-                
-                hotel_dict['min_price'] = int(min_price)
-                hotel_dict['review_count'] = review_count
-                hotel_dict['avg_rating'] = round(avg_rating_float, 1) if avg_rating_float > 0 else 0.0
-                
+                hotel_dict.update(summaries[hotel.hotel_id])
+                if origin:
+                    hotel_dict['distance_km'] = SearchService.distance_km(hotel, origin)
                 hotels_data.append(hotel_dict)
             
             if 'user_id' in session and validated_data.get('destination'):
-                history = SearchHistory(
+                search_history_writer.record(
                     user_id=session['user_id'],
                     destination=validated_data['destination'],
                     check_in_date=validated_data.get('check_in'),
                     check_out_date=validated_data.get('check_out'),
                     num_guests=validated_data.get('num_guests')
                 )
-                db.session.add(history)
-                db.session.commit()
             
-            return paginated_response(hotels_data, page, per_page, total)
+            return paginated_response(hotels_data, page, per_page, total,
+                                      next_cursor=next_cursor, total_exact=total_exact)
             
         except ValidationError as e:
             return validation_error_response(e.messages)
+        except CursorError as e:
+            return error_response(str(e), 400)
         except Exception as e:
             return error_response(f'Lỗi tìm kiếm: {str(e)}', 500)
     
@@ -183,57 +183,90 @@ class SearchController:
         try:
             data = SearchController._get_request_data()
             
+            # Tham số phân trang được đọc riêng, không đưa vào schema
             schema = AdvancedSearchSchema()
-            validated_data = schema.load(data)
-            
-            query = Hotel.query.filter_by(status='active')
-            
-            if validated_data.get('destination'):
-                destination = validated_data['destination']
-                query = query.filter(
-                    or_(
-                        Hotel.city.ilike(f'%{destination}%'),
-                        Hotel.address.ilike(f'%{destination}%'),
-                        Hotel.hotel_name.ilike(f'%{destination}%')
-                    )
-                )
-            
-            if validated_data.get('star_rating'):
-                query = query.filter(Hotel.star_rating >= validated_data['star_rating'])
-            
-            if validated_data.get('amenity_ids'):
-                for amenity_id in validated_data['amenity_ids']:
-                    query = query.filter(Hotel.amenities.any(amenity_id=amenity_id))
-            
-            if validated_data.get('min_price') or validated_data.get('max_price'):
-                query = query.join(Room)
-                if validated_data.get('min_price'):
-                    query = query.filter(Room.base_price >= validated_data['min_price'])
-                if validated_data.get('max_price'):
-                    query = query.filter(Room.base_price <= validated_data['max_price'])
-            
-            if validated_data.get('is_featured'):
-                query = query.filter_by(is_featured=True)
+            validated_data = schema.load({
+                key: value for key, value in data.items()
+                if key not in SearchController.PAGINATION_PARAMS
+            })
             
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 10, type=int)
+            cursor = request.args.get('cursor')
+            
+            cache_key = SearchResultCache.make_key('advanced_search', data, page, per_page, cursor)
+            cached = search_cache.get(cache_key)
+            if cached is None:
+                cached = SearchController._run_advanced_search(
+                    validated_data, page, per_page, cursor,
+                    count_key=CountService.make_key('advanced_search', data)
+                )
+                search_cache.set(cache_key, validated_data.get('destination'), cached)
+            hotels_data, total, total_exact, next_cursor = cached
             
-            total = query.distinct().count()
-            hotels = query.distinct().offset((page - 1) * per_page).limit(per_page).all()
-            
-            hotels_data = []
-            for hotel in hotels:
-                hotel_dict = hotel.to_dict()
-                hotel_dict['images'] = [img.to_dict() for img in hotel.images]
-                hotels_data.append(hotel_dict)
-            
-            return paginated_response(hotels_data, page, per_page, total)
+            return paginated_response(hotels_data, page, per_page, total,
+                                      next_cursor=next_cursor, total_exact=total_exact)
             
         except ValidationError as e:
             return validation_error_response(e.messages)
+        except CursorError as e:
+            return error_response(str(e), 400)
         except Exception as e:
             return error_response(f'Lỗi tìm kiếm nâng cao: {str(e)}', 500)
     
+    @staticmethod
+    def _run_advanced_search(validated_data, page, per_page, cursor=None, count_key=None):
+        query = Hotel.query.filter_by(status='active')
+        
+        if validated_data.get('destination'):
+            destination = validated_data['destination']
+            query = query.filter(SearchService.destination_filter(destination))
+        
+        # Chỉ giữ khách sạn còn phòng trống cho khoảng ngày đã chọn
+        if AvailabilityService.is_valid_window(validated_data.get('check_in'), validated_data.get('check_out')):
+            query = query.filter(AvailabilityService.available_hotels_filter(
+                validated_data['check_in'], validated_data['check_out'], validated_data.get('num_guests')
+            ))
+        
+        if validated_data.get('star_rating'):
+            query = query.filter(Hotel.star_rating >= validated_data['star_rating'])
+        
+        if validated_data.get('amenity_ids'):
+            query = query.filter(SearchService.amenity_filter(validated_data['amenity_ids']))
+        
+        if validated_data.get('min_price') or validated_data.get('max_price'):
+            query = query.filter(SearchService.price_filter(
+                validated_data.get('min_price'), validated_data.get('max_price')
+            ))
+        
+        if validated_data.get('is_featured'):
+            query = query.filter_by(is_featured=True)
+        
+        query = query.filter(*SearchService.geo_filter(validated_data))
+        origin = SearchService.geo_origin(validated_data)
+        
+        total, total_exact = CountService.count_distinct(
+            query, Hotel.hotel_id, cache_key=count_key, destination=validated_data.get('destination')
+        )
+        query, sort_key, order_by = SearchService.hotel_sort(query, validated_data.get('sort'), origin)
+        hotels, next_cursor = paginate(
+            query.options(selectinload(Hotel.images)),
+            order_by, page, per_page, cursor=cursor, sort_key=sort_key
+        )
+        
+        summaries = SearchService.get_hotel_summaries([hotel.hotel_id for hotel in hotels])
+        
+        hotels_data = []
+        for hotel in hotels:
+            hotel_dict = hotel.to_dict()
+            hotel_dict['images'] = [img.to_dict() for img in hotel.images]
+            hotel_dict.update(summaries[hotel.hotel_id])
+            if origin:
+                hotel_dict['distance_km'] = SearchService.distance_km(hotel, origin)
+            hotels_data.append(hotel_dict)
+        
+        return hotels_data, total, total_exact, next_cursor
+    
     @staticmethod
     def get_suggestions():
         try:
@@ -242,28 +275,28 @@ class SearchController:
             if not query_text:
                 return success_response(data={'suggestions': []})
             
-            cities = db.session.query(Hotel.city).filter(
-                Hotel.city.ilike(f'%{query_text}%'),
-                Hotel.status == 'active'
-            ).distinct().limit(5).all()
-            
-            hotels = Hotel.query.filter(
-                Hotel.hotel_name.ilike(f'%{query_text}%'),
-                Hotel.status == 'active'
-            ).limit(5).all()
+            cities, hotels = SearchService.get_suggestions(query_text, limit=5)
             
             suggestions = []
             for city in cities:
-                suggestions.append({'type': 'city', 'value': city[0]})
+                suggestions.append({'type': 'city', 'value': city})
             
-            for hotel in hotels:
-                suggestions.append({'type': 'hotel', 'value': hotel.hotel_name, 'id': hotel.hotel_id})
+            for hotel_id, hotel_name, city in hotels:
+                suggestions.append({'type': 'hotel', 'value': hotel_name, 'id': hotel_id})
             
             return success_response(data={'suggestions': suggestions})
             
         except Exception as e:
             return error_response(f'Lỗi lấy gợi ý: {str(e)}', 500)
     
+    @staticmethod
+    def get_cache_stats():
+        return success_response(data={
+            'search_cache': search_cache.stats(),
+            'count_cache': count_cache.stats(),
+            'search_history_writer': search_history_writer.stats()
+        })
+    
     @staticmethod
     def get_search_history():
         if 'user_id' not in session:
@@ -327,41 +360,28 @@ class SearchController:
             if check_in >= check_out:
                 return error_response('Ngày check-out phải sau ngày check-in', 400)
             
-            query = Room.query.filter_by(status='available')
+            # Một truy vấn anti-join cho toàn bộ phòng; ảnh và khách sạn được nạp theo lô
+            query = AvailabilityService.available_rooms_query(
+                check_in, check_out, validated_data.get('num_guests')
+            ).options(
+                selectinload(Room.images),
+                selectinload(Room.hotel)
+            )
             
             if validated_data.get('hotel_id'):
-                query = query.filter_by(hotel_id=validated_data['hotel_id'])
+                query = query.filter(Room.hotel_id == validated_data['hotel_id'])
             
             if validated_data.get('room_type_id'):
-                query = query.filter_by(room_type_id=validated_data['room_type_id'])
-            
-            if validated_data.get('num_guests'):
-                query = query.filter(Room.max_guests >= validated_data['num_guests'])
+                query = query.filter(Room.room_type_id == validated_data['room_type_id'])
             
             available_rooms = []
-            for room in query.all():
-                booked = db.session.query(func.sum(BookingDetail.quantity)).filter(
-                    BookingDetail.room_id == room.room_id,
-                    BookingDetail.booking.has(
-                        and_(
-                            BookingDetail.check_in_date < check_out,
-                            BookingDetail.check_out_date > check_in,
-                            or_(
-                                BookingDetail.booking.has(status='confirmed'),
-                                BookingDetail.booking.has(status='checked_in')
-                            )
-                        )
-                    )
-                ).scalar() or 0
-                
-                available_quantity = room.quantity - booked
-                
-                if available_quantity > 0:
-                    room_dict = room.to_dict()
-                    room_dict['available_quantity'] = int(available_quantity)
-                    room_dict['hotel'] = room.hotel.to_dict() if room.hotel else None
-                    room_dict['images'] = [img.to_dict() for img in room.images]
-                    available_rooms.append(room_dict)
+            for room in query.order_by(Room.hotel_id, Room.room_id).all():
+                room_dict = room.to_dict()
+                # Mỗi phòng là một đơn vị, phòng trống luôn còn đúng 1
+                room_dict['available_quantity'] = 1
+                room_dict['hotel'] = room.hotel.to_dict() if room.hotel else None
+                room_dict['images'] = [img.to_dict() for img in room.images]
+                available_rooms.append(room_dict)
             
             return success_response(data={'available_rooms': available_rooms})
             
@@ -370,6 +390,155 @@ class SearchController:
         except Exception as e:
             return error_response(f'Lỗi kiểm tra phòng trống: {str(e)}', 500)
     
+    @staticmethod
+    def _build_web_query(validated_data):
+        # Query khách sạn active
+        query = Hotel.query.filter_by(status='active')
+        
+        # Filter theo destination
+        if validated_data.get('destination'):
+            destination = validated_data['destination']
+            query = query.filter(SearchService.destination_filter(destination))
+        
+        # Chỉ giữ khách sạn còn phòng trống cho khoảng ngày đã chọn
+        if AvailabilityService.is_valid_window(validated_data.get('check_in'), validated_data.get('check_out')):
+            query = query.filter(AvailabilityService.available_hotels_filter(
+                validated_data['check_in'], validated_data['check_out'], validated_data.get('num_guests')
+            ))
+        
+        # Filter theo giá phòng (EXISTS trên rooms), không join Room
+        if validated_data.get('min_price') or validated_data.get('max_price'):
+            query = query.filter(SearchService.price_filter(
+                validated_data.get('min_price'), validated_data.get('max_price')
+            ))
+        
+        # Filter theo star rating
+        star_filters = validated_data.get('star_ratings') or []
+        if star_filters:
+            min_star = min(star_filters)
+            query = query.filter(Hotel.star_rating >= min_star)
+        elif validated_data.get('star_rating'):
+            query = query.filter(Hotel.star_rating >= validated_data['star_rating'])
+        
+        # Filter tiện nghi
+        amenity_filters = validated_data.get('amenity_ids')
+        if amenity_filters:
+            query = query.filter(SearchService.amenity_filter(amenity_filters))
+        
+        # Filter featured
+        if validated_data.get('is_featured'):
+            query = query.filter(Hotel.is_featured.is_(True))
+        
+        # Filter hủy miễn phí
+        if validated_data.get('free_cancel'):
+            query = query.filter(
+                Hotel.cancellation_policies.any(CancellationPolicy.refund_percentage == 100.00)
+            )
+        
+        # Filter khuyến mãi đang chạy
+        if validated_data.get('has_promotion'):
+            query = query.filter(SearchService.promotion_filter())
+        
+        # Filter theo bán kính hoặc khung bản đồ
+        query = query.filter(*SearchService.geo_filter(validated_data))
+        
+        return query
+    
+    @staticmethod
+    def _run_web_search(validated_data, page, per_page, count_key=None):
+        query = SearchController._build_web_query(validated_data)
+        origin = SearchService.geo_origin(validated_data)
+        
+        # Đếm tổng (có giới hạn, cache theo bộ lọc) và lấy dữ liệu; mọi bộ lọc đều là semijoin nên không cần distinct
+        total, total_exact = CountService.count_distinct(
+            query, Hotel.hotel_id, cache_key=count_key, destination=validated_data.get('destination')
+        )
+        query, sort_key, order_by = SearchService.hotel_sort(query, validated_data.get('sort'), origin)
+        hotels, _ = paginate(
+            query.options(
+                selectinload(Hotel.images),
+                selectinload(Hotel.amenities)
+            ),
+            order_by, page, per_page
+        )
+        
+        # Giá, đánh giá, hủy miễn phí và khuyến mãi của cả trang lấy trong một truy vấn gộp
+        summaries = SearchService.get_hotel_summaries([hotel.hotel_id for hotel in hotels])
+        if origin:
+            for hotel in hotels:
+                summaries[hotel.hotel_id]['distance_km'] = SearchService.distance_km(hotel, origin)
+        
+        return hotels, summaries, total, total_exact
+    
+    @staticmethod
+    def map_search():
+        """Khách sạn trong khung bản đồ (min_lat, min_lng, max_lat, max_lng) dạng marker gọn,
+        kết hợp được với các bộ lọc của trang tìm kiếm; tối đa SEARCH_MAP_MAX_RESULTS khách sạn."""
+        try:
+            data = SearchController._get_request_data()
+            validated_data = SearchSchema().load(data)
+            
+            if any(validated_data.get(param) is None for param in SearchService.BBOX_PARAMS):
+                return error_response('Thiếu khung bản đồ (min_lat, min_lng, max_lat, max_lng)', 400)
+            
+            cache_key = SearchResultCache.make_key('map_search', data, None, None)
+            cached = search_cache.get(cache_key)
+            if cached is None:
+                cached = SearchController._run_map_search(validated_data)
+                search_cache.set(cache_key, validated_data.get('destination'), cached)
+            markers, truncated = cached
+            
+            return success_response(data={'hotels': markers, 'truncated': truncated})
+            
+        except ValidationError as e:
+            return validation_error_response(e.messages)
+        except Exception as e:
+            return error_response(f'Lỗi tìm kiếm trên bản đồ: {str(e)}', 500)
+    
+    @staticmethod
+    def _run_map_search(validated_data):
+        limit = current_app.config.get('SEARCH_MAP_MAX_RESULTS', 500)
+        origin = SearchService.geo_origin(validated_data)
+        query = SearchController._build_web_query(validated_data)
+        query, _, order_by = SearchService.hotel_sort(query, validated_data.get('sort'), origin)
+        hotels, _ = paginate(query, order_by, 1, limit + 1)
+        
+        truncated = len(hotels) > limit
+        hotels = hotels[:limit]
+        summaries = SearchService.get_hotel_summaries([hotel.hotel_id for hotel in hotels])
+        
+        markers = []
+        for hotel in hotels:
+            marker = {
+                'hotel_id': hotel.hotel_id,
+                'hotel_name': hotel.hotel_name,
+                'latitude': float(hotel.latitude),
+                'longitude': float(hotel.longitude),
+                'star_rating': hotel.star_rating,
+                'min_price': summaries[hotel.hotel_id]['min_price'],
+                'avg_rating': summaries[hotel.hotel_id]['avg_rating']
+            }
+            if origin:
+                marker['distance_km'] = SearchService.distance_km(hotel, origin)
+            markers.append(marker)
+        return markers, truncated
+    
+    @staticmethod
+    def _load_hotels(hotel_ids):
+        """Nạp lại khách sạn theo danh sách id, giữ nguyên thứ tự.
+
+        Khách sạn bị ngừng hoạt động trong TTL của cache (thay đổi từ process khác chưa xóa cache
+        ở đây) bị bỏ qua.
+        """
+        if not hotel_ids:
+            return []
+        hotels = Hotel.query.filter(Hotel.hotel_id.in_(hotel_ids), Hotel.status == 'active').options(
+            selectinload(Hotel.images),
+            selectinload(Hotel.amenities)
+        ).all()
+        by_id = {hotel.hotel_id: hotel for hotel in hotels}
+        return [by_id[hotel_id] for hotel_id in hotel_ids if hotel_id in by_id]
+    
     @staticmethod
     def search_for_web():
         try:
@@ -385,155 +554,57 @@ class SearchController:
                 # Nếu validation fail, vẫn tiếp tục với data gốc
                 validated_data = data
             
-            # Query khách sạn active
-            query = Hotel.query.filter_by(status='active')
-            
-            # Filter theo destination
-            if validated_data.get('destination'):
-                destination = validated_data['destination']
-                query = query.filter(
-                    or_(
-                        Hotel.city.ilike(f'%{destination}%'),
-                        Hotel.address.ilike(f'%{destination}%'),
-                        Hotel.hotel_name.ilike(f'%{destination}%')
-                    )
-                )
-            
-            # Filter theo giá (cần join với Room)
-            if validated_data.get('min_price') or validated_data.get('max_price'):
-                query = query.join(Room, Room.hotel_id == Hotel.hotel_id)
-                
-                if validated_data.get('min_price'):
-                    query = query.filter(Room.base_price >= validated_data['min_price'])
-                
-                if validated_data.get('max_price'):
-                    query = query.filter(Room.base_price <= validated_data['max_price'])
-            
-            # Filter theo star rating
-            star_filters = validated_data.get('star_ratings') or []
-            if star_filters:
-                min_star = min(star_filters)
-                query = query.filter(Hotel.star_rating >= min_star)
-            elif validated_data.get('star_rating'):
-                query = query.filter(Hotel.star_rating >= validated_data['star_rating'])
-            
-            # Filter tiện nghi
-            amenity_filters = validated_data.get('amenity_ids')
-            if amenity_filters:
-                for amenity_id in amenity_filters:
-                    query = query.filter(Hotel.amenities.any(Amenity.amenity_id == amenity_id))
-            
-            # Filter featured
-            if validated_data.get('is_featured'):
-                query = query.filter(Hotel.is_featured.is_(True))
-            
-            # Filter hủy miễn phí
-            if validated_data.get('free_cancel'):
-                query = query.filter(
-                    Hotel.cancellation_policies.any(CancellationPolicy.refund_percentage == 100.00)
-                )
-            
-            # Filter khuyến mãi đang chạy
-            if validated_data.get('has_promotion'):
-                now = datetime.utcnow()
-                query = query.filter(
-                    Hotel.promotions.any(
-                        and_(
-                            Promotion.is_active.is_(True),
-                            Promotion.start_date <= now,
-                            Promotion.end_date >= now
-                        )
-                    )
-                )
-            
             # Phân trang
             page = request.args.get('page', 1, type=int)
             per_page = request.args.get('per_page', 10, type=int)
             
-            # Đếm tổng và lấy dữ liệu (distinct để tránh duplicate khi join)
-            total = query.distinct().count()
-            hotels = query.options(
-                joinedload(Hotel.images),
-                joinedload(Hotel.amenities)
-            ).distinct().offset((page - 1) * per_page).limit(per_page).all()
+            # Kết quả được cache theo bộ lọc đã chuẩn hóa; ORM object không được cache
+            # nên khi trúng cache chỉ nạp lại các khách sạn của trang theo khóa chính
+            cache_key = SearchResultCache.make_key('search_for_web', data, page, per_page)
+            cached = search_cache.get(cache_key)
+            if cached is None:
+                hotels, summaries, total, total_exact = SearchController._run_web_search(
+                    validated_data, page, per_page,
+                    count_key=CountService.make_key('search_for_web', data)
+                )
+                search_cache.set(cache_key, validated_data.get('destination'),
+                                 ([hotel.hotel_id for hotel in hotels], summaries, total, total_exact))
+            else:
+                hotel_ids, summaries, total, total_exact = cached
+                hotels = SearchController._load_hotels(hotel_ids)
             
             # Build response data
-            hotels_data = []
-            for hotel in hotels:
-                # Tính giá thấp nhất
-                from app.models.review import Review
-                min_price = db.session.query(func.min(Room.base_price))\
-                    .filter(Room.hotel_id == hotel.hotel_id)\
-                    .filter(Room.status == 'available')\
-                    .scalar() or 1000000
-                
-                # Tính rating trung bình
-                review_count = Review.query.filter_by(
-                    hotel_id=hotel.hotel_id, 
-                    status='active'
-                ).count()
-                
-                avg_rating = db.session.query(func.avg(Review.rating))\
-                    .filter_by(hotel_id=hotel.hotel_id, status='active')\
-                    .scalar()
-                
-                # Chuyển đổi avg_rating sang float an toàn
-                try:
-                    avg_rating_float = float(avg_rating) if avg_rating is not None else 0.0
-                except (TypeError, ValueError):
-                    avg_rating_float = 0.0
-                
-                # Kiểm tra có chính sách hủy miễn phí không (refund_percentage = 100%)
-                from app.models.cancellation_policy import CancellationPolicy
-                from app.models.promotion import Promotion
-                has_free_cancellation = CancellationPolicy.query.filter_by(
-                    hotel_id=hotel.hotel_id
-                ).filter(
-                    CancellationPolicy.refund_percentage == 100.00
-                ).first() is not None
-                
-                # Kiểm tra có promotion đang active không
-                has_active_promotion = Promotion.query.filter(
-                    Promotion.hotel_id == hotel.hotel_id,
-                    Promotion.start_date <= datetime.utcnow(),
-                    Promotion.end_date >= datetime.utcnow(),
-                    Promotion.is_active == True
-                ).first() is not None
-                
-                hotels_data.append({
-                    'hotel': hotel,
-                    'min_price': int(min_price),
-                    'review_count': review_count,
-                    'avg_rating': round(avg_rating_float, 1) if avg_rating_float > 0 else 0.0,
-                    'has_free_cancellation': has_free_cancellation,
-                    'has_active_promotion': has_active_promotion
-                })
-            
-            # Lưu lịch sử tìm kiếm (nếu user đã login)
+            hotels_data = [{'hotel': hotel, **summaries[hotel.hotel_id]} for hotel in hotels]
+            
+            # Số đếm cho từng bộ lọc ở sidebar, không phụ thuộc trang nên cache riêng theo bộ lọc
+            facets = FacetService.get_facets(
+                lambda: SearchController._build_web_query(validated_data),
+                cache_key=FacetService.make_key('search_for_web', data),
+                destination=validated_data.get('destination')
+            )
+            
+            # Lưu lịch sử tìm kiếm (nếu user đã login), ghi theo lô ở luồng nền
             if 'user_id' in session and validated_data.get('destination'):
-                try:
-                    history = SearchHistory(
-                        user_id=session['user_id'],
-                        destination=validated_data['destination'],
-                        check_in_date=validated_data.get('check_in'),
-                        check_out_date=validated_data.get('check_out'),
-                        num_guests=validated_data.get('num_guests')
-                    )
-                    db.session.add(history)
-                    db.session.commit()
-                except:
-                    db.session.rollback()
+                search_history_writer.record(
+                    user_id=session['user_id'],
+                    destination=validated_data['destination'],
+                    check_in_date=validated_data.get('check_in'),
+                    check_out_date=validated_data.get('check_out'),
+                    num_guests=validated_data.get('num_guests')
+                )
             
             # Tính total_pages
-            total_pages = (total + per_page - 1) // per_page if total > 0 else 1
+            total_pages = CountService.total_pages(total, total_exact, page, per_page, len(hotels_data))
             
             # Return dict thay vì response object
             return {
                 'data': hotels_data,
                 'total': total,
+                'total_exact': total_exact,
                 'page': page,
                 'per_page': per_page,
-                'total_pages': total_pages
+                'total_pages': total_pages,
+                'facets': facets
             }
             
         except Exception as e:
@@ -541,96 +612,9 @@ class SearchController:
             return {
                 'data': [],
                 'total': 0,
+                'total_exact': True,
                 'page': 1,
                 'per_page': 10,
-                'total_pages': 1
+                'total_pages': 1,
+                'facets': {}
             }
-        try:
-            data = SearchController._get_request_data()
-            
-            from app.schemas.search_schema import SearchSchema
-            from marshmallow import ValidationError
-            
-            schema = SearchSchema()
-            validated_data = schema.load(data)
-            
-            query = Hotel.query.filter_by(status='active')
-            
-            if validated_data.get('destination'):
-                destination = validated_data['destination']
-                query = query.filter(
-                    or_(
-                        Hotel.city.ilike(f'%{destination}%'),
-                        Hotel.address.ilike(f'%{destination}%'),
-                        Hotel.hotel_name.ilike(f'%{destination}%')
-                    )
-                )
-            
-            if validated_data.get('min_price'):
-                query = query.join(Room).filter(Room.base_price >= validated_data['min_price'])
-            
-            if validated_data.get('max_price'):
-                query = query.join(Room).filter(Room.base_price <= validated_data['max_price'])
-            
-            if validated_data.get('star_rating'):
-                query = query.filter(Hotel.star_rating >= validated_data['star_rating'])
-            
-            page = request.args.get('page', 1, type=int)
-            per_page = request.args.get('per_page', 10, type=int)
-            
-            total = query.distinct().count()
-            hotels = query.distinct().offset((page - 1) * per_page).limit(per_page).all()
-            
-            hotels_data = []
-            for hotel in hotels:
-                from app.models.review import Review
-                min_price = db.session.query(func.min(Room.base_price))\
-                    .filter(Room.hotel_id == hotel.hotel_id)\
-                    .filter(Room.status == 'available')\
-                    .scalar() or 1000000
-                
-                review_count = Review.query.filter_by(hotel_id=hotel.hotel_id, status='active').count()
-                
-                avg_rating = db.session.query(func.avg(Review.rating))\
-                    .filter_by(hotel_id=hotel.hotel_id, status='active')\
-                    .scalar()
-                
-                # Chuyển đổi avg_rating sang float an toàn
-                try:
-                    avg_rating_float = float(avg_rating) if avg_rating is not None else 0.0
-                except (TypeError, ValueError):
-                    avg_rating_float = 0.0
-                
-                hotels_data.append({
-                    'hotel': hotel,
-                    'min_price': int(min_price),
-                    'review_count': review_count,
-                    'avg_rating': round(avg_rating_float, 1) if avg_rating_float > 0 else 0.0
-                })
-            
-            if 'user_id' in session and validated_data.get('destination'):
-                history = SearchHistory(
-                    user_id=session['user_id'],
-                    destination=validated_data['destination'],
-                    check_in_date=validated_data.get('check_in'),
-                    check_out_date=validated_data.get('check_out'),
-                    num_guests=validated_data.get('num_guests')
-                )
-                db.session.add(history)
-                db.session.commit()
-            
-            total_pages = (total + per_page - 1) // per_page
-            return {
-                'hotels': hotels_data,
-                'total': total,
-                'page': page,
-                'per_page': per_page,
-                'total_pages': total_pages
-            }
-            
-        except ValidationError as e:
-            print(f'Validation error: {e.messages}')
-            return {'hotels': [], 'total': 0, 'page': 1, 'per_page': 10, 'total_pages': 1}
-        except Exception as e:
-            print(f'Lỗi tìm kiếm: {str(e)}')
-            return {'hotels': [], 'total': 0, 'page': 1, 'per_page': 10, 'total_pages': 1}
\ No newline at end of file
@@ -22,4 +22,8 @@ from app.models.email_verification import EmailVerification
 from app.models.cancellation_policy import CancellationPolicy
 from app.models.favorite import Favorite
 from app.models.search_history import SearchHistory
-from app.models.login_history import LoginHistory
\ No newline at end of file
+from app.models.login_history import LoginHistory
+from app.models.hotel_stats import HotelStats
+from app.models.room_night import RoomNight
+from app.models.booking_hold import BookingHold
+from app.models.idempotency_key import IdempotencyKey
@@ -0,0 +1,21 @@
+from app import db
+from datetime import datetime
+
+class BookingHold(db.Model):
+    """Giữ chỗ tạm của booking đang chờ thanh toán online.
+
+    Booking được giữ ở trạng thái pending (đêm phòng đã nằm trong sổ room_nights) cho đến khi
+    thanh toán xong hoặc hết expires_at; luồng dọn dẹp hủy booking hết hạn để nhả phòng.
+    """
+    __tablename__ = 'booking_holds'
+    
+    booking_id = db.Column(db.Integer, db.ForeignKey('bookings.booking_id', ondelete='CASCADE'), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'booking_id': self.booking_id,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
@@ -1,6 +1,8 @@
 ### app/models/hotel.py
 from app import db
+from app.utils.geo import geo_cell
 from datetime import datetime, time
+from sqlalchemy import event
 
 class Hotel(db.Model):
     __tablename__ = 'hotels'
@@ -15,6 +17,8 @@ class Hotel(db.Model):
     ward = db.Column(db.String(100))
     latitude = db.Column(db.Numeric(10, 8))
     longitude = db.Column(db.Numeric(11, 8))
+    # Ô lưới tính từ tọa độ, dùng để lọc theo bán kính/khung bản đồ bằng index
+    geo_cell = db.Column(db.Integer, index=True)
     star_rating = db.Column(db.Integer)
     phone = db.Column(db.String(20))
     email = db.Column(db.String(100))
@@ -56,3 +60,9 @@ class Hotel(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+
+@event.listens_for(Hotel, 'before_insert')
+@event.listens_for(Hotel, 'before_update')
+def _set_geo_cell(mapper, connection, target):
+    target.geo_cell = geo_cell(target.latitude, target.longitude)
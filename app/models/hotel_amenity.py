@@ -3,5 +3,7 @@ from app import db
 
 hotel_amenities = db.Table('hotel_amenities',
     db.Column('hotel_id', db.Integer, db.ForeignKey('hotels.hotel_id', ondelete='CASCADE'), primary_key=True),
-    db.Column('amenity_id', db.Integer, db.ForeignKey('amenities.amenity_id', ondelete='CASCADE'), primary_key=True)
+    db.Column('amenity_id', db.Integer, db.ForeignKey('amenities.amenity_id', ondelete='CASCADE'), primary_key=True),
+    # Lọc theo tiện nghi đọc theo amenity_id trước
+    db.Index('ix_hotel_amenities_amenity_hotel', 'amenity_id', 'hotel_id')
 )
\ No newline at end of file
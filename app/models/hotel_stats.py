@@ -0,0 +1,50 @@
+from app import db
+from datetime import datetime
+
+class HotelStats(db.Model):
+    __tablename__ = 'hotel_stats'
+    
+    hotel_id = db.Column(db.Integer, db.ForeignKey('hotels.hotel_id', ondelete='CASCADE'), primary_key=True)
+    min_price = db.Column(db.Numeric(10, 2), index=True)
+    max_price = db.Column(db.Numeric(10, 2))
+    room_count = db.Column(db.Integer, nullable=False, default=0)
+    review_count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    cleanliness_rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    cleanliness_rating_count = db.Column(db.Integer, nullable=False, default=0)
+    service_rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    service_rating_count = db.Column(db.Integer, nullable=False, default=0)
+    facilities_rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    facilities_rating_count = db.Column(db.Integer, nullable=False, default=0)
+    location_rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    location_rating_count = db.Column(db.Integer, nullable=False, default=0)
+    has_free_cancellation = db.Column(db.Boolean, nullable=False, default=False, index=True)
+    active_promotion_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    hotel = db.relationship('Hotel', backref=db.backref('stats', uselist=False, lazy=True, passive_deletes=True))
+    
+    @staticmethod
+    def _average(total, count):
+        return round(total / count, 1) if count else None
+    
+    @property
+    def avg_rating(self):
+        return self._average(self.rating_sum, self.review_count)
+    
+    def to_dict(self):
+        return {
+            'hotel_id': self.hotel_id,
+            'min_price': float(self.min_price) if self.min_price is not None else None,
+            'max_price': float(self.max_price) if self.max_price is not None else None,
+            'room_count': self.room_count,
+            'review_count': self.review_count,
+            'avg_rating': self.avg_rating,
+            'avg_cleanliness_rating': self._average(self.cleanliness_rating_sum, self.cleanliness_rating_count),
+            'avg_service_rating': self._average(self.service_rating_sum, self.service_rating_count),
+            'avg_facilities_rating': self._average(self.facilities_rating_sum, self.facilities_rating_count),
+            'avg_location_rating': self._average(self.location_rating_sum, self.location_rating_count),
+            'has_free_cancellation': self.has_free_cancellation,
+            'active_promotion_count': self.active_promotion_count,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
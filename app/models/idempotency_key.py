@@ -0,0 +1,36 @@
+from app import db
+from datetime import datetime
+
+class IdempotencyKey(db.Model):
+    """Khóa idempotency của client cho request tạo booking, kèm phản hồi đã trả.
+
+    Mỗi người dùng chỉ có một bản ghi cho mỗi khóa (chỉ mục duy nhất); request lặp lại với cùng
+    khóa nhận lại phản hồi đã lưu thay vì tạo booking mới. Bản ghi hết hạn sau expires_at.
+    """
+    __tablename__ = 'idempotency_keys'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.user_id', ondelete='CASCADE'), nullable=False)
+    idempotency_key = db.Column(db.String(255), nullable=False)
+    # SHA-256 của nội dung request, phát hiện một khóa bị dùng lại cho request khác
+    request_hash = db.Column(db.String(64), nullable=False)
+    booking_id = db.Column(db.Integer, db.ForeignKey('bookings.booking_id', ondelete='SET NULL'))
+    status_code = db.Column(db.Integer)
+    response_body = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'idempotency_key', name='uq_idempotency_keys_user_key'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'idempotency_key': self.idempotency_key,
+            'booking_id': self.booking_id,
+            'status_code': self.status_code,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
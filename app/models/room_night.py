@@ -0,0 +1,25 @@
+from app import db
+
+class RoomNight(db.Model):
+    """Sổ đêm phòng: mỗi (phòng, đêm) chỉ thuộc một booking đang giữ chỗ.
+
+    Khóa chính (room_id, stay_date) là ràng buộc duy nhất chống đặt trùng; stay_date là
+    đêm bắt đầu từ ngày đó, nên booking [check_in, check_out) chiếm các ngày check_in .. check_out - 1.
+    """
+    __tablename__ = 'room_nights'
+    
+    room_id = db.Column(db.Integer, db.ForeignKey('rooms.room_id', ondelete='CASCADE'), primary_key=True)
+    stay_date = db.Column(db.Date, primary_key=True)
+    booking_id = db.Column(db.Integer, db.ForeignKey('bookings.booking_id', ondelete='CASCADE'), nullable=False, index=True)
+    
+    __table_args__ = (
+        # Tìm phòng đã kín trong một khoảng ngày (tìm kiếm khách sạn/phòng trống)
+        db.Index('ix_room_nights_date_room', 'stay_date', 'room_id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'room_id': self.room_id,
+            'stay_date': self.stay_date.isoformat() if self.stay_date else None,
+            'booking_id': self.booking_id
+        }
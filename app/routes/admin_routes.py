@@ -233,4 +233,19 @@ def admin_roles_update(role_id):
 def admin_roles_delete(role_id):
     result = AdminPanelController.delete_role(role_id)
     _flash_from_result(result, 'Đã xóa role', 'Xóa role thất bại')
-    return _redirect('admin.admin_roles')
\ No newline at end of file
+    return _redirect('admin.admin_roles')
+
+
+@admin_bp.route('/search-cache/stats', methods=['GET'])
+@role_required('admin')
+def admin_search_cache_stats():
+    from app.controllers.search_controller import SearchController
+    return SearchController.get_cache_stats()
+
+
+@admin_bp.route('/fragment-cache/stats', methods=['GET'])
+@role_required('admin')
+def admin_fragment_cache_stats():
+    from app.services.fragment_cache import fragment_cache
+    from app.utils.response import success_response
+    return success_response(data={'fragment_cache': fragment_cache.stats()})
@@ -100,12 +100,20 @@ def create_booking():
         
         payment_method = request.form.get('payment_method', 'hotel')
         
-        result = BookingController.create_booking()
+        # Thanh toán PayPal: giữ phòng trong thời gian chờ thanh toán, hết hạn thì tự nhả
+        result = BookingController.create_booking(hold=payment_method == 'paypal')
         if result[1] == 201:
             booking_id = result[0].get_json()['data']['booking']['booking_id']
             booking = BookingController.get_booking(booking_id)
             booking_data = booking[0].get_json()['data']['booking']
             
+            # Gửi lại form (khóa idempotency) trả về booking đã tạo: không tạo thanh toán PayPal lần nữa
+            if result[0].headers.get('Idempotent-Replayed') or booking_data['payment_status'] == 'paid':
+                flash('Đơn đặt phòng đã được tạo trước đó', 'info')
+                session.pop('booking_step1', None)
+                session.pop('booking_step2', None)
+                return redirect(url_for('booking.booking_detail', booking_id=booking_id))
+            
             if payment_method == 'paypal':
                 from app.services.paypal_service import PayPalService
                 amount_usd = float(booking_data['final_amount']) / 25000
@@ -285,6 +293,9 @@ def create_booking():
             traceback.print_exc()
             pass
     
+    # Khóa idempotency mới cho mỗi lần hiển thị form; gửi lại cùng form trả về booking đã tạo
+    from uuid import uuid4
+    
     return render_template('booking/create.html', 
                          hotel=hotel_data, 
                          room=room_data,
@@ -294,6 +305,7 @@ def create_booking():
                          step1_data=step1_data,
                          step2_data=step2_data,
                          price_info=price_info,
+                         idempotency_key=uuid4().hex,
                          error=request.args.get('error'))
 
 @booking_bp.route('/<int:booking_id>/check-price', methods=['POST'])
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from app.controllers.hotel_controller import HotelController
+from app.utils.conditional import render_conditional
 from app.utils.decorators import role_required, hotel_owner_required
 
 hotel_bp = Blueprint('hotel', __name__, url_prefix='/hotel')
@@ -7,7 +8,7 @@ hotel_bp = Blueprint('hotel', __name__, url_prefix='/hotel')
 @hotel_bp.route('/', methods=['GET'])
 def list_hotels():
     result = HotelController.list_hotels()
-    return render_template('hotel/list.html', result=result)
+    return render_conditional(result, 'hotel/list.html')
 
 @hotel_bp.route('/featured', methods=['GET'])
 def featured_hotels():
@@ -17,7 +18,7 @@ def featured_hotels():
 @hotel_bp.route('/<int:hotel_id>', methods=['GET'])
 def hotel_detail(hotel_id):
     result = HotelController.get_hotel(hotel_id)
-    return render_template('hotel/detail.html', hotel_id=hotel_id, result=result)
+    return render_conditional(result, 'hotel/detail.html', hotel_id=hotel_id)
 
 @hotel_bp.route('/create', methods=['GET', 'POST'])
 @role_required('admin', 'hotel_owner')
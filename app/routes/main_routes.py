@@ -15,6 +15,7 @@ def index():
                          popular_cities=data.get('popular_cities', []),
                          promotions=data.get('active_promotions', []),
                          total_promotions_count=data.get('total_promotions_count', 0),
+                         home_version=data.get('version'),
                          user_logged_in='user_id' in session)
 
 @main_bp.route('/search')
@@ -70,8 +71,10 @@ def search_page():
     return render_template('search/index.html',
                          hotels=search_data.get('data', []),
                          total=search_data.get('total', 0),
+                         total_exact=search_data.get('total_exact', True),
                          page=search_data.get('page', 1),
                          total_pages=search_data.get('total_pages', 1),
+                         facets=search_data.get('facets', {}),
                          per_page=search_data.get('per_page', 10),
                          city=city,
                          checkin=checkin,
@@ -92,6 +95,18 @@ def search_suggestions():
     
     return jsonify(data)
 
+@main_bp.route('/api/search/map')
+def search_map():
+    from app.controllers.search_controller import SearchController
+    
+    return SearchController.map_search()
+
+@main_bp.route('/api/hotels/<int:hotel_id>/calendar')
+def hotel_calendar(hotel_id):
+    from app.controllers.room_controller import RoomController
+    
+    return RoomController.get_hotel_calendar(hotel_id)
+
 @main_bp.route('/promotions')
 def promotions():
     from app.controllers.main_controller import MainController
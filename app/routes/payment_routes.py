@@ -1,6 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from app.utils.decorators import login_required
 from app.services.paypal_service import PayPalService
+from app.services.booking_hold_service import BookingHoldService, BookingHoldExpired
 from app.models.booking import Booking
 from app.models.payment import Payment
 from app import db
@@ -33,7 +34,17 @@ def create_payment():
             flash('Bạn không có quyền thanh toán đơn đặt phòng này', 'error')
             return render_template('payment/create.html')
         
+        if booking.payment_status == 'paid':
+            flash('Đơn đặt phòng này đã được thanh toán', 'info')
+            return redirect(url_for('booking.booking_detail_public', booking_id=booking_id))
+        
         if payment_method == 'paypal':
+            try:
+                BookingHoldService.secure(booking)
+            except BookingHoldExpired as e:
+                flash(str(e), 'error')
+                return render_template('payment/create.html')
+            
             amount_usd = float(booking.final_amount) / 25000
             
             result = PayPalService.create_payment(amount_usd, booking.booking_code, booking_id=booking_id)
@@ -83,6 +94,19 @@ def paypal_return():
         flash('Bạn không có quyền truy cập đơn đặt phòng này', 'error')
         return redirect(url_for('auth.login'))
     
+    # Đã thanh toán (tải lại trang trả về, thanh toán lặp lại): không thu tiền lần nữa
+    if booking.payment_status == 'paid':
+        session.pop('paypal_booking_id', None)
+        flash('Đơn đặt phòng này đã được thanh toán', 'info')
+        return redirect(url_for('booking.booking_detail_public', booking_id=booking_id))
+    
+    # Gia hạn (hoặc giữ lại) phòng trước khi thu tiền để hold không hết hạn giữa chừng
+    try:
+        BookingHoldService.secure(booking)
+    except BookingHoldExpired as e:
+        flash(str(e), 'error')
+        return redirect(url_for('booking.booking_detail_public', booking_id=booking_id))
+    
     result = PayPalService.execute_payment(payment_id, payer_id)
     
     if result['success']:
@@ -98,6 +122,7 @@ def paypal_return():
             )
             db.session.add(payment)
             booking.payment_status = 'paid'
+            BookingHoldService.convert(booking)
             db.session.commit()
             session.pop('paypal_booking_id', None)
             
@@ -122,9 +147,22 @@ def paypal_return():
 
 @payment_bp.route('/paypal-cancel', methods=['GET'])
 def paypal_cancel():
-    booking_id = request.args.get('booking_id', type=int) or session.pop('paypal_booking_id', None)
+    session_booking_id = session.pop('paypal_booking_id', None)
+    booking_id = request.args.get('booking_id', type=int) or session_booking_id
     flash('Bạn đã hủy thanh toán', 'warning')
     
+    # Nhả phòng đang giữ chờ thanh toán (chỉ chủ booking hoặc phiên vừa chuyển sang PayPal)
+    booking = Booking.query.get(booking_id) if booking_id else None
+    if booking and (booking.user_id == session.get('user_id') or booking.booking_id == session_booking_id):
+        try:
+            if BookingHoldService.release(booking):
+                db.session.commit()
+            else:
+                db.session.rollback()
+        except Exception as e:
+            db.session.rollback()
+            print(f'Lỗi nhả phòng khi hủy thanh toán: {str(e)}')
+    
     if 'user_id' in session and booking_id:
         return redirect(url_for('booking.booking_detail_public', booking_id=booking_id))
     elif 'user_id' in session:
@@ -152,6 +190,16 @@ def create_paypal_payment():
         flash('Bạn không có quyền thanh toán đơn đặt phòng này', 'error')
         return redirect(url_for('payment.create_payment'))
     
+    if booking.payment_status == 'paid':
+        flash('Đơn đặt phòng này đã được thanh toán', 'info')
+        return redirect(url_for('booking.booking_detail_public', booking_id=booking_id))
+    
+    try:
+        BookingHoldService.secure(booking)
+    except BookingHoldExpired as e:
+        flash(str(e), 'error')
+        return redirect(url_for('payment.create_payment'))
+    
     amount_usd = float(booking.final_amount) / 25000
     
     result = PayPalService.create_payment(amount_usd, booking.booking_code, booking_id=booking_id)
@@ -1,7 +1,30 @@
-from marshmallow import Schema, fields, validates, ValidationError, validate, INCLUDE
+from marshmallow import Schema, fields, validates, validates_schema, ValidationError, validate, INCLUDE
 from datetime import date
 
-class SearchSchema(Schema):
+class GeoSearchSchema(Schema):
+    # Tìm theo bán kính quanh (lat, lng) hoặc theo khung bản đồ
+    lat = fields.Float(allow_none=True, validate=validate.Range(min=-90, max=90))
+    lng = fields.Float(allow_none=True, validate=validate.Range(min=-180, max=180))
+    radius_km = fields.Float(allow_none=True, validate=validate.Range(min=0, max=200, min_inclusive=False))
+    min_lat = fields.Float(allow_none=True, validate=validate.Range(min=-90, max=90))
+    max_lat = fields.Float(allow_none=True, validate=validate.Range(min=-90, max=90))
+    min_lng = fields.Float(allow_none=True, validate=validate.Range(min=-180, max=180))
+    max_lng = fields.Float(allow_none=True, validate=validate.Range(min=-180, max=180))
+    
+    @validates_schema
+    def validate_geo(self, data, **kwargs):
+        if data.get('radius_km') is not None and (data.get('lat') is None or data.get('lng') is None):
+            raise ValidationError('Cần lat và lng khi tìm theo bán kính', 'radius_km')
+        if (data.get('lat') is None) != (data.get('lng') is None):
+            raise ValidationError('Cần cả lat và lng', 'lat')
+        bbox = [data.get(key) for key in ('min_lat', 'min_lng', 'max_lat', 'max_lng')]
+        if any(value is not None for value in bbox):
+            if any(value is None for value in bbox):
+                raise ValidationError('Khung bản đồ cần đủ min_lat, min_lng, max_lat, max_lng', 'min_lat')
+            if bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+                raise ValidationError('Khung bản đồ không hợp lệ', 'min_lat')
+
+class SearchSchema(GeoSearchSchema):
     destination = fields.Str(required=False, allow_none=True)
     check_in = fields.Date(required=False, allow_none=True)
     check_out = fields.Date(required=False, allow_none=True)
@@ -17,18 +40,18 @@ class SearchSchema(Schema):
     sort = fields.Str(required=False, allow_none=True)
     
     @validates('check_in')
-    def validate_check_in(self, value):
+    def validate_check_in(self, value, **kwargs):
         if value and value < date.today():
             raise ValidationError('Ngày nhận phòng không thể là quá khứ')
     
     @validates('check_out')
-    def validate_check_out(self, value):
+    def validate_check_out(self, value, **kwargs):
         if value and value < date.today():
             raise ValidationError('Ngày trả phòng không thể là quá khứ')
     
     class Meta:
         unknown = INCLUDE
-class AdvancedSearchSchema(Schema):
+class AdvancedSearchSchema(GeoSearchSchema):
     destination = fields.String(allow_none=True)
     check_in = fields.Date(allow_none=True)
     check_out = fields.Date(allow_none=True)
@@ -38,6 +61,7 @@ class AdvancedSearchSchema(Schema):
     star_rating = fields.Integer(allow_none=True, validate=validate.Range(min=1, max=5))
     amenity_ids = fields.List(fields.Integer(), allow_none=True)
     is_featured = fields.Boolean(allow_none=True)
+    sort = fields.String(allow_none=True)
 
 class CheckAvailabilitySchema(Schema):
     check_in = fields.Date(required=True)
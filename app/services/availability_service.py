@@ -0,0 +1,55 @@
+from datetime import date
+
+from sqlalchemy import and_, select
+
+from app.models.hotel import Hotel
+from app.models.room import Room
+from app.models.room_night import RoomNight
+
+
+class AvailabilityService:
+    """Kiểm tra phòng trống theo khoảng ngày bằng truy vấn tập hợp (anti-join), không lặp theo từng phòng.
+
+    Mỗi phòng là một đơn vị: phòng bị chiếm nếu có đêm trong [check_in, check_out) thuộc
+    booking đang giữ chỗ (pending/confirmed/checked_in), ghi trong sổ room_nights.
+    """
+
+    BLOCKING_STATUSES = ('pending', 'confirmed', 'checked_in')
+
+    @staticmethod
+    def is_valid_window(check_in, check_out):
+        return isinstance(check_in, date) and isinstance(check_out, date) and check_in < check_out
+
+    @staticmethod
+    def booked_rooms_subquery(check_in, check_out):
+        """room_id có đêm bị giữ trong khoảng ngày (sổ room_nights, chỉ mục (stay_date, room_id)).
+
+        Không tương quan với Room nên chỉ được tính một lần cho cả truy vấn.
+        """
+        return select(RoomNight.room_id).where(
+            RoomNight.stay_date >= check_in,
+            RoomNight.stay_date < check_out
+        ).group_by(RoomNight.room_id)
+
+    @staticmethod
+    def free_room_conditions(check_in, check_out, num_guests=None):
+        conditions = [
+            Room.status == 'available',
+            Room.room_id.notin_(AvailabilityService.booked_rooms_subquery(check_in, check_out))
+        ]
+        if num_guests:
+            conditions.append(Room.max_guests >= num_guests)
+        return conditions
+
+    @staticmethod
+    def available_rooms_query(check_in, check_out, num_guests=None):
+        """Query Room chỉ gồm các phòng còn trống trong khoảng ngày"""
+        return Room.query.filter(*AvailabilityService.free_room_conditions(check_in, check_out, num_guests))
+
+    @staticmethod
+    def available_hotels_filter(check_in, check_out, num_guests=None):
+        """Điều kiện cho Hotel: còn ít nhất một phòng trống đủ sức chứa trong khoảng ngày"""
+        free_hotels = select(Room.hotel_id).where(
+            and_(*AvailabilityService.free_room_conditions(check_in, check_out, num_guests))
+        )
+        return Hotel.hotel_id.in_(free_hotels)
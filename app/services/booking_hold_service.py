@@ -0,0 +1,196 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app import db
+from app.models.booking import Booking
+from app.models.booking_hold import BookingHold
+from app.services.room_night_service import RoomNightConflict
+
+
+class BookingHoldExpired(Exception):
+    """Booking không còn giữ được phòng để thanh toán"""
+
+
+class BookingHoldService:
+    """Giữ chỗ ngắn hạn cho booking thanh toán qua PayPal.
+
+    Booking được tạo ở trạng thái pending kèm một dòng booking_holds trong cùng transaction;
+    đêm phòng đã được giữ nguyên tử trong sổ room_nights nên phòng bị tính là đã đặt ngay.
+    Thanh toán xong thì hold chuyển thành booking confirmed; hủy thanh toán hoặc quá
+    expires_at thì booking bị hủy và các đêm được nhả (qua sự kiện flush của RoomNightService).
+    """
+
+    EXPIRED_REASON = 'Hết thời gian giữ phòng chờ thanh toán'
+    CANCELLED_REASON = 'Khách hủy thanh toán'
+
+    @staticmethod
+    def _expires_at(now=None):
+        return (now or datetime.utcnow()) + timedelta(seconds=current_app.config.get('BOOKING_HOLD_TTL', 900))
+
+    @staticmethod
+    def place(booking):
+        """Thêm hold cho booking vừa flush (chưa commit); booking phải ở trạng thái pending"""
+        hold = BookingHold(booking_id=booking.booking_id, expires_at=BookingHoldService._expires_at())
+        db.session.add(hold)
+        return hold
+
+    @staticmethod
+    def _locked(booking_id):
+        return BookingHold.query.filter_by(booking_id=booking_id).with_for_update().first()
+
+    @staticmethod
+    def secure(booking):
+        """Đảm bảo booking còn giữ phòng trước khi chuyển sang PayPal hoặc thu tiền, rồi commit.
+
+        Hold còn thì được gia hạn thêm một BOOKING_HOLD_TTL. Booking đã bị hủy vì hết hạn
+        được giữ lại nếu phòng còn trống; BookingHoldExpired nếu phòng đã có người đặt
+        hoặc booking bị hủy vì lý do khác.
+        """
+        hold = BookingHoldService._locked(booking.booking_id)
+        if booking.status == 'cancelled':
+            if booking.cancellation_reason != BookingHoldService.EXPIRED_REASON:
+                db.session.rollback()
+                raise BookingHoldExpired('Đơn đặt phòng đã bị hủy')
+            booking.status = 'pending'
+            booking.cancellation_reason = None
+            booking.cancelled_at = None
+        if hold is not None:
+            hold.expires_at = BookingHoldService._expires_at()
+        elif booking.status == 'pending':
+            db.session.add(BookingHold(booking_id=booking.booking_id, expires_at=BookingHoldService._expires_at()))
+        try:
+            db.session.commit()
+        except RoomNightConflict as e:
+            db.session.rollback()
+            raise BookingHoldExpired('Đã hết thời gian giữ phòng và phòng đã được đặt bởi khách khác') from e
+
+    @staticmethod
+    def convert(booking):
+        """Thanh toán thành công: bỏ hold, booking đang chờ chuyển sang confirmed (chưa commit)"""
+        hold = BookingHoldService._locked(booking.booking_id)
+        if hold is not None:
+            db.session.delete(hold)
+        if booking.status == 'pending':
+            booking.status = 'confirmed'
+
+    @staticmethod
+    def release(booking, reason=None):
+        """Hủy booking đang giữ chỗ và xóa hold (chưa commit); booking đã xác nhận không bị đụng tới"""
+        hold = BookingHoldService._locked(booking.booking_id)
+        if hold is None or booking.status != 'pending' or booking.payment_status == 'paid':
+            return False
+        db.session.delete(hold)
+        BookingHoldService._cancel(booking, reason or BookingHoldService.CANCELLED_REASON)
+        return True
+
+    @staticmethod
+    def _cancel(booking, reason):
+        booking.status = 'cancelled'
+        booking.cancellation_reason = reason
+        booking.cancelled_at = datetime.utcnow()
+
+    @staticmethod
+    def sweep(batch_size=200, now=None):
+        """Hủy các booking có hold đã hết hạn theo lô, mỗi lô một transaction; trả về số booking đã hủy.
+
+        Hold đang bị request khác khóa (đang thanh toán) được bỏ qua ở lần quét này.
+        """
+        table = BookingHold.__table__
+        now = now or datetime.utcnow()
+        released = 0
+        while True:
+            holds = BookingHold.query.filter(BookingHold.expires_at <= now)\
+                .order_by(BookingHold.expires_at)\
+                .limit(batch_size)\
+                .with_for_update(skip_locked=True).all()
+            if not holds:
+                break
+            booking_ids = [hold.booking_id for hold in holds]
+            for booking in Booking.query.filter(Booking.booking_id.in_(booking_ids)).all():
+                if booking.status == 'pending' and booking.payment_status != 'paid':
+                    BookingHoldService._cancel(booking, BookingHoldService.EXPIRED_REASON)
+                    released += 1
+            db.session.flush()
+            db.session.execute(table.delete().where(table.c.booking_id.in_(booking_ids)))
+            db.session.commit()
+            if len(holds) < batch_size:
+                break
+        return released
+
+
+class BookingHoldSweeper:
+    """Luồng nền dọn dẹp của luồng đặt phòng sau mỗi BOOKING_HOLD_SWEEP_INTERVAL giây:
+    hủy các hold hết hạn và xóa khóa idempotency hết hạn, đều theo lô.
+
+    Chỉ chạy trong process phục vụ web: BOOKING_HOLD_SWEEP_ENABLED mặc định tắt và được run.py bật;
+    app ở chế độ testing không chạy, còn luồng chỉ khởi động ở request đầu tiên nên các lệnh CLI
+    (flask db upgrade, room-nights rebuild...) không chạy luồng nền. Khi tắt phải chạy định kỳ từ
+    cron `flask booking-holds sweep` và `flask idempotency-keys purge`, nếu không phòng của các
+    booking bỏ dở thanh toán sẽ bị giữ mãi.
+    """
+
+    def __init__(self):
+        self._app = None
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+    def init_app(self, app):
+        from app.services.idempotency_service import idempotency_keys_cli
+
+        app.cli.add_command(booking_holds_cli)
+        app.cli.add_command(idempotency_keys_cli)
+        if not app.config.get('BOOKING_HOLD_SWEEP_ENABLED', False) or app.testing:
+            return
+        self._app = app
+        app.before_request(self.start)
+
+    def _run(self):
+        from app.services.idempotency_service import IdempotencyService
+
+        app = self._app
+        interval = app.config.get('BOOKING_HOLD_SWEEP_INTERVAL', 60)
+        batch_size = app.config.get('BOOKING_HOLD_SWEEP_BATCH_SIZE', 200)
+        purge_batch_size = app.config.get('IDEMPOTENCY_PURGE_BATCH_SIZE', 1000)
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    BookingHoldService.sweep(batch_size=batch_size)
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.exception(f'Lỗi dọn giữ chỗ hết hạn: {str(e)}')
+                try:
+                    IdempotencyService.purge_expired(batch_size=purge_batch_size)
+                except Exception as e:
+                    db.session.rollback()
+                    current_app.logger.exception(f'Lỗi xóa khóa idempotency hết hạn: {str(e)}')
+                finally:
+                    db.session.remove()
+
+    def start(self):
+        """Khởi động luồng nền (chỉ một lần cho mỗi process)"""
+        if self._worker is not None or self._app is None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='booking-hold-sweeper')
+                self._worker.daemon = True
+                self._worker.start()
+
+
+booking_hold_sweeper = BookingHoldSweeper()
+
+booking_holds_cli = AppGroup('booking-holds', help='Quản lý giữ chỗ chờ thanh toán.')
+
+
+@booking_holds_cli.command('sweep')
+@click.option('--batch-size', default=200, show_default=True, help='Số hold mỗi lô.')
+def sweep_command(batch_size):
+    """Hủy các booking có hold đã hết hạn và nhả phòng."""
+    released = BookingHoldService.sweep(batch_size=batch_size)
+    click.echo(f'Đã hủy {released} booking hết thời gian giữ phòng')
@@ -0,0 +1,111 @@
+from datetime import date
+
+from app import db
+from app.models.booking import Booking
+from app.models.booking_detail import BookingDetail
+from app.models.room import Room
+from app.services.availability_service import AvailabilityService
+from app.services.pricing_service import PricingService
+
+
+class CalendarService:
+    """Lịch phòng trống và giá theo đêm của mọi phòng trong khách sạn.
+
+    Các booking đang giữ chỗ giao khoảng ngày được đọc bằng một truy vấn, gom theo phòng rồi
+    sắp xếp theo ngày nhận phòng; lịch mỗi phòng được dựng thẳng từ các khoảng này, không lặp
+    theo từng đêm. Kết quả được nén run-length: danh sách [giá trị, số đêm] liên tiếp tính từ
+    ngày bắt đầu.
+    """
+
+    MAX_DAYS = 366
+
+    @staticmethod
+    def _append_run(runs, value, length):
+        if length <= 0:
+            return
+        if runs and runs[-1][0] == value:
+            runs[-1][1] += length
+        else:
+            runs.append([value, length])
+
+    @staticmethod
+    def availability_runs(blocked, num_days):
+        """[[1 còn trống / 0 đã kín, số đêm], ...] cho num_days đêm.
+
+        blocked: các khoảng đêm bị chiếm [begin, end) tính từ ngày bắt đầu (có thể giao nhau,
+        vượt ra ngoài [0, num_days)).
+        """
+        runs = []
+        cursor = 0
+        for begin, end in sorted(blocked):
+            begin, end = max(begin, cursor), min(end, num_days)
+            if end <= begin:
+                continue
+            CalendarService._append_run(runs, 1, begin - cursor)
+            CalendarService._append_run(runs, 0, end - begin)
+            cursor = end
+        CalendarService._append_run(runs, 1, num_days - cursor)
+        return runs
+
+    @staticmethod
+    def day_type_runs(start, num_days):
+        """[[0 đêm thường / 1 đêm cuối tuần, số đêm], ...]"""
+        runs = []
+        weekday = start.weekday()
+        for offset in range(num_days):
+            is_weekend = (weekday + offset) % 7 in PricingService.WEEKEND_NIGHTS
+            CalendarService._append_run(runs, 1 if is_weekend else 0, 1)
+        return runs
+
+    @staticmethod
+    def build(hotel_id, start, end):
+        """Lịch các đêm [start, end) của khách sạn.
+
+        availability của mỗi phòng: [[1 còn trống / 0 đã kín, số đêm], ...]. Giá theo đêm gồm
+        day_types chung (run-length [0 đêm thường / 1 đêm cuối tuần, số đêm]) và prices của mỗi
+        phòng [giá đêm thường, giá đêm cuối tuần]: giá đêm i là prices[loại của đêm i].
+        """
+        num_days = (end - start).days
+        rooms = db.session.query(Room.room_id, Room.room_name, Room.status, Room.base_price, Room.weekend_price)\
+            .filter(Room.hotel_id == hotel_id).order_by(Room.room_id).all()
+
+        intervals = db.session.query(BookingDetail.room_id, Booking.check_in_date, Booking.check_out_date)\
+            .join(Booking, Booking.booking_id == BookingDetail.booking_id)\
+            .filter(
+                Booking.hotel_id == hotel_id,
+                Booking.status.in_(AvailabilityService.BLOCKING_STATUSES),
+                Booking.check_in_date < end,
+                Booking.check_out_date > start
+            ).all() if rooms else []
+
+        # Các đêm đã qua không đặt được
+        past_days = min(max((date.today() - start).days, 0), num_days)
+        blocked = {room.room_id: [(0, past_days)] for room in rooms}
+        for room_id, check_in, check_out in intervals:
+            if room_id in blocked:
+                blocked[room_id].append(((check_in - start).days, (check_out - start).days))
+
+        def nightly_prices(room):
+            base_price = float(room.base_price or 0)
+            return [base_price, float(room.weekend_price) if room.weekend_price is not None else base_price]
+
+        def availability(room):
+            # Phòng đang bảo trì/không mở bán kín cả khoảng
+            if room.status != 'available':
+                return CalendarService.availability_runs([(0, num_days)], num_days)
+            return CalendarService.availability_runs(blocked[room.room_id], num_days)
+
+        return {
+            'hotel_id': hotel_id,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'num_days': num_days,
+            'day_types': CalendarService.day_type_runs(start, num_days),
+            'rooms': [{
+                'room_id': room.room_id,
+                'room_name': room.room_name,
+                'status': room.status,
+                'availability': availability(room),
+                'prices': nightly_prices(room)
+            } for room in rooms]
+        }
@@ -0,0 +1,48 @@
+from flask import current_app
+from sqlalchemy import func
+
+from app import db
+from app.services.search_cache import SearchResultCache, count_cache
+
+
+class CountService:
+    """Đếm tổng số kết quả tìm kiếm với chi phí có giới hạn.
+
+    Chỉ quét tối đa SEARCH_COUNT_EXACT_LIMIT + 1 id phân biệt: tập nhỏ được đếm chính xác,
+    tập lớn hơn trả về giá trị chặn trên (hiển thị "1000+"). Kết quả được lưu trong count_cache
+    (tách khỏi cache kết quả tìm kiếm) theo bộ lọc đã chuẩn hóa, không gồm trang và kiểu sắp xếp,
+    với TTL ngắn (SEARCH_COUNT_CACHE_TTL), nên chuyển trang không đếm lại.
+    """
+
+    # Tham số không ảnh hưởng đến tổng số kết quả
+    IGNORED_PARAMS = ('sort',)
+
+    @staticmethod
+    def make_key(endpoint, data):
+        filters = {key: value for key, value in data.items() if key not in CountService.IGNORED_PARAMS}
+        return SearchResultCache.make_key(f'{endpoint}:count', filters, None, None)
+
+    @staticmethod
+    def count_distinct(query, id_column, cache_key=None, destination=None):
+        """Trả về (total, is_exact) cho query đã lọc"""
+        if cache_key is not None:
+            cached = count_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        limit = current_app.config.get('SEARCH_COUNT_EXACT_LIMIT', 1000)
+        bounded = query.with_entities(id_column).distinct().limit(limit + 1).subquery()
+        count = db.session.query(func.count()).select_from(bounded).scalar() or 0
+        result = (min(count, limit), count <= limit)
+
+        if cache_key is not None:
+            count_cache.set(cache_key, destination, result)
+        return result
+
+    @staticmethod
+    def total_pages(total, is_exact, page, per_page, page_size):
+        """Số trang để hiển thị; khi tổng bị chặn và trang hiện tại đầy thì luôn còn trang sau"""
+        pages = (total + per_page - 1) // per_page if total > 0 else 1
+        if not is_exact and page >= pages and page_size >= per_page:
+            pages = page + 1
+        return pages
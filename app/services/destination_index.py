@@ -0,0 +1,176 @@
+import threading
+import time
+from array import array
+
+from app.utils.helpers import fold_diacritics
+
+
+class DestinationIndex:
+    """Chỉ mục đảo (token + trigram) trong bộ nhớ cho tìm kiếm điểm đến.
+
+    Văn bản city/address/hotel_name của khách sạn active được bỏ dấu trước khi đánh chỉ mục,
+    nên 'Da Nang' khớp với 'Đà Nẵng'. Kết quả tương đương ilike('%x%') trên từng trường
+    sau khi bỏ dấu: trigram hiếm nhất cho ra tập ứng viên, sau đó kiểm tra chuỗi con.
+
+    Danh sách posting chỉ được nối thêm; khách sạn bị sửa/xóa để lại posting cũ và
+    bị loại ở bước kiểm tra. Lần rebuild định kỳ sẽ dọn các posting này.
+
+    Posting đã công bố không bao giờ bị sửa: upsert tạo bản sao chỉ của các posting có khóa
+    của khách sạn, nối hotel_id rồi gán lại vào từ điển trong khóa. Nhờ vậy search() chỉ giữ
+    khóa khi lấy tham chiếu posting và kiểm tra ứng viên ngoài khóa.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._texts = {}
+        self._trigrams = {}
+        self._tokens = {}
+        self._built_at = None
+
+    @property
+    def is_ready(self):
+        return self._built_at is not None
+
+    @property
+    def size(self):
+        return len(self._texts)
+
+    def is_stale(self, max_age):
+        return self._built_at is None or (max_age and time.monotonic() - self._built_at > max_age)
+
+    @staticmethod
+    def _trigrams_of(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    @staticmethod
+    def _fold_fields(city, address, hotel_name):
+        return tuple(fold_diacritics(value) for value in (city, address, hotel_name))
+
+    @staticmethod
+    def _keys_of(texts):
+        grams = set()
+        tokens = set()
+        for text in texts:
+            grams.update(DestinationIndex._trigrams_of(text))
+            tokens.update(text.split())
+        return grams, tokens
+
+    @staticmethod
+    def _add(texts_map, trigrams_map, tokens_map, hotel_id, texts):
+        texts_map[hotel_id] = texts
+        grams, tokens = DestinationIndex._keys_of(texts)
+        for gram in grams:
+            posting = trigrams_map.get(gram)
+            if posting is None:
+                posting = trigrams_map[gram] = array('I')
+            posting.append(hotel_id)
+        for token in tokens:
+            posting = tokens_map.get(token)
+            if posting is None:
+                posting = tokens_map[token] = array('I')
+            posting.append(hotel_id)
+
+    def build(self, rows):
+        """Xây lại toàn bộ chỉ mục từ các bộ (hotel_id, city, address, hotel_name)"""
+        texts_map, trigrams_map, tokens_map = {}, {}, {}
+        for hotel_id, city, address, hotel_name in rows:
+            DestinationIndex._add(texts_map, trigrams_map, tokens_map, hotel_id,
+                                  DestinationIndex._fold_fields(city, address, hotel_name))
+        with self._lock:
+            self._texts = texts_map
+            self._trigrams = trigrams_map
+            self._tokens = tokens_map
+            self._built_at = time.monotonic()
+
+    def rebuild_from_db(self):
+        from app import db
+        from app.models.hotel import Hotel
+
+        rows = db.session.query(
+            Hotel.hotel_id, Hotel.city, Hotel.address, Hotel.hotel_name
+        ).filter(Hotel.status == 'active').yield_per(5000)
+        self.build(rows)
+
+    def ensure_fresh(self, max_age):
+        """Rebuild khi chỉ mục chưa có hoặc đã quá max_age giây.
+
+        Lần đầu các request chờ nhau; các lần sau request khác tiếp tục dùng chỉ mục cũ.
+        """
+        if not self.is_stale(max_age):
+            return
+        if not self._rebuild_lock.acquire(blocking=not self.is_ready):
+            return
+        try:
+            if self.is_stale(max_age):
+                self.rebuild_from_db()
+        finally:
+            self._rebuild_lock.release()
+
+    @staticmethod
+    def _publish(postings_map, keys, hotel_id):
+        # Sao chép posting của từng khóa rồi mới nối: bản cũ mà search() đang đọc giữ nguyên
+        for key in keys:
+            posting = array('I', postings_map.get(key, ()))
+            posting.append(hotel_id)
+            postings_map[key] = posting
+
+    def upsert(self, hotel_id, city, address, hotel_name):
+        texts = DestinationIndex._fold_fields(city, address, hotel_name)
+        grams, tokens = DestinationIndex._keys_of(texts)
+        with self._lock:
+            if self._texts.get(hotel_id) == texts:
+                return
+            self._texts[hotel_id] = texts
+            DestinationIndex._publish(self._trigrams, grams, hotel_id)
+            DestinationIndex._publish(self._tokens, tokens, hotel_id)
+
+    def remove(self, hotel_id):
+        with self._lock:
+            self._texts.pop(hotel_id, None)
+
+    def sync_hotel(self, hotel):
+        """Cập nhật chỉ mục theo trạng thái hiện tại của khách sạn (chỉ khách sạn active được tìm thấy)"""
+        if not self.is_ready:
+            return
+        if hotel.status == 'active':
+            self.upsert(hotel.hotel_id, hotel.city, hotel.address, hotel.hotel_name)
+        else:
+            self.remove(hotel.hotel_id)
+
+    def search(self, query, limit=None):
+        """Trả về set hotel_id khớp với query, hoặc None nếu query rỗng sau khi bỏ dấu
+        hay có nhiều hơn limit khách sạn khớp (dừng kiểm tra ngay khi vượt limit)"""
+        folded = fold_diacritics(query)
+        if not folded:
+            return None
+
+        with self._lock:
+            texts = self._texts
+            if len(folded) >= 3:
+                postings = []
+                for gram in DestinationIndex._trigrams_of(folded):
+                    posting = self._trigrams.get(gram)
+                    if posting is None:
+                        return set()
+                    postings.append(posting)
+                candidate_postings = [min(postings, key=len)]
+            else:
+                # Query ngắn nằm gọn trong một token: quét từ vựng thay vì trigram. upsert có thể
+                # thêm khóa vào từ điển nên việc duyệt nằm trong khóa
+                candidate_postings = [posting for token, posting in self._tokens.items() if folded in token]
+
+        candidates = set()
+        for posting in candidate_postings:
+            candidates.update(posting)
+
+        matches = set()
+        for hotel_id in candidates:
+            hotel_texts = texts.get(hotel_id)
+            if hotel_texts and any(folded in text for text in hotel_texts):
+                matches.add(hotel_id)
+                if limit is not None and len(matches) > limit:
+                    return None
+        return matches
+
+destination_index = DestinationIndex()
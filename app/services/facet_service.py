@@ -0,0 +1,88 @@
+from sqlalchemy import case, func
+
+from app import db
+from app.models.cancellation_policy import CancellationPolicy
+from app.models.hotel import Hotel
+from app.models.hotel_amenity import hotel_amenities
+from app.services.search_cache import SearchResultCache, search_cache
+from app.services.search_service import SearchService
+
+
+class FacetService:
+    """Đếm số khách sạn theo từng giá trị bộ lọc (facet) trên tập kết quả đã lọc.
+
+    Hạng sao, hủy miễn phí, khuyến mãi và nổi bật được đếm trong một truy vấn GROUP BY star_rating;
+    tiện nghi được đếm bằng một truy vấn GROUP BY trên hotel_amenities. Cả hai dùng chung
+    tập hotel_id đã lọc làm subquery, nên số truy vấn không phụ thuộc số giá trị facet.
+    """
+
+    # Tham số không ảnh hưởng đến tập kết quả
+    IGNORED_PARAMS = ('sort',)
+
+    @staticmethod
+    def make_key(endpoint, data):
+        filters = {key: value for key, value in data.items() if key not in FacetService.IGNORED_PARAMS}
+        return SearchResultCache.make_key(f'{endpoint}:facets', filters, None, None)
+
+    @staticmethod
+    def get_facets(build_query, cache_key=None, destination=None):
+        """build_query: hàm không đối số trả về query Hotel đã lọc; chỉ được gọi khi trượt cache
+        nên lần trúng cache không tốn công dựng bộ lọc (chỉ mục điểm đến, lưới geo...)"""
+        if cache_key is not None:
+            cached = search_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        facets = FacetService.compute(build_query())
+
+        if cache_key is not None:
+            search_cache.set(cache_key, destination, facets)
+        return facets
+
+    @staticmethod
+    def compute(query):
+        """query: query Hotel đã áp dụng bộ lọc (chưa sắp xếp/phân trang)"""
+        hotel_ids = query.with_entities(Hotel.hotel_id).distinct().subquery()
+
+        free_cancel = Hotel.cancellation_policies.any(CancellationPolicy.refund_percentage == 100.00)
+        has_promotion = SearchService.promotion_filter()
+
+        rows = db.session.query(
+            Hotel.star_rating,
+            func.count(Hotel.hotel_id),
+            func.sum(case((free_cancel, 1), else_=0)),
+            func.sum(case((has_promotion, 1), else_=0)),
+            func.sum(case((Hotel.is_featured.is_(True), 1), else_=0))
+        ).filter(Hotel.hotel_id.in_(db.session.query(hotel_ids.c.hotel_id)))\
+         .group_by(Hotel.star_rating).all()
+
+        star_rating = {}
+        free_cancel_count = promotion_count = featured_count = 0
+        for star, count, free_count, promo_count, featured in rows:
+            if star is not None:
+                star_rating[int(star)] = int(count)
+            free_cancel_count += int(free_count or 0)
+            promotion_count += int(promo_count or 0)
+            featured_count += int(featured or 0)
+
+        amenity_rows = db.session.query(
+            hotel_amenities.c.amenity_id,
+            func.count(hotel_amenities.c.hotel_id)
+        ).filter(hotel_amenities.c.hotel_id.in_(db.session.query(hotel_ids.c.hotel_id)))\
+         .group_by(hotel_amenities.c.amenity_id).all()
+
+        # Bộ lọc sao trên trang tìm kiếm là "từ N sao trở lên" nên kèm số đếm cộng dồn
+        star_rating_at_least = {}
+        running = 0
+        for star in range(5, 0, -1):
+            running += star_rating.get(star, 0)
+            star_rating_at_least[star] = running
+
+        return {
+            'star_rating': star_rating,
+            'star_rating_at_least': star_rating_at_least,
+            'amenities': {int(amenity_id): int(count) for amenity_id, count in amenity_rows},
+            'free_cancel': free_cancel_count,
+            'has_promotion': promotion_count,
+            'is_featured': featured_count
+        }
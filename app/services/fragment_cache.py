@@ -0,0 +1,127 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+
+class FragmentCache:
+    """Cache đoạn HTML đã render (LRU có giới hạn + TTL) cho template Jinja và route.
+
+    Khóa gồm tên đoạn và các phần phiên bản (ví dụ hotel_id, updated_at, giá/đánh giá hiển thị);
+    thực thể thay đổi thì phiên bản đổi nên khóa cũ tự hết dùng, TTL chỉ là giới hạn trên.
+    Phần phụ thuộc người dùng (user_logged_in, yêu thích, form) phải nằm ngoài khối cache.
+    Thống kê theo template: số lần trúng/trượt, thời gian render khi trượt và thời gian ước tính
+    tiết kiệm được (số lần trúng x thời gian render trung bình).
+    """
+
+    def __init__(self, max_size=2000, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = True
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def init_app(self, app):
+        self.enabled = app.config.get('FRAGMENT_CACHE_ENABLED', True)
+        self.max_size = app.config.get('FRAGMENT_CACHE_MAX_SIZE', 2000)
+        self.ttl = app.config.get('FRAGMENT_CACHE_TTL', 300)
+        app.jinja_env.add_extension(FragmentCacheExtension)
+
+    @staticmethod
+    def make_key(name, parts):
+        digest = hashlib.sha1(
+            json.dumps(list(parts), default=str, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        ).hexdigest()
+        return f'{name}:{digest}'
+
+    def _template_stats(self, template):
+        stats = self._stats.get(template)
+        if stats is None:
+            stats = self._stats[template] = {'hits': 0, 'misses': 0, 'render_ms': 0.0}
+        return stats
+
+    def cached(self, name, parts, render, ttl=None, template=None):
+        """Trả về HTML của đoạn `name` với các phần khóa `parts`; gọi render() khi chưa có trong cache"""
+        if not self.enabled:
+            return render()
+
+        template = template or name
+        key = self.make_key(name, parts)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= now:
+                self._entries.move_to_end(key)
+                self._template_stats(template)['hits'] += 1
+                return entry[1]
+
+        started = time.perf_counter()
+        html = Markup(render())
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            stats = self._template_stats(template)
+            stats['misses'] += 1
+            stats['render_ms'] += elapsed_ms
+            self._entries[key] = (now + (ttl if ttl is not None else self.ttl), html)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            templates = {}
+            for template, stats in self._stats.items():
+                avg_render_ms = stats['render_ms'] / stats['misses'] if stats['misses'] else 0.0
+                templates[template] = {
+                    'hits': stats['hits'],
+                    'misses': stats['misses'],
+                    'avg_render_ms': round(avg_render_ms, 3),
+                    'saved_ms': round(stats['hits'] * avg_render_ms, 1)
+                }
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'templates': templates
+            }
+
+
+class FragmentCacheExtension(Extension):
+    """Thẻ {% cache 'tên', phần_khóa_1, phần_khóa_2, ttl=300 %} ... {% endcache %}"""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        name = parser.parse_expression()
+        parts = []
+        ttl = nodes.Const(None)
+        while parser.stream.skip_if('comma'):
+            if parser.stream.current.test('name:ttl') and parser.stream.look().test('assign'):
+                next(parser.stream)
+                next(parser.stream)
+                ttl = parser.parse_expression()
+            else:
+                parts.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        call = self.call_method('_render_cached', [nodes.Const(parser.name), name, nodes.List(parts), ttl])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, template, name, parts, ttl, caller):
+        return fragment_cache.cached(name, parts, caller, ttl=ttl, template=template)
+
+
+fragment_cache = FragmentCache()
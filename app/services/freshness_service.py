@@ -0,0 +1,173 @@
+import hashlib
+import json
+from datetime import datetime
+
+from sqlalchemy import DateTime, and_, case, func, literal, null, select, type_coerce, union_all
+
+from app import db
+from app.models.booking import Booking
+from app.models.cancellation_policy import CancellationPolicy
+from app.models.hotel import Hotel
+from app.models.hotel_amenity import hotel_amenities
+from app.models.hotel_image import HotelImage
+from app.models.hotel_stats import HotelStats
+from app.models.promotion import Promotion
+from app.models.review import Review
+from app.models.room import Room
+from app.models.room_amenity import room_amenities
+from app.models.room_image import RoomImage
+from app.models.user import User
+from app.utils.conditional import CacheValidator
+
+
+class FreshnessService:
+    """Dấu vết dữ liệu nguồn của các trang chi tiết/danh sách, dùng làm validator cho GET có điều kiện.
+
+    Mỗi bảng nguồn góp một dòng (số bản ghi, tổng id, tổng kiểm tra, max(updated_at));
+    các dòng được gộp bằng UNION ALL nên chỉ tốn một lượt truy vấn, chạy trên chỉ mục khóa ngoại
+    và không nạp bản ghi nào. Số bản ghi và tổng id đổi khi thêm/xóa, max(updated_at) đổi khi sửa.
+    """
+
+    # Nguồn của danh sách phòng trong dấu vết của khách sạn/phòng
+    ROOM_PARTS = ('rooms', 'room_images', 'room_amenities')
+
+    @staticmethod
+    def _part(name, id_column, condition, updated_column=None, checksum=None, select_from=None):
+        statement = select(
+            literal(name).label('name'),
+            func.count().label('row_count'),
+            func.coalesce(func.sum(id_column), 0).label('id_sum'),
+            func.coalesce(func.sum(checksum), 0).label('checksum') if checksum is not None
+            else literal(0).label('checksum'),
+            type_coerce(func.max(updated_column), DateTime).label('last_modified') if updated_column is not None
+            else type_coerce(null(), DateTime).label('last_modified')
+        ).where(condition)
+        if select_from is not None:
+            statement = statement.select_from(select_from)
+        return statement
+
+    @staticmethod
+    def _collect(parts):
+        rows = db.session.execute(union_all(*parts)).all()
+        return {row.name: row for row in rows}
+
+    @staticmethod
+    def _validator(rows, private=False, extra=()):
+        sources = {name: (name, row.row_count, int(row.id_sum), int(row.checksum), row.last_modified)
+                   for name, row in rows.items()}
+        parts = [sources[name] for name in sorted(sources)]
+        modified = [row.last_modified for row in rows.values() if row.last_modified is not None]
+        return CacheValidator([*parts, *extra], max(modified) if modified else None, private=private,
+                              sources=sources)
+
+    @staticmethod
+    def version(validator, names):
+        """Phiên bản của một phần dữ liệu trong dấu vết (vd. ROOM_PARTS), không tốn thêm truy vấn;
+        dùng làm khóa cache đoạn HTML thay cho chính dữ liệu"""
+        payload = json.dumps([validator.sources.get(name) for name in names], default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _primary_image(image_model):
+        # Đổi ảnh chính không thay đổi số lượng ảnh
+        return case((image_model.is_primary.is_(True), image_model.image_id), else_=0)
+
+    @staticmethod
+    def _room_parts(room_condition):
+        room_ids = select(Room.room_id).where(room_condition)
+        return [
+            FreshnessService._part('rooms', Room.room_id, room_condition, Room.updated_at),
+            FreshnessService._part('room_images', RoomImage.image_id, RoomImage.room_id.in_(room_ids),
+                                   checksum=FreshnessService._primary_image(RoomImage)),
+            FreshnessService._part('room_amenities', room_amenities.c.amenity_id,
+                                   room_amenities.c.room_id.in_(room_ids),
+                                   checksum=room_amenities.c.room_id * room_amenities.c.amenity_id,
+                                   select_from=room_amenities)
+        ]
+
+    @staticmethod
+    def hotel(hotel_id, user_id=None):
+        """Validator cho trang chi tiết khách sạn (phụ thuộc người dùng). None khi không có khách sạn"""
+        parts = [
+            FreshnessService._part('hotel', Hotel.hotel_id, Hotel.hotel_id == hotel_id, Hotel.updated_at),
+            FreshnessService._part('hotel_images', HotelImage.image_id, HotelImage.hotel_id == hotel_id,
+                                   checksum=FreshnessService._primary_image(HotelImage)),
+            FreshnessService._part('hotel_amenities', hotel_amenities.c.amenity_id,
+                                   hotel_amenities.c.hotel_id == hotel_id, select_from=hotel_amenities),
+            FreshnessService._part('policies', CancellationPolicy.policy_id,
+                                   CancellationPolicy.hotel_id == hotel_id, CancellationPolicy.updated_at),
+            FreshnessService._part('reviews', Review.review_id, Review.hotel_id == hotel_id, Review.updated_at),
+            FreshnessService._part('reviewers', User.user_id,
+                                   User.user_id.in_(select(Review.user_id).where(Review.hotel_id == hotel_id)),
+                                   User.updated_at),
+            *FreshnessService._room_parts(Room.hotel_id == hotel_id)
+        ]
+        if user_id:
+            # Danh sách booking có thể đánh giá của người dùng hiện tại
+            parts.append(FreshnessService._part(
+                'bookings', Booking.booking_id,
+                and_(Booking.user_id == user_id, Booking.hotel_id == hotel_id), Booking.updated_at
+            ))
+        rows = FreshnessService._collect(parts)
+        if not rows['hotel'].row_count:
+            return None
+        return FreshnessService._validator(rows, private=True)
+
+    @staticmethod
+    def hotel_rooms(hotel_id):
+        """Validator cho danh sách phòng của khách sạn. None khi không có khách sạn"""
+        rows = FreshnessService._collect([
+            FreshnessService._part('hotel', Hotel.hotel_id, Hotel.hotel_id == hotel_id),
+            *FreshnessService._room_parts(Room.hotel_id == hotel_id)
+        ])
+        if not rows['hotel'].row_count:
+            return None
+        return FreshnessService._validator(rows)
+
+    @staticmethod
+    def room(room_id):
+        """Validator cho chi tiết phòng (kèm khách sạn). None khi không có phòng"""
+        rows = FreshnessService._collect([
+            FreshnessService._part('hotel', Hotel.hotel_id,
+                                   Hotel.hotel_id.in_(select(Room.hotel_id).where(Room.room_id == room_id)),
+                                   Hotel.updated_at),
+            *FreshnessService._room_parts(Room.room_id == room_id)
+        ])
+        if not rows['rooms'].row_count:
+            return None
+        return FreshnessService._validator(rows)
+
+    @staticmethod
+    def hotel_list(query, extra=()):
+        """Validator cho danh sách khách sạn; query: query Hotel đã lọc, chưa sắp xếp/phân trang.
+
+        Trả về (validator, tổng số khách sạn) vì số đếm đã có sẵn trong dấu vết.
+        """
+        hotel_ids = query.with_entities(Hotel.hotel_id)
+        rows = FreshnessService._collect([
+            FreshnessService._part('hotels', Hotel.hotel_id, Hotel.hotel_id.in_(hotel_ids), Hotel.updated_at),
+            FreshnessService._part('hotel_images', HotelImage.image_id, HotelImage.hotel_id.in_(hotel_ids),
+                                   checksum=FreshnessService._primary_image(HotelImage)),
+            # Thứ tự theo đánh giá/lượt đánh giá lấy từ hotel_stats
+            FreshnessService._part('hotel_stats', HotelStats.hotel_id, HotelStats.hotel_id.in_(hotel_ids),
+                                   HotelStats.updated_at)
+        ])
+        return FreshnessService._validator(rows, private=True, extra=extra), rows['hotels'].row_count
+
+    @staticmethod
+    def active_promotions(now=None):
+        """Validator cho danh sách khuyến mãi đang hoạt động (kèm khách sạn/phòng)"""
+        now = now or datetime.utcnow()
+        active = and_(Promotion.is_active.is_(True), Promotion.start_date <= now, Promotion.end_date >= now)
+        rows = FreshnessService._collect([
+            FreshnessService._part('promotions', Promotion.promotion_id, active, Promotion.updated_at),
+            # Khuyến mãi vào/ra khỏi tập đang hoạt động theo thời gian mà không đổi updated_at
+            FreshnessService._part('started', Promotion.promotion_id, active, Promotion.start_date),
+            FreshnessService._part('ended', Promotion.promotion_id,
+                                   and_(Promotion.is_active.is_(True), Promotion.end_date < now), Promotion.end_date),
+            FreshnessService._part('hotels', Hotel.hotel_id,
+                                   Hotel.hotel_id.in_(select(Promotion.hotel_id).where(active)), Hotel.updated_at),
+            FreshnessService._part('rooms', Room.room_id,
+                                   Room.room_id.in_(select(Promotion.room_id).where(active)), Room.updated_at)
+        ])
+        return FreshnessService._validator(rows)
@@ -0,0 +1,188 @@
+import itertools
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import selectinload
+
+
+class HomeSnapshot:
+    """Ảnh chụp dữ liệu trang chủ (khách sạn nổi bật, thành phố phổ biến, khuyến mãi) dựng sẵn.
+
+    Dữ liệu là dict/list thuần, không gắn với session nên request chỉ đọc tham chiếu hiện tại,
+    không truy vấn CSDL. Luồng nền dựng lại sau mỗi HOME_SNAPSHOT_REFRESH_INTERVAL giây hoặc
+    sớm hơn khi khách sạn/ảnh/phòng/đánh giá/khuyến mãi thay đổi, rồi thay tham chiếu một lần (nguyên tử).
+    """
+
+    # Mỗi lần dựng có một phiên bản riêng, dùng làm khóa cache đoạn HTML của trang chủ
+    _versions = itertools.count(1)
+
+    FEATURED_LIMIT = 6
+    CITY_LIMIT = 6
+    PROMOTION_LIMIT = 2
+
+    def __init__(self):
+        self._data = None
+        self._built_at = None
+        self._app = None
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._changed = threading.Event()
+
+    @property
+    def enabled(self):
+        return self._app is not None
+
+    def init_app(self, app):
+        from app import db
+
+        if not app.config.get('HOME_SNAPSHOT_ENABLED', True):
+            return
+        self._app = app
+        if not event.contains(db.session, 'after_flush', HomeSnapshot._after_flush):
+            event.listen(db.session, 'after_flush', HomeSnapshot._after_flush)
+            event.listen(db.session, 'after_commit', HomeSnapshot._after_commit)
+            event.listen(db.session, 'after_rollback', HomeSnapshot._after_rollback)
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        from app.models.hotel import Hotel
+        from app.models.hotel_image import HotelImage
+        from app.models.promotion import Promotion
+        from app.models.review import Review
+        from app.models.room import Room
+
+        tracked = (Hotel, HotelImage, Promotion, Review, Room)
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, tracked):
+                session.info['home_snapshot_changed'] = True
+                return
+
+    @staticmethod
+    def _after_commit(session):
+        if session.info.pop('home_snapshot_changed', False):
+            home_snapshot.mark_changed()
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop('home_snapshot_changed', None)
+
+    def mark_changed(self):
+        """Báo cho luồng nền dựng lại ảnh chụp"""
+        self._changed.set()
+
+    @staticmethod
+    def build():
+        """Đọc dữ liệu trang chủ từ CSDL và trả về dict thuần"""
+        from app import db
+        from app.models.hotel import Hotel
+        from app.models.hotel_image import HotelImage
+        from app.services.promotion_index import promotion_index
+        from app.services.search_service import SearchService
+
+        featured_hotels = Hotel.query.filter_by(status='active', is_featured=True)\
+            .options(selectinload(Hotel.images), selectinload(Hotel.amenities))\
+            .limit(HomeSnapshot.FEATURED_LIMIT).all()
+        summaries = SearchService.get_hotel_summaries([hotel.hotel_id for hotel in featured_hotels])
+        hotels_data = []
+        for hotel in featured_hotels:
+            hotel_dict = hotel.to_dict()
+            hotel_dict['images'] = [image.to_dict() for image in hotel.images]
+            hotel_dict['amenities'] = [amenity.to_dict() for amenity in hotel.amenities]
+            hotels_data.append({'hotel': hotel_dict, **summaries[hotel.hotel_id]})
+
+        cities = db.session.query(
+            Hotel.city,
+            func.count(Hotel.hotel_id).label('hotel_count')
+        ).filter_by(status='active')\
+         .group_by(Hotel.city)\
+         .order_by(func.count(Hotel.hotel_id).desc())\
+         .limit(HomeSnapshot.CITY_LIMIT).all()
+
+        # Ảnh đại diện mỗi thành phố: ảnh có id nhỏ nhất của khách sạn active, một truy vấn cho tất cả
+        city_names = [city_name for city_name, _ in cities]
+        first_images = db.session.query(Hotel.city, func.min(HotelImage.image_id))\
+            .join(HotelImage, HotelImage.hotel_id == Hotel.hotel_id)\
+            .filter(Hotel.status == 'active', Hotel.city.in_(city_names))\
+            .group_by(Hotel.city).all() if city_names else []
+        image_urls = dict(db.session.query(HotelImage.image_id, HotelImage.image_url)
+                          .filter(HotelImage.image_id.in_([image_id for _, image_id in first_images])).all()) \
+            if first_images else {}
+        city_images = {city_name: image_urls.get(image_id) for city_name, image_id in first_images}
+        popular_cities = [{
+            'name': city_name,
+            'count': count,
+            'image': city_images.get(city_name)
+        } for city_name, count in cities]
+
+        active = promotion_index.active()
+        promotions = [{
+            key: entry[key] for key in ('promotion_id', 'hotel_id', 'title', 'description', 'discount_type',
+                                        'discount_value', 'start_date', 'end_date', 'min_nights', 'hotel')
+        } for entry in active[:HomeSnapshot.PROMOTION_LIMIT]]
+
+        return {
+            'featured_hotels': hotels_data,
+            'popular_cities': popular_cities,
+            'active_promotions': promotions,
+            # Ngày kết thúc (tăng dần) của mọi khuyến mãi đang chạy: get() đếm lại số còn hiệu lực
+            'promotion_end_dates': sorted(entry['end_date'] for entry in active),
+            'total_promotions_count': len(active),
+            'version': next(HomeSnapshot._versions)
+        }
+
+    def swap(self, data):
+        # Gán tham chiếu là nguyên tử: request đang chạy vẫn đọc bản cũ
+        self._data = data
+        self._built_at = time.monotonic()
+
+    def _run(self):
+        from app import db
+
+        app = self._app
+        interval = app.config.get('HOME_SNAPSHOT_REFRESH_INTERVAL', 60)
+        debounce = app.config.get('HOME_SNAPSHOT_DEBOUNCE', 2)
+        while True:
+            with app.app_context():
+                try:
+                    self.swap(self.build())
+                except Exception as e:
+                    print(f'Lỗi dựng dữ liệu trang chủ: {str(e)}')
+                finally:
+                    db.session.remove()
+
+            if self._changed.wait(timeout=interval):
+                # Gom các thay đổi liên tiếp vào một lần dựng lại
+                time.sleep(debounce)
+                self._changed.clear()
+
+    def start(self):
+        """Khởi động luồng nền (chỉ một lần cho mỗi process)"""
+        if self._worker is not None or self._app is None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='home-snapshot')
+                self._worker.daemon = True
+                self._worker.start()
+
+    def get(self):
+        """Ảnh chụp hiện tại; khuyến mãi đã hết hạn kể từ lần dựng bị ẩn và không được tính vào
+        total_promotions_count. None khi bị tắt hoặc chưa dựng"""
+        self.start()
+        data = self._data
+        if data is None:
+            return None
+
+        now = datetime.utcnow()
+        promotions = data['active_promotions']
+        if any(promotion['end_date'] < now for promotion in promotions):
+            data = dict(data, active_promotions=[promotion for promotion in promotions
+                                                 if promotion['end_date'] >= now])
+        end_dates = data['promotion_end_dates']
+        return dict(data, total_promotions_count=len(end_dates) - bisect_left(end_dates, now))
+
+
+home_snapshot = HomeSnapshot()
@@ -0,0 +1,169 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, select, literal, inspect as sa_inspect
+from sqlalchemy.sql import expression
+from datetime import datetime
+from itertools import chain
+
+from app import db
+from app.models.hotel import Hotel
+from app.models.room import Room
+from app.models.review import Review
+from app.models.cancellation_policy import CancellationPolicy
+from app.models.promotion import Promotion
+from app.models.hotel_stats import HotelStats
+
+
+class HotelStatsService:
+    """Duy trì bảng hotel_stats (read model) từ các thay đổi trên rooms, reviews, policies, promotions"""
+
+    TRACKED_MODELS = (Room, Review, CancellationPolicy, Promotion)
+    REVIEW_CRITERIA = ('cleanliness_rating', 'service_rating', 'facilities_rating', 'location_rating')
+
+    @staticmethod
+    def init_app(app):
+        if not event.contains(db.session, 'after_flush', HotelStatsService._after_flush):
+            event.listen(db.session, 'after_flush', HotelStatsService._after_flush)
+        app.cli.add_command(hotel_stats_cli)
+
+    @staticmethod
+    def _collect_hotel_ids(session):
+        hotel_ids = set()
+        for obj in chain(session.new, session.dirty, session.deleted):
+            if not isinstance(obj, HotelStatsService.TRACKED_MODELS):
+                continue
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+
+            # Lấy cả hotel_id cũ để cập nhật khách sạn bị chuyển đi
+            history = sa_inspect(obj).attrs.hotel_id.history
+            for hotel_id in chain(history.added or (), history.unchanged or (), history.deleted or ()):
+                if hotel_id is not None:
+                    hotel_ids.add(hotel_id)
+        return hotel_ids
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        hotel_ids = HotelStatsService._collect_hotel_ids(session)
+        if hotel_ids:
+            HotelStatsService.refresh(hotel_ids, connection=session.connection())
+
+    @staticmethod
+    def _stats_select(hotel_ids, now):
+        room_sq = select(
+            Room.hotel_id.label('hotel_id'),
+            func.min(Room.base_price).label('min_price'),
+            func.max(Room.base_price).label('max_price'),
+            func.count(Room.room_id).label('room_count')
+        ).where(
+            Room.hotel_id.in_(hotel_ids),
+            Room.status == 'available'
+        ).group_by(Room.hotel_id).subquery()
+
+        review_columns = [
+            Review.hotel_id.label('hotel_id'),
+            func.count(Review.review_id).label('review_count'),
+            func.coalesce(func.sum(Review.rating), 0).label('rating_sum')
+        ]
+        for criterion in HotelStatsService.REVIEW_CRITERIA:
+            column = getattr(Review, criterion)
+            review_columns.append(func.coalesce(func.sum(column), 0).label(f'{criterion}_sum'))
+            review_columns.append(func.count(column).label(f'{criterion}_count'))
+        review_sq = select(*review_columns).where(
+            Review.hotel_id.in_(hotel_ids),
+            Review.status == 'active'
+        ).group_by(Review.hotel_id).subquery()
+
+        policy_sq = select(
+            CancellationPolicy.hotel_id.label('hotel_id'),
+            func.count(CancellationPolicy.policy_id).label('free_cancel_count')
+        ).where(
+            CancellationPolicy.hotel_id.in_(hotel_ids),
+            CancellationPolicy.refund_percentage == 100.00
+        ).group_by(CancellationPolicy.hotel_id).subquery()
+
+        promotion_sq = select(
+            Promotion.hotel_id.label('hotel_id'),
+            func.count(Promotion.promotion_id).label('promotion_count')
+        ).where(
+            Promotion.hotel_id.in_(hotel_ids),
+            Promotion.is_active == True,
+            Promotion.start_date <= now,
+            Promotion.end_date >= now
+        ).group_by(Promotion.hotel_id).subquery()
+
+        columns = [
+            Hotel.hotel_id,
+            room_sq.c.min_price,
+            room_sq.c.max_price,
+            func.coalesce(room_sq.c.room_count, 0),
+            func.coalesce(review_sq.c.review_count, 0),
+            func.coalesce(review_sq.c.rating_sum, 0)
+        ]
+        for criterion in HotelStatsService.REVIEW_CRITERIA:
+            columns.append(func.coalesce(review_sq.c[f'{criterion}_sum'], 0))
+            columns.append(func.coalesce(review_sq.c[f'{criterion}_count'], 0))
+        columns.append(expression.case((policy_sq.c.free_cancel_count > 0, expression.true()), else_=expression.false()))
+        columns.append(func.coalesce(promotion_sq.c.promotion_count, 0))
+        columns.append(literal(now, db.DateTime))
+
+        return select(*columns)\
+            .outerjoin(room_sq, room_sq.c.hotel_id == Hotel.hotel_id)\
+            .outerjoin(review_sq, review_sq.c.hotel_id == Hotel.hotel_id)\
+            .outerjoin(policy_sq, policy_sq.c.hotel_id == Hotel.hotel_id)\
+            .outerjoin(promotion_sq, promotion_sq.c.hotel_id == Hotel.hotel_id)\
+            .where(Hotel.hotel_id.in_(hotel_ids))
+
+    @staticmethod
+    def refresh(hotel_ids, connection=None):
+        """Tính lại hàng hotel_stats cho các khách sạn được chỉ định (xóa rồi chèn lại trong cùng transaction)"""
+        hotel_ids = sorted(set(hotel_ids))
+        if not hotel_ids:
+            return 0
+
+        connection = connection if connection is not None else db.session.connection()
+        stats_table = HotelStats.__table__
+        target_columns = [
+            'hotel_id', 'min_price', 'max_price', 'room_count', 'review_count', 'rating_sum'
+        ]
+        for criterion in HotelStatsService.REVIEW_CRITERIA:
+            target_columns.extend([f'{criterion}_sum', f'{criterion}_count'])
+        target_columns.extend(['has_free_cancellation', 'active_promotion_count', 'updated_at'])
+
+        connection.execute(stats_table.delete().where(stats_table.c.hotel_id.in_(hotel_ids)))
+        result = connection.execute(
+            stats_table.insert().from_select(
+                target_columns,
+                HotelStatsService._stats_select(hotel_ids, datetime.utcnow())
+            )
+        )
+        return result.rowcount
+
+    @staticmethod
+    def rebuild_all(batch_size=500):
+        """Backfill toàn bộ bảng hotel_stats theo từng lô khách sạn"""
+        total = 0
+        last_id = 0
+        while True:
+            hotel_ids = [row[0] for row in db.session.query(Hotel.hotel_id)
+                         .filter(Hotel.hotel_id > last_id)
+                         .order_by(Hotel.hotel_id)
+                         .limit(batch_size).all()]
+            if not hotel_ids:
+                break
+            HotelStatsService.refresh(hotel_ids)
+            db.session.commit()
+            total += len(hotel_ids)
+            last_id = hotel_ids[-1]
+        return total
+
+
+hotel_stats_cli = AppGroup('hotel-stats', help='Quản lý bảng thống kê hotel_stats.')
+
+
+@hotel_stats_cli.command('rebuild')
+@click.option('--batch-size', default=500, show_default=True, help='Số khách sạn mỗi lô.')
+def rebuild_command(batch_size):
+    """Tính lại toàn bộ hotel_stats (dùng để backfill)."""
+    total = HotelStatsService.rebuild_all(batch_size=batch_size)
+    click.echo(f'Đã cập nhật thống kê cho {total} khách sạn')
@@ -0,0 +1,129 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, request
+from flask.cli import AppGroup
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.idempotency_key import IdempotencyKey
+
+
+class IdempotencyError(Exception):
+    def __init__(self, message, status_code=409):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class IdempotencyService:
+    """Khóa idempotency cho request tạo booking (header Idempotency-Key hoặc trường ẩn idempotency_key).
+
+    Request lặp lại với cùng khóa được trả lại phản hồi đã lưu bằng một lần tra chỉ mục duy nhất
+    (user_id, idempotency_key), không tính giá, áp mã giảm giá hay ghi booking lần nữa. Bản ghi khóa
+    được chèn đầu transaction tạo booking: request trùng chạy song song bị chặn ở chỉ mục duy nhất
+    cho tới khi request đầu commit. Chỉ phản hồi thành công được lưu; lỗi thì transaction rollback
+    nên client có thể thử lại với cùng khóa.
+    """
+
+    MAX_KEY_LENGTH = 255
+    FORM_FIELD = 'idempotency_key'
+
+    @staticmethod
+    def key_from_request(data):
+        """Lấy khóa từ header hoặc trường ẩn (bỏ trường khỏi data trước khi validate schema)"""
+        form_key = data.pop(IdempotencyService.FORM_FIELD, None) if isinstance(data, dict) else None
+        key = (request.headers.get('Idempotency-Key') or form_key or '').strip()
+        if len(key) > IdempotencyService.MAX_KEY_LENGTH:
+            raise IdempotencyError(f'Idempotency-Key tối đa {IdempotencyService.MAX_KEY_LENGTH} ký tự', 400)
+        return key or None
+
+    @staticmethod
+    def fingerprint(data):
+        payload = json.dumps(data, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _replay(record):
+        response = current_app.response_class(record.response_body, status=record.status_code,
+                                              mimetype='application/json')
+        response.headers['Idempotent-Replayed'] = 'true'
+        return response, record.status_code
+
+    @staticmethod
+    def lookup(user_id, key, request_hash):
+        """Phản hồi đã lưu cho khóa (response, status) hoặc None nếu khóa chưa dùng/đã hết hạn"""
+        record = IdempotencyKey.query.filter_by(user_id=user_id, idempotency_key=key).first()
+        if record is None:
+            return None
+        if record.expires_at <= datetime.utcnow():
+            # Khóa hết hạn chưa được dọn: xóa cùng transaction để dùng lại được khóa
+            db.session.delete(record)
+            db.session.flush()
+            return None
+        if record.request_hash != request_hash:
+            raise IdempotencyError('Idempotency-Key đã được dùng cho một yêu cầu khác', 422)
+        return IdempotencyService._replay(record)
+
+    @staticmethod
+    def claim(user_id, key, request_hash):
+        """Chèn bản ghi khóa vào transaction hiện tại (chưa commit); trả về (bản ghi, None).
+
+        Request trùng đã commit trước: trả về (None, phản hồi đã lưu của nó).
+        """
+        record = IdempotencyKey(
+            user_id=user_id,
+            idempotency_key=key,
+            request_hash=request_hash,
+            expires_at=datetime.utcnow() + timedelta(seconds=current_app.config.get('IDEMPOTENCY_KEY_TTL', 86400))
+        )
+        db.session.add(record)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            replayed = IdempotencyService.lookup(user_id, key, request_hash)
+            if replayed is None:
+                raise IdempotencyError('Yêu cầu với Idempotency-Key này đang được xử lý, vui lòng thử lại')
+            return None, replayed
+        return record, None
+
+    @staticmethod
+    def store(record, result, booking_id=None):
+        """Lưu phản hồi thành công vào bản ghi khóa; commit cùng booking"""
+        response, status_code = result
+        record.booking_id = booking_id
+        record.status_code = status_code
+        record.response_body = response.get_data(as_text=True)
+
+    @staticmethod
+    def purge_expired(batch_size=1000, now=None):
+        """Xóa khóa hết hạn theo lô, mỗi lô một transaction; trả về số bản ghi đã xóa"""
+        table = IdempotencyKey.__table__
+        now = now or datetime.utcnow()
+        purged = 0
+        while True:
+            ids = db.session.execute(
+                select(table.c.id).where(table.c.expires_at <= now).order_by(table.c.expires_at).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                break
+            db.session.execute(table.delete().where(table.c.id.in_(ids)))
+            db.session.commit()
+            purged += len(ids)
+            if len(ids) < batch_size:
+                break
+        return purged
+
+
+idempotency_keys_cli = AppGroup('idempotency-keys', help='Quản lý khóa idempotency của request tạo booking.')
+
+
+@idempotency_keys_cli.command('purge')
+@click.option('--batch-size', default=1000, show_default=True, help='Số khóa mỗi lô.')
+def purge_command(batch_size):
+    """Xóa các khóa idempotency đã hết hạn."""
+    purged = IdempotencyService.purge_expired(batch_size=batch_size)
+    click.echo(f'Đã xóa {purged} khóa idempotency hết hạn')
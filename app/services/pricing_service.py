@@ -0,0 +1,211 @@
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from app.models.room import Room
+from app.services.promotion_index import promotion_index
+
+CENT = Decimal('0.01')
+
+
+class PricingError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class PricingService:
+    """Báo giá đặt phòng dùng chung cho create_booking, check_price và validate_booking.
+
+    Phòng được nạp một lần cho cả báo giá; khuyến mãi của khách sạn lấy từ chỉ mục trong bộ nhớ,
+    applicable_days đã được biên dịch sẵn thành bitmask thứ trong tuần. Số đêm theo từng thứ
+    được tính bằng số học (số tuần trọn + phần dư) nên chi phí không phụ thuộc độ dài kỳ ở.
+    Đêm thứ Sáu và thứ Bảy tính theo weekend_price nếu phòng có giá cuối tuần.
+    """
+
+    # weekday() của đêm tính giá cuối tuần (đêm bắt đầu vào thứ Sáu, thứ Bảy)
+    WEEKEND_NIGHTS = (4, 5)
+    # Trường của khuyến mãi ảnh hưởng tới giá, được đối chiếu với CSDL khi tạo booking
+    PROMOTION_FIELDS = ('hotel_id', 'room_id', 'discount_type', 'discount_value', 'start_date', 'end_date',
+                        'min_nights')
+
+    @staticmethod
+    def night_counts(check_in, check_out):
+        """Số đêm theo từng weekday() trong [check_in, check_out).
+
+        Chỉ 7 phép cộng bất kể độ dài kỳ ở, không lặp theo từng đêm.
+        """
+        full_weeks, remainder = divmod((check_out - check_in).days, 7)
+        counts = [full_weeks] * 7
+        start = check_in.weekday()
+        for offset in range(remainder):
+            counts[(start + offset) % 7] += 1
+        return counts
+
+    @staticmethod
+    def load_rooms(hotel_id, room_ids):
+        """Nạp các phòng trong một truy vấn; PricingError nếu thiếu phòng hoặc phòng thuộc khách sạn khác"""
+        rooms = {room.room_id: room for room in Room.query.filter(Room.room_id.in_(set(room_ids))).all()} \
+            if room_ids else {}
+        for room_id in room_ids:
+            room = rooms.get(room_id)
+            if not room:
+                raise PricingError(f'Không tìm thấy phòng ID {room_id}', 404)
+            if hotel_id is not None and room.hotel_id != hotel_id:
+                raise PricingError('Phòng không thuộc khách sạn này', 400)
+        return rooms
+
+    @staticmethod
+    def _promotions(hotel_id, room_ids, check_in, check_out):
+        start = datetime.combine(check_in, datetime.min.time())
+        end = datetime.combine(check_out, datetime.min.time())
+        promotions = {promo['promotion_id']: promo
+                      for promo in promotion_index.overlapping(start, end, hotel_id=hotel_id)}
+        for room_id in set(room_ids):
+            for promo in promotion_index.overlapping(start, end, room_id=room_id):
+                promotions[promo['promotion_id']] = promo
+        return list(promotions.values())
+
+    @staticmethod
+    def _best_promotion(promotions, hotel_id, room_id, subtotal, quantity, num_nights, check_in_bit):
+        best, best_discount = None, Decimal('0')
+        for promo in promotions:
+            if promo['room_id'] != room_id and (promo['room_id'] is not None or promo['hotel_id'] != hotel_id):
+                continue
+            if promo['min_nights'] and num_nights < promo['min_nights']:
+                continue
+            if promo['day_mask'] and not promo['day_mask'] & check_in_bit:
+                continue
+            if promo['discount_type'] == 'percentage':
+                discount = subtotal * Decimal(promo['discount_value']) / 100
+            else:
+                discount = Decimal(promo['discount_value']) * quantity
+            discount = min(discount, subtotal).quantize(CENT, rounding=ROUND_HALF_UP)
+            if discount > best_discount:
+                best, best_discount = promo, discount
+        return best, best_discount
+
+    @staticmethod
+    def _verify_promotions(promotions, promotion_ids, start, end):
+        """Đối chiếu các khuyến mãi đã chọn với CSDL bằng một truy vấn theo khóa chính.
+
+        Chỉ mục là bản trong bộ nhớ của từng process nên có thể cũ tới PROMOTION_INDEX_MAX_AGE giây.
+        Trả về None nếu mọi khuyến mãi còn đúng; ngược lại là danh sách khuyến mãi đã thay bản cũ
+        bằng dữ liệu CSDL (bỏ khuyến mãi đã tắt, bị xóa hoặc không còn giao kỳ ở) và chỉ mục được
+        đánh dấu để dựng lại.
+        """
+        from app.models.promotion import Promotion
+
+        rows = {promotion.promotion_id: promotion
+                for promotion in Promotion.query.filter(Promotion.promotion_id.in_(promotion_ids)).all()}
+        fresh = {}
+        for promotion_id in promotion_ids:
+            promotion = rows.get(promotion_id)
+            if promotion is None or not promotion.is_active or \
+                    promotion.start_date > end or promotion.end_date < start:
+                fresh[promotion_id] = None
+                continue
+            fresh[promotion_id] = {field: getattr(promotion, field) for field in PricingService.PROMOTION_FIELDS}
+            fresh[promotion_id]['day_mask'] = promotion_index.day_mask(promotion.applicable_days)
+
+        stale = {promotion_id for promotion_id, values in fresh.items()
+                 if values is None or any(entry[field] != values[field]
+                                          for entry in promotions if entry['promotion_id'] == promotion_id
+                                          for field in values)}
+        if not stale:
+            return None
+        promotion_index.mark_changed()
+        return [dict(entry, **fresh[entry['promotion_id']]) if entry['promotion_id'] in stale else entry
+                for entry in promotions
+                if entry['promotion_id'] not in stale or fresh[entry['promotion_id']] is not None]
+
+    @staticmethod
+    def quote(hotel_id, rooms, check_in, check_out, apply_promotions=True, verify_promotions=False):
+        """Báo giá chi tiết; rooms: danh sách {'room_id', 'quantity'}.
+
+        verify_promotions=True (khi tạo booking): khuyến mãi được chọn từ chỉ mục trong bộ nhớ
+        được đối chiếu lại với CSDL trước khi tính tiền. Trả về dict với các khoản tiền là Decimal;
+        dùng serialize() khi trả JSON.
+        """
+        room_ids = [room_data['room_id'] for room_data in rooms]
+        loaded = PricingService.load_rooms(hotel_id, room_ids)
+        if hotel_id is None and loaded:
+            hotel_id = next(iter(loaded.values())).hotel_id
+
+        counts = PricingService.night_counts(check_in, check_out)
+        num_nights = sum(counts)
+        weekend_nights = sum(counts[day] for day in PricingService.WEEKEND_NIGHTS)
+        weekday_nights = num_nights - weekend_nights
+        check_in_bit = 1 << check_in.weekday()
+        promotions = PricingService._promotions(hotel_id, room_ids, check_in, check_out) \
+            if apply_promotions else []
+
+        verified = set()
+        while True:
+            items = []
+            total_amount = promotion_discount = Decimal('0')
+            for room_data in rooms:
+                room = loaded[room_data['room_id']]
+                quantity = room_data.get('quantity') or 1
+                base_price = Decimal(room.base_price or 0)
+                weekend_price = Decimal(room.weekend_price) if room.weekend_price is not None else base_price
+                nightly_total = base_price * weekday_nights + weekend_price * weekend_nights
+                subtotal = (nightly_total * quantity).quantize(CENT, rounding=ROUND_HALF_UP)
+                promotion, discount = PricingService._best_promotion(
+                    promotions, hotel_id, room.room_id, subtotal, quantity, num_nights, check_in_bit
+                )
+                items.append({
+                    'room_id': room.room_id,
+                    'room_name': room.room_name,
+                    'quantity': quantity,
+                    'num_nights': num_nights,
+                    'weekday_nights': weekday_nights,
+                    'weekend_nights': weekend_nights,
+                    'base_price': base_price,
+                    'weekend_price': weekend_price,
+                    # Giá trung bình mỗi đêm (đêm thường và cuối tuần có thể khác giá)
+                    'price_per_night': (nightly_total / num_nights).quantize(CENT, rounding=ROUND_HALF_UP)
+                    if num_nights else base_price,
+                    'subtotal': subtotal,
+                    'promotion_id': promotion['promotion_id'] if promotion else None,
+                    'promotion_discount': discount,
+                    'total': subtotal - discount
+                })
+                total_amount += subtotal
+                promotion_discount += discount
+
+            # Khuyến mãi mới được chọn sau khi bản cũ bị thay cũng phải được đối chiếu
+            chosen = {item['promotion_id'] for item in items if item['promotion_id'] is not None} - verified
+            if not verify_promotions or not chosen:
+                break
+            verified |= chosen
+            refreshed = PricingService._verify_promotions(
+                promotions, chosen,
+                datetime.combine(check_in, datetime.min.time()), datetime.combine(check_out, datetime.min.time())
+            )
+            if refreshed is None:
+                break
+            promotions = refreshed
+
+        return {
+            'hotel_id': hotel_id,
+            'check_in_date': check_in,
+            'check_out_date': check_out,
+            'num_nights': num_nights,
+            'items': items,
+            'total_amount': total_amount,
+            'promotion_discount': promotion_discount,
+            'amount_after_promotion': total_amount - promotion_discount
+        }
+
+    @staticmethod
+    def serialize(quote):
+        def convert(value):
+            if isinstance(value, Decimal):
+                return float(value)
+            if hasattr(value, 'isoformat'):
+                return value.isoformat()
+            return value
+
+        data = {key: convert(value) for key, value in quote.items() if key != 'items'}
+        data['items'] = [{key: convert(value) for key, value in item.items()} for item in quote['items']]
+        return data
@@ -0,0 +1,321 @@
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime
+
+from sqlalchemy import event
+
+
+class IntervalList:
+    """Các khuyến mãi sắp theo start_date; tìm khoảng giao nhau bằng bisect trên mảng start.
+
+    Khuyến mãi giao [start, end] khi start_date <= end và end_date >= start: bisect cắt
+    các mục bắt đầu sau `end`, phần còn lại chỉ cần so end_date.
+    """
+
+    def __init__(self, entries):
+        self._entries = sorted(entries, key=lambda entry: (entry['start_date'], entry['promotion_id']))
+        self._starts = [entry['start_date'] for entry in self._entries]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def overlapping(self, start, end):
+        stop = bisect_right(self._starts, end)
+        return [entry for entry in self._entries[:stop] if entry['end_date'] >= start]
+
+
+class PromotionIndex:
+    """Chỉ mục khoảng thời gian của khuyến mãi đang bật, trong bộ nhớ, theo hotel_id và room_id.
+
+    Trả lời "đang hoạt động lúc now" và "giao với [check_in, check_out]" mà không truy vấn CSDL.
+    Chỉ nạp khuyến mãi is_active chưa kết thúc; thời điểm bắt đầu/kết thúc được so lúc đọc nên
+    không cần dựng lại khi khuyến mãi tới hạn. Ghi Promotion/Hotel (qua session) đánh dấu chỉ mục
+    cũ, lần đọc sau dựng lại; thay đổi từ process khác được thấy sau PROMOTION_INDEX_MAX_AGE giây.
+    """
+
+    # Bit đánh dấu applicable_days có giá trị (kể cả khi không có thứ hợp lệ nào)
+    DAY_MASK_SET = 1 << 7
+
+    def __init__(self):
+        self._state = None
+        self._version = 0
+        self._max_age = 60
+        self._rebuild_lock = threading.Lock()
+
+    def init_app(self, app):
+        from app import db
+
+        self._max_age = app.config.get('PROMOTION_INDEX_MAX_AGE', 60)
+        if not event.contains(db.session, 'after_flush', PromotionIndex._after_flush):
+            event.listen(db.session, 'after_flush', PromotionIndex._after_flush)
+            event.listen(db.session, 'after_commit', PromotionIndex._after_commit)
+            event.listen(db.session, 'after_rollback', PromotionIndex._after_rollback)
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        from app.models.hotel import Hotel
+        from app.models.promotion import Promotion
+
+        # Hotel: tên khách sạn được lưu kèm khuyến mãi để hiển thị
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, (Promotion, Hotel)):
+                session.info['promotion_index_changed'] = True
+                return
+
+    @staticmethod
+    def _after_commit(session):
+        if session.info.pop('promotion_index_changed', False):
+            promotion_index.mark_changed()
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop('promotion_index_changed', None)
+
+    def mark_changed(self):
+        self._version += 1
+
+    @staticmethod
+    def day_mask(applicable_days):
+        """'0,5,6' -> bitmask theo weekday() (thứ Hai = 0); 0 nghĩa là áp dụng mọi ngày"""
+        days = [int(day.strip()) for day in (applicable_days or '').split(',') if day.strip().isdigit()]
+        if not days:
+            return 0
+        mask = PromotionIndex.DAY_MASK_SET
+        for day in days:
+            if day < 7:
+                mask |= 1 << day
+        return mask
+
+    @staticmethod
+    def _entry(promotion):
+        return {
+            'promotion_id': promotion.promotion_id,
+            'hotel_id': promotion.hotel_id,
+            'room_id': promotion.room_id,
+            'title': promotion.title,
+            'description': promotion.description,
+            'discount_type': promotion.discount_type,
+            'discount_value': promotion.discount_value,
+            'start_date': promotion.start_date,
+            'end_date': promotion.end_date,
+            'applicable_days': promotion.applicable_days,
+            'day_mask': PromotionIndex.day_mask(promotion.applicable_days),
+            'min_nights': promotion.min_nights,
+            'hotel': {'hotel_id': promotion.hotel.hotel_id, 'hotel_name': promotion.hotel.hotel_name}
+            if promotion.hotel else None,
+            'payload': promotion.to_dict()
+        }
+
+    @staticmethod
+    def build():
+        """Đọc khuyến mãi đang bật, chưa kết thúc và dựng các danh sách khoảng"""
+        from sqlalchemy.orm import selectinload
+        from app.models.promotion import Promotion
+
+        promotions = Promotion.query.options(selectinload(Promotion.hotel)).filter(
+            Promotion.is_active == True,
+            Promotion.end_date >= datetime.utcnow()
+        ).all()
+        entries = [PromotionIndex._entry(promotion) for promotion in promotions]
+
+        by_hotel, by_room = {}, {}
+        for entry in entries:
+            if entry['hotel_id'] is not None:
+                by_hotel.setdefault(entry['hotel_id'], []).append(entry)
+            if entry['room_id'] is not None:
+                by_room.setdefault(entry['room_id'], []).append(entry)
+        return {
+            'all': IntervalList(entries),
+            'by_hotel': {hotel_id: IntervalList(items) for hotel_id, items in by_hotel.items()},
+            'by_room': {room_id: IntervalList(items) for room_id, items in by_room.items()}
+        }
+
+    def _is_stale(self, state):
+        return state is None or state['version'] != self._version or \
+            time.monotonic() - state['built_at'] > self._max_age
+
+    def _current(self):
+        state = self._state
+        if not self._is_stale(state):
+            return state
+        # Lần đầu các request chờ nhau; sau đó request khác tiếp tục dùng bản cũ trong lúc dựng lại
+        if not self._rebuild_lock.acquire(blocking=state is None):
+            return state
+        try:
+            state = self._state
+            if self._is_stale(state):
+                version = self._version
+                state = dict(self.build(), version=version, built_at=time.monotonic())
+                self._state = state
+            return state
+        finally:
+            self._rebuild_lock.release()
+
+    def active(self, now=None):
+        """Khuyến mãi đang hoạt động lúc now, mới bắt đầu trước"""
+        now = now or datetime.utcnow()
+        return self._current()['all'].overlapping(now, now)[::-1]
+
+    def overlapping(self, start, end):
+        stop = bisect_right(self._starts, end)
+        return [entry for entry in self._entries[:stop] if entry['end_date'] >= start]
+
+
+class PromotionIndex:
+    """Chỉ mục khoảng thời gian của khuyến mãi đang bật, trong bộ nhớ, theo hotel_id và room_id.
+
+    Trả lời "đang hoạt động lúc now" và "giao với [check_in, check_out]" mà không truy vấn CSDL.
+    Chỉ nạp khuyến mãi is_active chưa kết thúc; thời điểm bắt đầu/kết thúc được so lúc đọc nên
+    không cần dựng lại khi khuyến mãi tới hạn. Ghi Promotion/Hotel (qua session) đánh dấu chỉ mục
+    cũ, lần đọc sau dựng lại; thay đổi từ process khác được thấy sau PROMOTION_INDEX_MAX_AGE giây.
+    """
+
+    # Bit đánh dấu applicable_days có giá trị (kể cả khi không có thứ hợp lệ nào)
+    DAY_MASK_SET = 1 << 7
+
+    def __init__(self):
+        self._state = None
+        self._version = 0
+        self._max_age = 60
+        self._rebuild_lock = threading.Lock()
+
+    def init_app(self, app):
+        from app import db
+
+        self._max_age = app.config.get('PROMOTION_INDEX_MAX_AGE', 60)
+        if not event.contains(db.session, 'after_flush', PromotionIndex._after_flush):
+            event.listen(db.session, 'after_flush', PromotionIndex._after_flush)
+            event.listen(db.session, 'after_commit', PromotionIndex._after_commit)
+            event.listen(db.session, 'after_rollback', PromotionIndex._after_rollback)
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        from app.models.hotel import Hotel
+        from app.models.promotion import Promotion
+
+        # Hotel: tên khách sạn được lưu kèm khuyến mãi để hiển thị
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, (Promotion, Hotel)):
+                session.info['promotion_index_changed'] = True
+                return
+
+    @staticmethod
+    def _after_commit(session):
+        if session.info.pop('promotion_index_changed', False):
+            promotion_index.mark_changed()
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop('promotion_index_changed', None)
+
+    def mark_changed(self):
+        self._version += 1
+
+    @staticmethod
+    def day_mask(applicable_days):
+        """'0,5,6' -> bitmask theo weekday() (thứ Hai = 0); 0 nghĩa là áp dụng mọi ngày"""
+        days = [int(day.strip()) for day in (applicable_days or '').split(',') if day.strip().isdigit()]
+        if not days:
+            return 0
+        mask = PromotionIndex.DAY_MASK_SET
+        for day in days:
+            if day < 7:
+                mask |= 1 << day
+        return mask
+
+    @staticmethod
+    def _entry(promotion):
+        return {
+            'promotion_id': promotion.promotion_id,
+            'hotel_id': promotion.hotel_id,
+            'room_id': promotion.room_id,
+            'title': promotion.title,
+            'description': promotion.description,
+            'discount_type': promotion.discount_type,
+            'discount_value': promotion.discount_value,
+            'start_date': promotion.start_date,
+            'end_date': promotion.end_date,
+            'applicable_days': promotion.applicable_days,
+            'day_mask': PromotionIndex.day_mask(promotion.applicable_days),
+            'min_nights': promotion.min_nights,
+            'hotel': {'hotel_id': promotion.hotel.hotel_id, 'hotel_name': promotion.hotel.hotel_name}
+            if promotion.hotel else None,
+            'payload': promotion.to_dict()
+        }
+
+    @staticmethod
+    def build():
+        """Đọc khuyến mãi đang bật, chưa kết thúc và dựng các danh sách khoảng"""
+        from sqlalchemy.orm import selectinload
+        from app.models.promotion import Promotion
+
+        promotions = Promotion.query.options(selectinload(Promotion.hotel)).filter(
+            Promotion.is_active == True,
+            Promotion.end_date >= datetime.utcnow()
+        ).all()
+        entries = [PromotionIndex._entry(promotion) for promotion in promotions]
+
+        by_hotel, by_room = {}, {}
+        for entry in entries:
+            if entry['hotel_id'] is not None:
+                by_hotel.setdefault(entry['hotel_id'], []).append(entry)
+            if entry['room_id'] is not None:
+                by_room.setdefault(entry['room_id'], []).append(entry)
+        return {
+            'all': IntervalList(entries),
+            'by_hotel': {hotel_id: IntervalList(items) for hotel_id, items in by_hotel.items()},
+            'by_room': {room_id: IntervalList(items) for room_id, items in by_room.items()}
+        }
+
+    def _is_stale(self, state):
+        return state is None or state['version'] != self._version or \
+            time.monotonic() - state['built_at'] > self._max_age
+
+    def _current(self):
+        state = self._state
+        if not self._is_stale(state):
+            return state
+        # Lần đầu các request chờ nhau; sau đó request khác tiếp tục dùng bản cũ trong lúc dựng lại
+        if not self._rebuild_lock.acquire(blocking=state is None):
+            return state
+        try:
+            state = self._state
+            if self._is_stale(state):
+                version = self._version
+                state = dict(self.build(), version=version, built_at=time.monotonic())
+                self._state = state
+            return state
+        finally:
+            self._rebuild_lock.release()
+
+    def active(self, now=None):
+        """Khuyến mãi đang hoạt động lúc now, mới bắt đầu trước"""
+        now = now or datetime.utcnow()
+        return self._current()['all'].overlapping(now, now)[::-1]
+
+    def active_hotel_ids(self, now=None):
+        """Tập hotel_id có khuyến mãi đang hoạt động (kể cả khuyến mãi riêng một phòng)"""
+        now = now or datetime.utcnow()
+        return {hotel_id for hotel_id, intervals in self._current()['by_hotel'].items()
+                if intervals.overlapping(now, now)}
+
+    def overlapping(self, start, end, hotel_id=None, room_id=None):
+        """Khuyến mãi giao [start, end], lọc theo khách sạn hoặc phòng nếu có"""
+        state = self._current()
+        if room_id is not None:
+            intervals = state['by_room'].get(room_id)
+        elif hotel_id is not None:
+            intervals = state['by_hotel'].get(hotel_id)
+        else:
+            intervals = state['all']
+        return intervals.overlapping(start, end) if intervals is not None else []
+
+    def for_room(self, hotel_id, room_id, start, end):
+        """Khuyến mãi áp dụng cho phòng trong [start, end]: riêng phòng hoặc chung cả khách sạn"""
+        hotel_wide = [entry for entry in self.overlapping(start, end, hotel_id=hotel_id)
+                      if entry['room_id'] is None]
+        return self.overlapping(start, end, room_id=room_id) + hotel_wide
+
+
+promotion_index = PromotionIndex()
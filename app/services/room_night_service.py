@@ -0,0 +1,161 @@
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, select, inspect as sa_inspect
+from sqlalchemy.exc import IntegrityError
+from datetime import date, timedelta
+
+from app import db
+from app.models.booking import Booking
+from app.models.booking_detail import BookingDetail
+from app.models.room_night import RoomNight
+from app.services.availability_service import AvailabilityService
+
+
+class RoomNightConflict(Exception):
+    """Có đêm trong khoảng ngày đã thuộc booking khác"""
+
+
+class RoomNightService:
+    """Giữ sổ room_nights khớp với các booking đang giữ chỗ.
+
+    Tạo booking chèn mọi (phòng, đêm) bằng một lệnh chèn hàng loạt trong cùng transaction;
+    khóa chính (room_id, stay_date) làm hai request đồng thời cho cùng phòng không thể cùng commit.
+    Booking rời trạng thái giữ chỗ (hủy, hoàn tiền, trả phòng) thì đêm được nhả; đổi ngày thì
+    nhả rồi giữ lại theo ngày mới. Các chuyển trạng thái này được bắt qua sự kiện flush của session.
+    """
+
+    @staticmethod
+    def init_app(app):
+        if not event.contains(db.session, 'after_flush', RoomNightService._after_flush):
+            event.listen(db.session, 'after_flush', RoomNightService._after_flush)
+        app.cli.add_command(room_nights_cli)
+
+    @staticmethod
+    def stay_dates(check_in, check_out):
+        return [check_in + timedelta(days=offset) for offset in range((check_out - check_in).days)]
+
+    @staticmethod
+    def claim(booking_id, room_ids, check_in, check_out, connection=None):
+        """Giữ các đêm [check_in, check_out) của các phòng cho booking; RoomNightConflict nếu đã có người giữ"""
+        rows = [{'room_id': room_id, 'stay_date': stay_date, 'booking_id': booking_id}
+                for room_id in sorted(set(room_ids))
+                for stay_date in RoomNightService.stay_dates(check_in, check_out)]
+        if not rows:
+            return 0
+        connection = connection if connection is not None else db.session.connection()
+        try:
+            connection.execute(RoomNight.__table__.insert(), rows)
+        except IntegrityError as e:
+            raise RoomNightConflict('Phòng đã được đặt trong khoảng thời gian này') from e
+        return len(rows)
+
+    @staticmethod
+    def release(booking_id, connection=None):
+        connection = connection if connection is not None else db.session.connection()
+        table = RoomNight.__table__
+        return connection.execute(table.delete().where(table.c.booking_id == booking_id)).rowcount
+
+    @staticmethod
+    def is_free(room_id, check_in, check_out):
+        """Tra điểm trên khóa chính: phòng còn trống mọi đêm trong [check_in, check_out)"""
+        return db.session.execute(
+            select(RoomNight.room_id).where(
+                RoomNight.room_id == room_id,
+                RoomNight.stay_date >= check_in,
+                RoomNight.stay_date < check_out
+            ).limit(1)
+        ).first() is None
+
+    @staticmethod
+    def _booking_room_ids(booking_id, connection):
+        return [row[0] for row in connection.execute(
+            select(BookingDetail.room_id).where(BookingDetail.booking_id == booking_id)
+        )]
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        connection = None
+        for obj in list(session.dirty) + list(session.deleted):
+            if not isinstance(obj, Booking):
+                continue
+            attrs = sa_inspect(obj).attrs
+            status_history = attrs.status.history
+            old_status = status_history.deleted[0] if status_history.deleted else obj.status
+            was_blocking = old_status in AvailabilityService.BLOCKING_STATUSES
+            is_blocking = obj in session.dirty and obj.status in AvailabilityService.BLOCKING_STATUSES
+            dates_changed = attrs.check_in_date.history.has_changes() or \
+                attrs.check_out_date.history.has_changes()
+            if not (was_blocking or is_blocking) or (was_blocking == is_blocking and not dates_changed):
+                continue
+
+            connection = connection if connection is not None else session.connection()
+            if was_blocking:
+                RoomNightService.release(obj.booking_id, connection=connection)
+            if is_blocking:
+                RoomNightService.claim(
+                    obj.booking_id,
+                    RoomNightService._booking_room_ids(obj.booking_id, connection),
+                    obj.check_in_date, obj.check_out_date,
+                    connection=connection
+                )
+
+    @staticmethod
+    def rebuild_all(batch_size=500):
+        """Backfill sổ room_nights từ các booking đang giữ chỗ chưa kết thúc.
+
+        Migration add_room_nights đã backfill cùng quy tắc; lệnh này dùng để dựng lại sổ (khi chưa nhận
+        booking mới). Booking cũ bị đặt trùng (trước khi có sổ) thì booking có id nhỏ hơn giữ đêm;
+        trả về (số đêm đã ghi, danh sách booking_id bị trùng).
+        """
+        table = RoomNight.__table__
+        db.session.execute(table.delete())
+        today = date.today()
+        claimed = set()
+        conflicts = []
+        total = 0
+        last_id = 0
+        while True:
+            bookings = Booking.query.filter(
+                Booking.booking_id > last_id,
+                Booking.status.in_(AvailabilityService.BLOCKING_STATUSES),
+                Booking.check_out_date > today
+            ).order_by(Booking.booking_id).limit(batch_size).all()
+            if not bookings:
+                break
+            details = db.session.query(BookingDetail.booking_id, BookingDetail.room_id)\
+                .filter(BookingDetail.booking_id.in_([booking.booking_id for booking in bookings])).all()
+            room_ids = {}
+            for booking_id, room_id in details:
+                room_ids.setdefault(booking_id, set()).add(room_id)
+
+            rows = []
+            for booking in bookings:
+                conflicted = False
+                for room_id in sorted(room_ids.get(booking.booking_id, ())):
+                    for stay_date in RoomNightService.stay_dates(booking.check_in_date, booking.check_out_date):
+                        if (room_id, stay_date) in claimed:
+                            conflicted = True
+                            continue
+                        claimed.add((room_id, stay_date))
+                        rows.append({'room_id': room_id, 'stay_date': stay_date, 'booking_id': booking.booking_id})
+                if conflicted:
+                    conflicts.append(booking.booking_id)
+            if rows:
+                db.session.execute(table.insert(), rows)
+            db.session.commit()
+            total += len(rows)
+            last_id = bookings[-1].booking_id
+        return total, conflicts
+
+
+room_nights_cli = AppGroup('room-nights', help='Quản lý sổ đêm phòng room_nights.')
+
+
+@room_nights_cli.command('rebuild')
+@click.option('--batch-size', default=500, show_default=True, help='Số booking mỗi lô.')
+def rebuild_command(batch_size):
+    """Dựng lại toàn bộ room_nights từ booking (dùng để backfill)."""
+    total, conflicts = RoomNightService.rebuild_all(batch_size=batch_size)
+    click.echo(f'Đã ghi {total} đêm phòng')
+    if conflicts:
+        click.echo(f'Booking bị đặt trùng (cần xử lý thủ công): {", ".join(map(str, conflicts))}')
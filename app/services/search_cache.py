@@ -0,0 +1,205 @@
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+
+from sqlalchemy import event, select, inspect as sa_inspect
+
+from app.utils.helpers import fold_diacritics
+
+
+class SearchResultCache:
+    """Cache kết quả tìm kiếm trong bộ nhớ (LRU có giới hạn + TTL).
+
+    Mỗi entry thuộc một namespace là điểm đến đã bỏ dấu ('' khi không lọc điểm đến).
+    Khi khách sạn, phòng, khuyến mãi, đánh giá, chính sách hủy hoặc booking (phòng trống) thay đổi,
+    các namespace có thể chứa khách sạn đó (điểm đến là chuỗi con của city/address/hotel_name) bị xóa
+    trên mọi cache đã init_app (kết quả tìm kiếm, số đếm...); mỗi cache có giới hạn và thống kê riêng.
+    """
+
+    HOTEL_FIELDS = ('city', 'address', 'hotel_name')
+    # Các cache nhận sự kiện xóa khi dữ liệu khách sạn thay đổi
+    _caches = []
+
+    def __init__(self, max_size=1000, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.enabled = True
+        self._entries = OrderedDict()
+        self._namespaces = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def init_app(self, app, config_prefix='SEARCH_CACHE'):
+        """Đọc <config_prefix>_ENABLED, _MAX_SIZE, _TTL và đăng ký cache nhận sự kiện xóa"""
+        from app import db
+
+        self.enabled = app.config.get(f'{config_prefix}_ENABLED', True)
+        self.max_size = app.config.get(f'{config_prefix}_MAX_SIZE', self.max_size)
+        self.ttl = app.config.get(f'{config_prefix}_TTL', self.ttl)
+        if self not in SearchResultCache._caches:
+            SearchResultCache._caches.append(self)
+        if not event.contains(db.session, 'after_flush', SearchResultCache._after_flush):
+            event.listen(db.session, 'after_flush', SearchResultCache._after_flush)
+            event.listen(db.session, 'after_commit', SearchResultCache._after_commit)
+            event.listen(db.session, 'after_rollback', SearchResultCache._after_rollback)
+
+    @staticmethod
+    def _normalize(value):
+        if isinstance(value, (list, tuple)):
+            return tuple(sorted(SearchResultCache._normalize(item) for item in value))
+        if isinstance(value, str):
+            return value.strip().lower()
+        return str(value)
+
+    @staticmethod
+    def make_key(endpoint, data, page, per_page, cursor=None):
+        """Khóa chuẩn hóa: thứ tự tham số, thứ tự giá trị trong list và hoa/thường không ảnh hưởng"""
+        params = tuple(sorted(
+            (key, SearchResultCache._normalize(value))
+            for key, value in data.items()
+            if key not in ('page', 'per_page', 'cursor') and value not in (None, '', [])
+        ))
+        return endpoint, params, page, per_page, cursor
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, destination, value, ttl=None):
+        if not self.enabled:
+            return
+        namespace = fold_diacritics(destination) if destination else ''
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), namespace, value)
+            self._namespaces.setdefault(namespace, set()).add(key)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._namespaces.get(entry[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._namespaces[entry[1]]
+
+    def invalidate_hotels(self, hotel_texts):
+        """Xóa các namespace khớp với văn bản (đã bỏ dấu) của các khách sạn vừa thay đổi"""
+        if not hotel_texts:
+            return 0
+        removed = 0
+        with self._lock:
+            for namespace in list(self._namespaces):
+                if any(namespace in text for texts in hotel_texts for text in texts):
+                    for key in list(self._namespaces.get(namespace, ())):
+                        self._discard(key)
+                        removed += 1
+            self.invalidations += removed
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._namespaces.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'namespaces': len(self._namespaces),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        from app.models.hotel import Hotel
+        from app.models.room import Room
+        from app.models.promotion import Promotion
+        from app.models.review import Review
+        from app.models.cancellation_policy import CancellationPolicy
+        from app.models.booking import Booking
+
+        hotel_texts = session.info.setdefault('search_cache_hotels', set())
+        hotel_ids = set()
+        room_ids = set()
+        for obj in chain(session.new, session.dirty, session.deleted):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            state = sa_inspect(obj)
+            if isinstance(obj, Hotel):
+                # Lấy cả giá trị cũ để xóa kết quả cũ khi khách sạn đổi tên/địa chỉ
+                for field in SearchResultCache.HOTEL_FIELDS:
+                    history = state.attrs[field].history
+                    values = list(chain(history.added or (), history.unchanged or (), history.deleted or ()))
+                    if obj not in session.new and (not values or (history.added and not history.deleted)):
+                        # Giá trị cũ chưa được nạp (thuộc tính đã expire): không biết namespace cũ
+                        session.info['search_cache_clear'] = True
+                    for value in values:
+                        if value:
+                            hotel_texts.add((fold_diacritics(value),))
+            elif isinstance(obj, (Room, Promotion, Review, CancellationPolicy, Booking)):
+                history = state.attrs.hotel_id.history
+                hotel_ids.update(value for value in chain(history.added or (), history.unchanged or (),
+                                                          history.deleted or ()) if value is not None)
+                if isinstance(obj, Promotion) and obj.room_id is not None:
+                    room_ids.add(obj.room_id)
+
+        if not hotel_ids and not room_ids:
+            return
+        condition = Hotel.hotel_id.in_(hotel_ids)
+        if room_ids:
+            condition = condition | Hotel.hotel_id.in_(select(Room.hotel_id).where(Room.room_id.in_(room_ids)))
+        rows = session.connection().execute(
+            select(Hotel.city, Hotel.address, Hotel.hotel_name).where(condition)
+        )
+        for row in rows:
+            hotel_texts.add(tuple(fold_diacritics(value) for value in row))
+
+    @staticmethod
+    def _after_commit(session):
+        hotel_texts = session.info.pop('search_cache_hotels', None)
+        if session.info.pop('search_cache_clear', False):
+            for cache in SearchResultCache._caches:
+                cache.clear()
+        elif hotel_texts:
+            for cache in SearchResultCache._caches:
+                cache.invalidate_hotels(hotel_texts)
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop('search_cache_hotels', None)
+        session.info.pop('search_cache_clear', None)
+
+
+search_cache = SearchResultCache()
+# Tổng số kết quả (đã chặn trên) theo bộ lọc: cache riêng để không chiếm chỗ và không làm lệch
+# hit rate của cache kết quả tìm kiếm
+count_cache = SearchResultCache(max_size=500, ttl=30)
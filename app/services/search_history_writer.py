@@ -0,0 +1,168 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+
+
+class SearchHistoryWriter:
+    """Ghi lịch sử tìm kiếm theo kiểu write-behind.
+
+    Request chỉ đẩy bản ghi vào hàng đợi có giới hạn trong process; luồng nền gom và ghi
+    theo lô (executemany) mỗi SEARCH_HISTORY_BATCH_SIZE bản ghi hoặc sau
+    SEARCH_HISTORY_FLUSH_INTERVAL_MS mili giây. Hàng đợi đầy thì bản ghi bị bỏ và được đếm;
+    lỗi ghi được log và đếm. Khi process dừng, hàng đợi được ghi nốt (atexit).
+    Khi bị tắt bằng cấu hình, bản ghi được ghi đồng bộ trong request như trước.
+    """
+
+    _STOP = object()
+
+    def __init__(self):
+        self._app = None
+        self._queue = None
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {'enqueued': 0, 'written': 0, 'dropped': 0, 'failed_batches': 0, 'failed_rows': 0}
+
+    @property
+    def enabled(self):
+        return self._queue is not None
+
+    def init_app(self, app):
+        if not app.config.get('SEARCH_HISTORY_BUFFER_ENABLED', True):
+            return
+        self._app = app
+        self._queue = queue.Queue(maxsize=app.config.get('SEARCH_HISTORY_QUEUE_SIZE', 10000))
+        atexit.register(self.shutdown)
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['enabled'] = self.enabled
+        stats['queued'] = self._queue.qsize() if self._queue is not None else 0
+        return stats
+
+    def record(self, user_id, destination, check_in_date=None, check_out_date=None, num_guests=None):
+        row = {
+            'user_id': user_id,
+            'destination': destination,
+            'check_in_date': check_in_date,
+            'check_out_date': check_out_date,
+            'num_guests': num_guests,
+            'search_date': datetime.utcnow()
+        }
+        if not self.enabled:
+            self._write_sync(row)
+            return
+
+        self.start()
+        try:
+            self._queue.put_nowait(row)
+            self._count('enqueued')
+        except queue.Full:
+            self._count('dropped')
+
+    @staticmethod
+    def _write_sync(row):
+        from app import db
+        from app.models.search_history import SearchHistory
+
+        try:
+            db.session.add(SearchHistory(**row))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f'Lỗi lưu lịch sử tìm kiếm: {str(e)}')
+
+    def _write_batch(self, rows):
+        from app import db
+        from app.models.search_history import SearchHistory
+
+        with self._app.app_context():
+            try:
+                db.session.execute(SearchHistory.__table__.insert(), rows)
+                db.session.commit()
+                self._count('written', len(rows))
+            except Exception as e:
+                db.session.rollback()
+                self._count('failed_batches')
+                self._count('failed_rows', len(rows))
+                print(f'Lỗi ghi lô lịch sử tìm kiếm ({len(rows)} bản ghi): {str(e)}')
+            finally:
+                db.session.remove()
+
+    def _run(self):
+        batch_size = self._app.config.get('SEARCH_HISTORY_BATCH_SIZE', 100)
+        interval = self._app.config.get('SEARCH_HISTORY_FLUSH_INTERVAL_MS', 1000) / 1000.0
+        stopping = False
+        while not stopping:
+            # Chờ bản ghi đầu tiên, sau đó gom thêm đến khi đủ lô hoặc hết thời gian
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + interval
+            while len(batch) < batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+        self._drain(batch_size)
+
+    def _drain(self, batch_size):
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._STOP:
+                batch.append(item)
+            if len(batch) >= batch_size:
+                self._write_batch(batch)
+                batch = []
+        if batch:
+            self._write_batch(batch)
+
+    def start(self):
+        """Khởi động luồng nền (chỉ một lần cho mỗi process)"""
+        if self._worker is not None or self._app is None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='search-history-writer')
+                self._worker.daemon = True
+                self._worker.start()
+
+    def shutdown(self, timeout=10):
+        """Dừng luồng nền sau khi ghi hết hàng đợi"""
+        if self._queue is None:
+            return
+        with self._worker_lock:
+            worker, self._worker = self._worker, None
+        if worker is None:
+            self._drain(self._app.config.get('SEARCH_HISTORY_BATCH_SIZE', 100))
+            return
+        # put có chặn: hàng đợi đầy thì chờ luồng nền lấy bớt
+        try:
+            self._queue.put(self._STOP, timeout=timeout)
+        except queue.Full:
+            print('Lỗi dừng ghi lịch sử tìm kiếm: hàng đợi vẫn đầy')
+            return
+        worker.join(timeout)
+
+
+search_history_writer = SearchHistoryWriter()
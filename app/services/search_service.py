@@ -0,0 +1,323 @@
+from flask import current_app
+from app import db
+from app.models.hotel import Hotel
+from app.models.room import Room
+from app.models.review import Review
+from app.models.cancellation_policy import CancellationPolicy
+from app.models.promotion import Promotion
+from app.models.hotel_stats import HotelStats
+from app.models.hotel_amenity import hotel_amenities
+from app.services.destination_index import destination_index
+from app.services.suggestion_index import suggestion_index
+from app.utils.geo import KM_PER_DEGREE, bbox_around, cells_in_bbox, haversine_km
+from sqlalchemy import Float, Integer, and_, case, cast, func, literal, or_, select, type_coerce
+from datetime import datetime
+from decimal import Decimal
+import math
+
+
+class SearchService:
+    # Giá hiển thị mặc định khi khách sạn chưa có phòng trống
+    DEFAULT_MIN_PRICE = 1000000
+    # Khách sạn chưa có giá luôn đứng cuối khi sắp xếp theo giá (giá trị lớn nhất của Numeric(10, 2))
+    MAX_SORT_PRICE = Decimal('99999999.99')
+    HOTEL_SORTS = ('price_asc', 'price_desc', 'rating_desc', 'rating_asc', 'reviews', 'newest', 'distance')
+    SORT_ALIASES = {'rating': 'rating_desc', 'popular': 'reviews'}
+    # Năm mặc định cho khách sạn thiếu created_at khi sắp xếp mới nhất (khóa cursor không được NULL)
+    MIN_SORT_DATETIME = datetime(1970, 1, 1)
+    BBOX_PARAMS = ('min_lat', 'min_lng', 'max_lat', 'max_lng')
+
+    @staticmethod
+    def destination_filter(destination):
+        """Điều kiện lọc điểm đến.
+
+        Dùng chỉ mục bỏ dấu trong bộ nhớ để lấy hotel_id ứng viên rồi lọc bằng IN;
+        quay về ilike khi chỉ mục bị tắt hoặc khớp quá DESTINATION_INDEX_MAX_IDS khách sạn
+        (danh sách IN dài hơn thì chậm hơn ilike và vượt giới hạn tham số của driver).
+        """
+        config = current_app.config
+        if config.get('DESTINATION_INDEX_ENABLED', True):
+            destination_index.ensure_fresh(config.get('DESTINATION_INDEX_MAX_AGE', 300))
+            hotel_ids = destination_index.search(destination, limit=config.get('DESTINATION_INDEX_MAX_IDS', 2000))
+            if hotel_ids is not None:
+                return Hotel.hotel_id.in_(sorted(hotel_ids))
+
+        return or_(
+            Hotel.city.ilike(f'%{destination}%'),
+            Hotel.address.ilike(f'%{destination}%'),
+            Hotel.hotel_name.ilike(f'%{destination}%')
+        )
+
+    @staticmethod
+    def price_filter(min_price=None, max_price=None):
+        """Điều kiện "có phòng đang mở bán với giá trong [min_price, max_price]".
+
+        EXISTS tương quan trên rooms (chỉ mục hotel_id) thay vì join Room: mỗi khách sạn
+        xuất hiện một lần dù nhiều phòng khớp, nên không nhân bản dòng và không cần DISTINCT.
+        """
+        conditions = [Room.status == 'available']
+        if min_price:
+            conditions.append(Room.base_price >= min_price)
+        if max_price:
+            conditions.append(Room.base_price <= max_price)
+        return Hotel.rooms.any(and_(*conditions))
+
+    @staticmethod
+    def promotion_filter(now=None):
+        """Điều kiện "khách sạn có khuyến mãi đang chạy": EXISTS tương quan trên promotions,
+        không dựng danh sách IN trong Python (độ dài không phụ thuộc số khách sạn có khuyến mãi)"""
+        now = now or datetime.utcnow()
+        return Hotel.promotions.any(and_(
+            Promotion.is_active.is_(True),
+            Promotion.start_date <= now,
+            Promotion.end_date >= now
+        ))
+
+    @staticmethod
+    def amenity_filter(amenity_ids):
+        """Điều kiện "có đủ tất cả tiện nghi đã chọn" trong một semijoin.
+
+        Một subquery duy nhất trên hotel_amenities: GROUP BY hotel_id HAVING COUNT(amenity_id) = k,
+        thay cho k subquery EXISTS tương quan. (hotel_id, amenity_id) là khóa chính và danh sách id
+        đã loại trùng nên COUNT(*) tương đương COUNT(DISTINCT amenity_id) mà không cần khử trùng.
+        """
+        amenity_ids = sorted(set(amenity_ids))
+        matching = select(hotel_amenities.c.hotel_id)\
+            .where(hotel_amenities.c.amenity_id.in_(amenity_ids))\
+            .group_by(hotel_amenities.c.hotel_id)\
+            .having(func.count() == len(amenity_ids))
+        return Hotel.hotel_id.in_(matching)
+
+    @staticmethod
+    def geo_origin(data):
+        """Điểm gốc (lat, lng) để lọc bán kính và tính khoảng cách; None khi không có tọa độ"""
+        if data.get('lat') is None or data.get('lng') is None:
+            return None
+        return float(data['lat']), float(data['lng'])
+
+    @staticmethod
+    def geo_filter(data):
+        """Điều kiện lọc theo bán kính (lat, lng, radius_km) hoặc khung bản đồ (min_lat, min_lng, max_lat, max_lng).
+
+        Khung bao được quy về danh sách ô lưới để lọc bằng index geo_cell, sau đó cắt theo khoảng
+        tọa độ; với bán kính, điểm trong khung được so khoảng cách xấp xỉ (equirectangular) ngay
+        trong SQL nên không cần tính haversine cho từng dòng. Trả về list điều kiện (rỗng nếu không lọc).
+        """
+        origin = SearchService.geo_origin(data)
+        radius_km = data.get('radius_km')
+        if origin and radius_km:
+            bbox = bbox_around(origin[0], origin[1], float(radius_km))
+        elif all(data.get(param) is not None for param in SearchService.BBOX_PARAMS):
+            bbox = tuple(float(data[param]) for param in SearchService.BBOX_PARAMS)
+        else:
+            return []
+
+        min_lat, min_lng, max_lat, max_lng = bbox
+        conditions = [
+            Hotel.latitude.between(min_lat, max_lat),
+            Hotel.longitude.between(min_lng, max_lng)
+        ]
+        cells = cells_in_bbox(min_lat, min_lng, max_lat, max_lng,
+                              current_app.config.get('GEO_SEARCH_MAX_CELLS', 400))
+        if cells is not None:
+            conditions.insert(0, Hotel.geo_cell.in_(cells))
+        if origin and radius_km:
+            radius_deg = float(radius_km) / KM_PER_DEGREE
+            conditions.append(SearchService._distance_sq(origin) <= radius_deg * radius_deg)
+        return conditions
+
+    @staticmethod
+    def _distance_sq(origin):
+        # Bình phương khoảng cách (độ^2) theo phép chiếu equirectangular quanh điểm gốc
+        lat, lng = origin
+        scale = math.cos(math.radians(lat))
+        delta_lat = Hotel.latitude - lat
+        delta_lng = (Hotel.longitude - lng) * scale
+        return delta_lat * delta_lat + delta_lng * delta_lng
+
+    @staticmethod
+    def distance_km(hotel, origin):
+        if not origin or hotel.latitude is None or hotel.longitude is None:
+            return None
+        return round(haversine_km(origin[0], origin[1], hotel.latitude, hotel.longitude), 2)
+
+    @staticmethod
+    def hotel_sort(query, sort, origin=None):
+        """Chuẩn bị sắp xếp danh sách khách sạn.
+
+        Trả về (query, sort_key, order_by); order_by là list (biểu thức, descending) luôn kết thúc
+        bằng hotel_id để thứ tự là duy nhất (dùng được cho phân trang cursor). Giá, đánh giá và số
+        lượt đánh giá được đọc từ hotel_stats (outer join) nên sắp xếp và phân trang đều nằm trong SQL;
+        sắp xếp theo khoảng cách cần origin (lat, lng). Kiểu sắp xếp không hợp lệ quay về thứ tự
+        mặc định theo hotel_id.
+        """
+        sort = SearchService.SORT_ALIASES.get(sort, sort)
+        if sort not in SearchService.HOTEL_SORTS or (sort == 'distance' and not origin):
+            return query, '', [(Hotel.hotel_id, False)]
+
+        if sort == 'distance':
+            # Khách sạn chưa có tọa độ đứng cuối (cờ 1), giữa chúng xếp theo hotel_id; các khóa
+            # đều khác NULL, khoảng cách đọc dạng Float (không làm tròn theo Numeric) để so sánh
+            # cursor chính xác
+            distance_sq = SearchService._distance_sq(origin)
+            missing = case((distance_sq.is_(None), 1), else_=0)
+            key = type_coerce(func.coalesce(distance_sq, 0), Float)
+            return query, f'distance:{origin[0]},{origin[1]}', [
+                (missing, False), (key, False), (Hotel.hotel_id, False)
+            ]
+
+        if sort == 'newest':
+            key = func.coalesce(Hotel.created_at, literal(SearchService.MIN_SORT_DATETIME))
+            return query, sort, [(key, True), (Hotel.hotel_id, False)]
+
+        query = query.outerjoin(HotelStats, HotelStats.hotel_id == Hotel.hotel_id)
+        if sort == 'price_asc':
+            key = func.coalesce(HotelStats.min_price, literal(SearchService.MAX_SORT_PRICE))
+        elif sort == 'price_desc':
+            key = func.coalesce(HotelStats.min_price, 0)
+        elif sort == 'reviews':
+            key = func.coalesce(HotelStats.review_count, 0)
+        else:
+            # Điểm trung bình x100 dạng số nguyên để so sánh cursor chính xác
+            key = case(
+                (HotelStats.review_count > 0, cast(HotelStats.rating_sum * 100 / HotelStats.review_count, Integer)),
+                else_=0
+            )
+        descending = sort in ('price_desc', 'rating_desc', 'reviews')
+        return query, sort, [(key, descending), (Hotel.hotel_id, False)]
+
+    @staticmethod
+    def get_suggestions(query_text, limit=5):
+        """Gợi ý thành phố và khách sạn cho ô tìm kiếm.
+
+        Trả về (cities, hotels) với cities là list tên thành phố, hotels là list (hotel_id, hotel_name, city).
+        Dùng chỉ mục tiền tố trong bộ nhớ; chỉ truy vấn SQL khi chỉ mục chưa sẵn sàng.
+        """
+        result = suggestion_index.complete(query_text, limit)
+        if result is not None:
+            return result
+
+        cities = db.session.query(Hotel.city).filter(
+            Hotel.city.ilike(f'%{query_text}%'),
+            Hotel.status == 'active'
+        ).distinct().limit(limit).all()
+
+        hotels = db.session.query(Hotel.hotel_id, Hotel.hotel_name, Hotel.city).filter(
+            Hotel.hotel_name.ilike(f'%{query_text}%'),
+            Hotel.status == 'active'
+        ).limit(limit).all()
+
+        return [city for city, in cities], [tuple(hotel) for hotel in hotels]
+
+    @staticmethod
+    def _active_promotion_subquery(hotel_ids, now):
+        return db.session.query(
+            Promotion.hotel_id.label('hotel_id'),
+            func.count(Promotion.promotion_id).label('promotion_count')
+        ).filter(
+            Promotion.hotel_id.in_(hotel_ids),
+            Promotion.is_active == True,
+            Promotion.start_date <= now,
+            Promotion.end_date >= now
+        ).group_by(Promotion.hotel_id).subquery()
+
+    @staticmethod
+    def get_hotel_summaries(hotel_ids):
+        """Lấy giá thấp nhất, đánh giá, hủy miễn phí và khuyến mãi cho cả trang kết quả.
+
+        Đọc từ bảng hotel_stats; khuyến mãi phụ thuộc thời điểm nên vẫn được kiểm tra trực tiếp
+        trong cùng truy vấn. Khách sạn chưa có hàng thống kê được tính bằng truy vấn gộp.
+        Trả về dict {hotel_id: summary}; khách sạn không có dữ liệu vẫn có summary mặc định.
+        """
+        hotel_ids = list(dict.fromkeys(hotel_ids))
+        if not hotel_ids:
+            return {}
+
+        now = datetime.utcnow()
+        promotion_sq = SearchService._active_promotion_subquery(hotel_ids, now)
+
+        rows = db.session.query(HotelStats, promotion_sq.c.promotion_count)\
+            .outerjoin(promotion_sq, promotion_sq.c.hotel_id == HotelStats.hotel_id)\
+            .filter(HotelStats.hotel_id.in_(hotel_ids)).all()
+
+        summaries = {}
+        for stats, promotion_count in rows:
+            summaries[stats.hotel_id] = SearchService._build_summary(
+                stats.min_price, stats.review_count, stats.avg_rating,
+                stats.has_free_cancellation, promotion_count
+            )
+
+        missing_ids = [hotel_id for hotel_id in hotel_ids if hotel_id not in summaries]
+        if missing_ids:
+            summaries.update(SearchService._aggregate_summaries(missing_ids, now))
+
+        return {hotel_id: summaries[hotel_id] for hotel_id in hotel_ids}
+
+    @staticmethod
+    def _aggregate_summaries(hotel_ids, now):
+        """Tính summary trực tiếp từ các bảng gốc trong một truy vấn (dùng khi hotel_stats chưa được backfill)"""
+        # Mỗi bảng con được gộp theo hotel_id và giới hạn trong các khách sạn của trang
+        room_sq = db.session.query(
+            Room.hotel_id.label('hotel_id'),
+            func.min(Room.base_price).label('min_price')
+        ).filter(
+            Room.hotel_id.in_(hotel_ids),
+            Room.status == 'available'
+        ).group_by(Room.hotel_id).subquery()
+
+        review_sq = db.session.query(
+            Review.hotel_id.label('hotel_id'),
+            func.count(Review.review_id).label('review_count'),
+            func.avg(Review.rating).label('avg_rating')
+        ).filter(
+            Review.hotel_id.in_(hotel_ids),
+            Review.status == 'active'
+        ).group_by(Review.hotel_id).subquery()
+
+        policy_sq = db.session.query(
+            CancellationPolicy.hotel_id.label('hotel_id'),
+            func.count(CancellationPolicy.policy_id).label('free_cancel_count')
+        ).filter(
+            CancellationPolicy.hotel_id.in_(hotel_ids),
+            CancellationPolicy.refund_percentage == 100.00
+        ).group_by(CancellationPolicy.hotel_id).subquery()
+
+        promotion_sq = SearchService._active_promotion_subquery(hotel_ids, now)
+
+        rows = db.session.query(
+            Hotel.hotel_id,
+            room_sq.c.min_price,
+            review_sq.c.review_count,
+            review_sq.c.avg_rating,
+            policy_sq.c.free_cancel_count,
+            promotion_sq.c.promotion_count
+        ).outerjoin(room_sq, room_sq.c.hotel_id == Hotel.hotel_id)\
+         .outerjoin(review_sq, review_sq.c.hotel_id == Hotel.hotel_id)\
+         .outerjoin(policy_sq, policy_sq.c.hotel_id == Hotel.hotel_id)\
+         .outerjoin(promotion_sq, promotion_sq.c.hotel_id == Hotel.hotel_id)\
+         .filter(Hotel.hotel_id.in_(hotel_ids)).all()
+
+        summaries = {hotel_id: SearchService._build_summary() for hotel_id in hotel_ids}
+        for hotel_id, min_price, review_count, avg_rating, free_cancel_count, promotion_count in rows:
+            summaries[hotel_id] = SearchService._build_summary(
+                min_price, review_count, avg_rating, free_cancel_count, promotion_count
+            )
+
+        return summaries
+
+    @staticmethod
+    def _build_summary(min_price=None, review_count=None, avg_rating=None,
+                       free_cancel_count=None, promotion_count=None):
+        # Chuyển đổi avg_rating sang float an toàn
+        try:
+            avg_rating_float = float(avg_rating) if avg_rating is not None else 0.0
+        except (TypeError, ValueError):
+            avg_rating_float = 0.0
+
+        return {
+            'min_price': int(min_price or SearchService.DEFAULT_MIN_PRICE),
+            'review_count': int(review_count or 0),
+            'avg_rating': round(avg_rating_float, 1) if avg_rating_float > 0 else 0.0,
+            'has_free_cancellation': bool(free_cancel_count),
+            'has_active_promotion': bool(promotion_count)
+        }
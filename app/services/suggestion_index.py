@@ -0,0 +1,190 @@
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from sqlalchemy import event, func
+
+from app.utils.helpers import fold_diacritics
+
+
+class RankedPrefixTable:
+    """Bảng tiền tố có xếp hạng (trie được làm phẳng thành mảng khóa đã sắp xếp).
+
+    Mỗi mục được đánh khóa tại đầu từng từ của văn bản đã bỏ dấu, nên 'nang' và 'da n'
+    đều gợi ý 'Đà Nẵng'. Các khóa có chung tiền tố nằm liền nhau, nên một tiền tố ứng với
+    một đoạn [lo, hi) tìm bằng bisect. Top-k cho các tiền tố ngắn (đoạn lớn nhất) được tính sẵn.
+    """
+
+    def __init__(self, items, top_k=10, cached_prefix_len=3):
+        # items: danh sách (text, weight, payload); weight càng lớn càng được ưu tiên
+        self.top_k = top_k
+        self.cached_prefix_len = cached_prefix_len
+        self._weights = []
+        self._payloads = []
+
+        pairs = []
+        for ref, (text, weight, payload) in enumerate(items):
+            self._weights.append(weight)
+            self._payloads.append(payload)
+            folded = fold_diacritics(text)
+            words = folded.split(' ')
+            start = 0
+            for word in words:
+                if word:
+                    pairs.append((folded[start:], ref))
+                start += len(word) + 1
+        pairs.sort()
+        self._keys = [key for key, _ in pairs]
+        self._refs = array('I', (ref for _, ref in pairs))
+
+        buckets = {}
+        for key, ref in pairs:
+            for length in range(1, min(len(key), cached_prefix_len) + 1):
+                buckets.setdefault(key[:length], set()).add(ref)
+        self._top = {prefix: self._rank(refs, top_k) for prefix, refs in buckets.items()}
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def _rank(self, refs, limit):
+        weights = self._weights
+        return [self._payloads[ref] for ref in heapq.nlargest(limit, refs, key=lambda ref: (weights[ref], -ref))]
+
+    def complete(self, prefix, limit):
+        if not prefix:
+            return []
+        if limit <= self.top_k and len(prefix) <= self.cached_prefix_len:
+            return self._top.get(prefix, [])[:limit]
+
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + '\uffff', lo)
+        return self._rank(set(self._refs[lo:hi]), limit)
+
+
+class SuggestionIndex:
+    """Chỉ mục gợi ý tìm kiếm (thành phố + tên khách sạn) trong bộ nhớ.
+
+    Thành phố được xếp theo số khách sạn active, khách sạn theo nổi bật rồi số đánh giá.
+    Chỉ mục được dựng lại bởi luồng nền sau mỗi khoảng thời gian cố định, hoặc sớm hơn khi
+    có khách sạn thay đổi (sự kiện commit của session). Khi chưa dựng xong, complete() trả về None
+    để nơi gọi dùng truy vấn SQL.
+    """
+
+    def __init__(self):
+        self._cities = None
+        self._hotels = None
+        self._built_at = None
+        self._app = None
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._changed = threading.Event()
+
+    @property
+    def is_ready(self):
+        return self._built_at is not None
+
+    def init_app(self, app):
+        from app import db
+
+        if not app.config.get('SUGGESTION_INDEX_ENABLED', True):
+            return
+        self._app = app
+        if not event.contains(db.session, 'after_flush', SuggestionIndex._after_flush):
+            event.listen(db.session, 'after_flush', SuggestionIndex._after_flush)
+            event.listen(db.session, 'after_commit', SuggestionIndex._after_commit)
+            event.listen(db.session, 'after_rollback', SuggestionIndex._after_rollback)
+
+    @staticmethod
+    def _after_flush(session, flush_context):
+        from app.models.hotel import Hotel
+
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, Hotel):
+                session.info['suggestion_index_changed'] = True
+                return
+
+    @staticmethod
+    def _after_commit(session):
+        if session.info.pop('suggestion_index_changed', False):
+            suggestion_index.mark_changed()
+
+    @staticmethod
+    def _after_rollback(session):
+        session.info.pop('suggestion_index_changed', None)
+
+    def mark_changed(self):
+        """Báo cho luồng nền dựng lại chỉ mục"""
+        self._changed.set()
+
+    def build(self, city_rows, hotel_rows, top_k=10):
+        """city_rows: (city, hotel_count); hotel_rows: (hotel_id, hotel_name, city, is_featured, review_count)"""
+        cities = RankedPrefixTable(
+            ((city, hotel_count, city) for city, hotel_count in sorted(city_rows) if city),
+            top_k=top_k
+        )
+        hotels = RankedPrefixTable(
+            ((hotel_name, (bool(is_featured), review_count or 0), (hotel_id, hotel_name, city))
+             for hotel_id, hotel_name, city, is_featured, review_count in sorted(hotel_rows)),
+            top_k=top_k
+        )
+        # Gán tham chiếu là nguyên tử: request đang chạy vẫn đọc bản cũ
+        self._cities, self._hotels = cities, hotels
+        self._built_at = time.monotonic()
+
+    def rebuild_from_db(self):
+        from app import db
+        from app.models.hotel import Hotel
+        from app.models.hotel_stats import HotelStats
+
+        city_rows = db.session.query(Hotel.city, func.count(Hotel.hotel_id))\
+            .filter(Hotel.status == 'active')\
+            .group_by(Hotel.city).all()
+        hotel_rows = db.session.query(
+            Hotel.hotel_id, Hotel.hotel_name, Hotel.city, Hotel.is_featured, HotelStats.review_count
+        ).outerjoin(HotelStats, HotelStats.hotel_id == Hotel.hotel_id)\
+         .filter(Hotel.status == 'active').yield_per(5000)
+        self.build(city_rows, hotel_rows)
+
+    def _run(self):
+        app = self._app
+        interval = app.config.get('SUGGESTION_INDEX_REFRESH_INTERVAL', 300)
+        debounce = app.config.get('SUGGESTION_INDEX_DEBOUNCE', 2)
+        while True:
+            with app.app_context():
+                try:
+                    self.rebuild_from_db()
+                except Exception as e:
+                    print(f'Lỗi dựng chỉ mục gợi ý: {str(e)}')
+                finally:
+                    from app import db
+                    db.session.remove()
+
+            if self._changed.wait(timeout=interval):
+                # Gom các thay đổi liên tiếp vào một lần dựng lại
+                time.sleep(debounce)
+                self._changed.clear()
+
+    def start(self):
+        """Khởi động luồng nền (chỉ một lần cho mỗi process)"""
+        if self._worker is not None or self._app is None:
+            return
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='suggestion-index')
+                self._worker.daemon = True
+                self._worker.start()
+
+    def complete(self, query_text, limit=5):
+        """Trả về (cities, hotels) khớp tiền tố, hoặc None khi chỉ mục bị tắt hoặc chưa sẵn sàng"""
+        self.start()
+        cities, hotels = self._cities, self._hotels
+        if cities is None or hotels is None:
+            return None
+
+        prefix = fold_diacritics(query_text)
+        return cities.complete(prefix, limit), hotels.complete(prefix, limit)
+
+
+suggestion_index = SuggestionIndex()
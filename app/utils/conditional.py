@@ -0,0 +1,79 @@
+import hashlib
+import json
+from datetime import date, timezone
+
+from flask import current_app, make_response, render_template, request, session
+
+
+class CacheValidator:
+    """ETag (yếu) và Last-Modified của một phản hồi, tính từ dấu vết rẻ của dữ liệu nguồn.
+
+    Controller tạo validator trước khi dựng phản hồi: nếu request có If-None-Match khớp
+    (hoặc chỉ có If-Modified-Since và dữ liệu không mới hơn) thì trả 304 ngay, bỏ qua
+    truy vấn và serialize. If-None-Match được ưu tiên vì ETag còn phản ánh xóa/thêm bản ghi,
+    điều max(updated_at) không thấy được.
+
+    private=True dùng cho phản hồi phụ thuộc phiên đăng nhập: ETag gồm user_id,
+    không gửi Last-Modified, không trả 304 khi còn thông báo flash chưa hiển thị.
+    sources: dấu vết theo từng nguồn, để tính phiên bản của một phần trang (khóa cache đoạn HTML).
+    """
+
+    def __init__(self, parts, last_modified=None, private=False, sources=None):
+        self.private = private
+        self.sources = sources or {}
+        if private:
+            parts = [session.get('user_id'), date.today(), *parts]
+            last_modified = None
+        payload = json.dumps([current_app.config.get('CONDITIONAL_GET_VERSION', '1'), *parts],
+                             default=str, ensure_ascii=False)
+        self.etag = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        # HTTP-date chỉ chính xác đến giây
+        self.last_modified = last_modified.replace(microsecond=0, tzinfo=timezone.utc) \
+            if last_modified is not None else None
+
+    def _matches(self):
+        if request.if_none_match:
+            return request.if_none_match.contains_weak(self.etag)
+        if request.if_modified_since and self.last_modified is not None:
+            return self.last_modified <= request.if_modified_since
+        return False
+
+    def not_modified(self):
+        """Phản hồi 304 nếu bản của client còn mới, ngược lại None"""
+        if not current_app.config.get('CONDITIONAL_GET_ENABLED', True):
+            return None
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        if self.private and session.get('_flashes'):
+            return None
+        if not self._matches():
+            return None
+        return self.apply((make_response('', 304), 304))
+
+    def apply(self, result):
+        """Gắn ETag/Last-Modified vào kết quả (response, status) của controller"""
+        response, status_code = result
+        if status_code not in (200, 304) or not current_app.config.get('CONDITIONAL_GET_ENABLED', True):
+            return result
+        response.set_etag(self.etag, weak=True)
+        if self.last_modified is not None:
+            response.last_modified = self.last_modified
+        if self.private:
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+        else:
+            response.headers['Cache-Control'] = 'public, no-cache'
+        return result
+
+
+def render_conditional(result, template, **context):
+    """Render template cho route HTML: trả thẳng 304 của controller, ngược lại chép ETag sang trang HTML"""
+    source, status_code = result
+    if status_code == 304:
+        return source
+    response = make_response(render_template(template, result=result, **context))
+    if status_code == 200:
+        for header in ('ETag', 'Last-Modified', 'Cache-Control', 'Vary'):
+            if header in source.headers:
+                response.headers[header] = source.headers[header]
+    return response
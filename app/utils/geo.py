@@ -0,0 +1,54 @@
+import math
+from decimal import Decimal
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Kích thước ô lưới (độ), khoảng 5.5 km theo vĩ độ
+GEO_CELL_DEGREES = Decimal('0.05')
+GEO_CELL_COLUMNS = int(360 / GEO_CELL_DEGREES)
+
+
+def _cell_index(value, offset):
+    # Tính bằng Decimal để khớp với FLOOR trên cột Numeric khi backfill bằng SQL
+    return int(((Decimal(str(value)) + offset) / GEO_CELL_DEGREES).to_integral_value(rounding='ROUND_FLOOR'))
+
+
+def geo_cell(latitude, longitude):
+    """Mã ô lưới của một tọa độ: hàng theo vĩ độ * số cột + cột theo kinh độ.
+
+    Trả về None khi thiếu tọa độ.
+    """
+    if latitude is None or longitude is None:
+        return None
+    return _cell_index(latitude, 90) * GEO_CELL_COLUMNS + _cell_index(longitude, 180) % GEO_CELL_COLUMNS
+
+
+def cells_in_bbox(min_lat, min_lng, max_lat, max_lng, max_cells):
+    """Danh sách ô lưới phủ khung (min_lat, min_lng) - (max_lat, max_lng).
+
+    Trả về None khi khung phủ quá max_cells ô (khi đó chỉ lọc theo khoảng tọa độ).
+    """
+    min_row, max_row = _cell_index(min_lat, 90), _cell_index(max_lat, 90)
+    min_column, max_column = _cell_index(min_lng, 180), _cell_index(max_lng, 180)
+    if (max_row - min_row + 1) * (max_column - min_column + 1) > max_cells:
+        return None
+    return [row * GEO_CELL_COLUMNS + column % GEO_CELL_COLUMNS
+            for row in range(min_row, max_row + 1)
+            for column in range(min_column, max_column + 1)]
+
+
+def bbox_around(latitude, longitude, radius_km):
+    """Khung bao (min_lat, min_lng, max_lat, max_lng) chứa trọn vòng tròn bán kính radius_km"""
+    delta_lat = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(min(abs(latitude) + delta_lat, 89.9)))
+    delta_lng = min(radius_km / (KM_PER_DEGREE * cos_lat), 180)
+    return (max(latitude - delta_lat, -90), max(longitude - delta_lng, -180),
+            min(latitude + delta_lat, 90), min(longitude + delta_lng, 180))
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (float(lat1), float(lng1), float(lat2), float(lng2)))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
@@ -1,5 +1,7 @@
+import re
 import secrets
 import string
+import unicodedata
 from datetime import datetime, timedelta
 
 def generate_random_token(length=32):
@@ -19,3 +21,15 @@ def is_token_expired(created_at, expiry_hours=24):
     return datetime.utcnow() > expiry_time
 
 
+
+def fold_diacritics(text):
+    """Bỏ dấu tiếng Việt, chuyển về chữ thường và gom ký tự không phải chữ/số thành một khoảng trắng.
+
+    Ví dụ: 'Đà Nẵng' -> 'da nang'
+    """
+    if not text:
+        return ''
+    text = str(text).replace('Đ', 'D').replace('đ', 'd')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return ' '.join(re.split(r'[^0-9a-z]+', text)).strip()
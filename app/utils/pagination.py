@@ -0,0 +1,107 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, or_, tuple_
+
+
+class CursorError(ValueError):
+    """Cursor không giải mã được hoặc không khớp với kiểu sắp xếp hiện tại"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'t': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'n': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 't' in value:
+            return datetime.fromisoformat(value['t'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'n' in value:
+            return Decimal(value['n'])
+        raise CursorError('Giá trị cursor không hợp lệ')
+    return value
+
+
+def encode_cursor(sort_key, values):
+    """Mã hóa khóa sắp xếp của bản ghi cuối trang thành chuỗi base64 an toàn cho URL"""
+    payload = json.dumps({'s': sort_key, 'k': [_encode_value(value) for value in values]},
+                         separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort_key, size):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        values = [_decode_value(value) for value in payload['k']]
+    except CursorError:
+        raise
+    except Exception:
+        raise CursorError('Cursor không hợp lệ')
+    if payload.get('s') != sort_key or len(values) != size:
+        raise CursorError('Cursor không khớp với kiểu sắp xếp')
+    return values
+
+
+def _after(order_by, values):
+    """Điều kiện "đứng sau bản ghi cursor" theo thứ tự order_by"""
+    directions = {descending for _, descending in order_by}
+    if len(directions) == 1:
+        # Cùng chiều: so sánh bộ giá trị (row value), dùng được index nhiều cột
+        columns = tuple_(*[expression for expression, _ in order_by])
+        bound = tuple_(*values)
+        return columns < bound if directions.pop() else columns > bound
+
+    clauses = []
+    for index, (expression, descending) in enumerate(order_by):
+        prefix = [order_by[i][0] == values[i] for i in range(index)]
+        clauses.append(and_(*prefix, expression < values[index] if descending else expression > values[index]))
+    return or_(*clauses)
+
+
+def _ordered(query, order_by):
+    # Các biểu thức sắp xếp được chọn kèm để ORDER BY hợp lệ với DISTINCT và để đọc giá trị cursor
+    query = query.order_by(*[expression.desc() if descending else expression.asc()
+                             for expression, descending in order_by])
+    return query.add_columns(*[expression for expression, _ in order_by])
+
+
+def keyset_paginate(query, order_by, per_page, cursor=None, sort_key=''):
+    """Phân trang theo khóa (keyset) thay cho OFFSET.
+
+    order_by: list (biểu thức, descending); phần tử cuối phải là khóa duy nhất (thường là id)
+    và các biểu thức không được NULL. cursor rỗng/None là trang đầu.
+    Trả về (items, next_cursor); next_cursor là None ở trang cuối.
+    """
+    if cursor:
+        query = query.filter(_after(order_by, decode_cursor(cursor, sort_key, len(order_by))))
+
+    rows = _ordered(query, order_by).limit(per_page + 1).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(sort_key, list(rows[-1])[1:])
+    return [row[0] for row in rows], next_cursor
+
+
+def paginate(query, order_by, page, per_page, cursor=None, sort_key=''):
+    """Phân trang theo cursor khi có tham số cursor, ngược lại dùng page/per_page như cũ.
+
+    Trả về (items, next_cursor); ở chế độ page next_cursor luôn là None.
+    """
+    if cursor is not None:
+        return keyset_paginate(query, order_by, per_page, cursor=cursor, sort_key=sort_key)
+
+    rows = _ordered(query, order_by).offset((page - 1) * per_page).limit(per_page).all()
+    return [row[0] for row in rows], None
@@ -36,15 +36,25 @@ def validation_error_response(errors):
         errors=errors
     )
 
-def paginated_response(items, page, per_page, total, message='Success'):
+# Giá trị mặc định cho next_cursor: endpoint không hỗ trợ cursor thì không trả khóa này
+_NO_CURSOR = object()
+
+def paginated_response(items, page, per_page, total, message='Success', next_cursor=_NO_CURSOR, total_exact=None):
+    pagination = {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        # Tổng bị chặn trên thì không biết số trang: trả null thay vì một số trông như chính xác
+        'pages': (total + per_page - 1) // per_page if total_exact is not False else None
+    }
+    if next_cursor is not _NO_CURSOR:
+        pagination['next_cursor'] = next_cursor
+    # total_exact=False: total là giá trị chặn trên ("1000+"), không phải số chính xác
+    if total_exact is not None:
+        pagination['total_exact'] = total_exact
     return jsonify({
         'success': True,
         'message': message,
         'data': items,
-        'pagination': {
-            'page': page,
-            'per_page': per_page,
-            'total': total,
-            'pages': (total + per_page - 1) // per_page
-        }
-    }), 200
\ No newline at end of file
+        'pagination': pagination
+    }), 200
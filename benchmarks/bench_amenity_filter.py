@@ -0,0 +1,114 @@
+# So sánh lọc "có đủ các tiện nghi đã chọn": mỗi tiện nghi một EXISTS (cách cũ)
+# và một semijoin GROUP BY hotel_id HAVING COUNT(DISTINCT amenity_id) = k.
+#
+# Chạy: python benchmarks/bench_amenity_filter.py [số_khách_sạn] [số_tiện_nghi]
+# Mặc định 20000 khách sạn, 30 tiện nghi trên SQLite trong bộ nhớ; đặt BENCH_DATABASE_URL để dùng CSDL khác.
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.amenity import Amenity
+from app.models.hotel import Hotel
+from app.models.hotel_amenity import hotel_amenities
+from app.models.role import Role
+from app.models.user import User
+from app.services.search_service import SearchService
+from config.config import Config
+
+
+class BenchmarkConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCH_DATABASE_URL', 'sqlite://')
+    SQLALCHEMY_ECHO = False
+    TESTING = True
+
+
+def seed(hotel_count, amenity_count, batch_size=10000):
+    rng = random.Random(7)
+    role = Role(role_name='hotel_owner', description='Owner')
+    db.session.add(role)
+    db.session.flush()
+    user = User(email='bench-owner@example.com', full_name='Bench Owner', role_id=role.role_id)
+    user.set_password('bench')
+    db.session.add(user)
+    db.session.commit()
+
+    db.session.execute(Amenity.__table__.insert(), [
+        {'amenity_name': f'Tiện nghi {i}'} for i in range(amenity_count)
+    ])
+    amenity_ids = [row[0] for row in db.session.query(Amenity.amenity_id).order_by(Amenity.amenity_id)]
+
+    for start in range(0, hotel_count, batch_size):
+        end = min(start + batch_size, hotel_count)
+        db.session.execute(Hotel.__table__.insert(), [{
+            'owner_id': user.user_id,
+            'hotel_name': f'Khách sạn {i}',
+            'address': f'{i} Trần Phú',
+            'city': 'Đà Nẵng',
+            'status': 'active'
+        } for i in range(start, end)])
+    hotel_ids = [row[0] for row in db.session.query(Hotel.hotel_id)]
+
+    # Tiện nghi phổ biến (id nhỏ) xuất hiện ở nhiều khách sạn hơn
+    links = []
+    for hotel_id in hotel_ids:
+        for rank, amenity_id in enumerate(amenity_ids):
+            if rng.random() < 0.9 / (1 + rank * 0.15):
+                links.append({'hotel_id': hotel_id, 'amenity_id': amenity_id})
+    for start in range(0, len(links), batch_size):
+        db.session.execute(hotel_amenities.insert(), links[start:start + batch_size])
+    db.session.commit()
+    return amenity_ids, len(links)
+
+
+def per_amenity_exists(amenity_ids, per_page=20):
+    query = Hotel.query.filter_by(status='active')
+    for amenity_id in amenity_ids:
+        query = query.filter(Hotel.amenities.any(Amenity.amenity_id == amenity_id))
+    total = query.count()
+    return total, query.order_by(Hotel.hotel_id).limit(per_page).all()
+
+
+def grouped_semijoin(amenity_ids, per_page=20):
+    query = Hotel.query.filter_by(status='active').filter(SearchService.amenity_filter(amenity_ids))
+    total = query.count()
+    return total, query.order_by(Hotel.hotel_id).limit(per_page).all()
+
+
+def run(hotel_count, amenity_count, repeat=3):
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        try:
+            started = time.perf_counter()
+            amenity_ids, link_count = seed(hotel_count, amenity_count)
+            print(f'Seeded {hotel_count} hotels, {link_count} hotel_amenities rows in {time.perf_counter() - started:.1f}s')
+            print(f'{"k":>3}{"EXISTS x k":>15}{"GROUP BY":>15}{"matches":>10}')
+
+            for k in range(1, 6):
+                selected = amenity_ids[:k]
+                timings = []
+                totals = set()
+                for func_ in (per_amenity_exists, grouped_semijoin):
+                    best = None
+                    for _ in range(repeat):
+                        db.session.expire_all()
+                        started = time.perf_counter()
+                        total, _ = func_(selected)
+                        elapsed = time.perf_counter() - started
+                        best = elapsed if best is None else min(best, elapsed)
+                    timings.append(best)
+                    totals.add(total)
+                assert len(totals) == 1, 'Hai cách lọc trả về số kết quả khác nhau'
+                print(f'{k:>3}{timings[0] * 1000:>12.1f} ms{timings[1] * 1000:>12.1f} ms{totals.pop():>10}')
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 30)
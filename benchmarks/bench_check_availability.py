@@ -0,0 +1,150 @@
+### benchmarks/bench_check_availability.py
+# So sánh kiểm tra phòng trống: vòng lặp từng phòng (cách cũ) và một truy vấn anti-join.
+#
+# Chạy: python benchmarks/bench_check_availability.py [số_phòng] [số_booking_detail]
+# Mặc định 1000 phòng, 100000 booking detail trên SQLite trong bộ nhớ; đặt BENCH_DATABASE_URL để dùng CSDL khác.
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+
+from app import create_app, db
+from app.models.booking import Booking
+from app.models.booking_detail import BookingDetail
+from app.models.hotel import Hotel
+from app.models.role import Role
+from app.models.room import Room
+from app.models.room_type import RoomType
+from app.models.user import User
+from app.services.availability_service import AvailabilityService
+from config.config import Config
+
+
+class BenchmarkConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCH_DATABASE_URL', 'sqlite://')
+    SQLALCHEMY_ECHO = False
+    TESTING = True
+
+
+ROOMS_PER_HOTEL = 20
+STATUSES = ['pending', 'confirmed', 'checked_in', 'checked_out', 'cancelled', 'refunded']
+
+
+def seed(total_rooms, total_details, batch_size=10000):
+    rng = random.Random(7)
+    role = Role(role_name='customer', description='Customer')
+    db.session.add(role)
+    db.session.flush()
+    user = User(email='bench-user@example.com', full_name='Bench User', role_id=role.role_id)
+    user.set_password('bench')
+    room_type = RoomType(type_name='Standard')
+    db.session.add_all([user, room_type])
+    db.session.commit()
+
+    hotel_count = (total_rooms + ROOMS_PER_HOTEL - 1) // ROOMS_PER_HOTEL
+    db.session.execute(Hotel.__table__.insert(), [{
+        'owner_id': user.user_id,
+        'hotel_name': f'Khách sạn {i}',
+        'address': f'{i} Trần Phú',
+        'city': 'Đà Nẵng',
+        'status': 'active'
+    } for i in range(hotel_count)])
+    hotel_ids = [row[0] for row in db.session.query(Hotel.hotel_id).order_by(Hotel.hotel_id)]
+    db.session.execute(Room.__table__.insert(), [{
+        'hotel_id': hotel_ids[i // ROOMS_PER_HOTEL],
+        'room_type_id': room_type.type_id,
+        'room_name': f'Phòng {i}',
+        'max_guests': rng.randint(1, 4),
+        'base_price': 500000,
+        'status': 'available'
+    } for i in range(total_rooms)])
+    rooms = db.session.query(Room.room_id, Room.hotel_id).all()
+
+    today = date.today()
+    for start in range(0, total_details, batch_size):
+        end = min(start + batch_size, total_details)
+        picks = [rng.choice(rooms) for _ in range(start, end)]
+        check_ins = [today + timedelta(days=rng.randint(-365, 365)) for _ in range(start, end)]
+        db.session.execute(Booking.__table__.insert(), [{
+            'booking_code': f'BENCH{start + i:08d}',
+            'user_id': user.user_id,
+            'hotel_id': hotel_id,
+            'check_in_date': check_in,
+            'check_out_date': check_in + timedelta(days=rng.randint(1, 5)),
+            'num_guests': 2,
+            'total_amount': 0,
+            'final_amount': 0,
+            'status': rng.choice(STATUSES)
+        } for i, ((_, hotel_id), check_in) in enumerate(zip(picks, check_ins))])
+        booking_ids = [row[0] for row in db.session.query(Booking.booking_id)
+                       .filter(Booking.booking_code >= f'BENCH{start:08d}')
+                       .order_by(Booking.booking_code).limit(end - start)]
+        db.session.execute(BookingDetail.__table__.insert(), [{
+            'booking_id': booking_id,
+            'room_id': room_id,
+            'quantity': 1,
+            'price_per_night': 500000,
+            'num_nights': 1,
+            'subtotal': 500000
+        } for booking_id, (room_id, _) in zip(booking_ids, picks)])
+    db.session.commit()
+
+
+def per_room_loop(check_in, check_out, num_guests):
+    """Cách cũ: một truy vấn SUM cho mỗi phòng ứng viên, ảnh và khách sạn nạp lazy"""
+    free = []
+    for room in Room.query.filter(Room.status == 'available', Room.max_guests >= num_guests).all():
+        booked = db.session.query(func.count(BookingDetail.detail_id))\
+            .join(Booking, Booking.booking_id == BookingDetail.booking_id)\
+            .filter(
+                BookingDetail.room_id == room.room_id,
+                Booking.status.in_(AvailabilityService.BLOCKING_STATUSES),
+                Booking.check_in_date < check_out,
+                Booking.check_out_date > check_in
+            ).scalar()
+        if not booked:
+            room.hotel, room.images
+            free.append(room.room_id)
+    return free
+
+
+def set_based(check_in, check_out, num_guests):
+    rooms = AvailabilityService.available_rooms_query(check_in, check_out, num_guests)\
+        .options(selectinload(Room.images), selectinload(Room.hotel)).all()
+    return [room.room_id for room in rooms]
+
+
+def run(total_rooms, total_details, repeat=3):
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        try:
+            started = time.perf_counter()
+            seed(total_rooms, total_details)
+            print(f'Seeded {total_rooms} rooms, {total_details} booking details in {time.perf_counter() - started:.1f}s')
+
+            check_in = date.today() + timedelta(days=30)
+            check_out = check_in + timedelta(days=3)
+            for name, func_ in (('per-room loop', per_room_loop), ('anti-join', set_based)):
+                best = None
+                for _ in range(repeat):
+                    db.session.expire_all()
+                    started = time.perf_counter()
+                    result = func_(check_in, check_out, 2)
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+                print(f'{name:<15}{best * 1000:>10.1f} ms  {len(result)} free rooms')
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
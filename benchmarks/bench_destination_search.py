@@ -0,0 +1,129 @@
+### benchmarks/bench_destination_search.py
+# So sánh tìm kiếm điểm đến: ilike('%x%') trên 3 cột và chỉ mục bỏ dấu + IN.
+#
+# Chạy: python benchmarks/bench_destination_search.py [số_khách_sạn]
+# Mặc định dùng SQLite trong bộ nhớ; đặt BENCH_DATABASE_URL để chạy trên CSDL khác (bảng sẽ được tạo và xóa).
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import or_
+
+from app import create_app, db
+from app.models.hotel import Hotel
+from app.models.role import Role
+from app.models.user import User
+from app.services.destination_index import DestinationIndex
+from config.config import Config
+
+
+class BenchmarkConfig(Config):
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCH_DATABASE_URL', 'sqlite://')
+    SQLALCHEMY_ECHO = False
+    TESTING = True
+
+
+CITIES = [
+    'Hà Nội', 'Hồ Chí Minh', 'Đà Nẵng', 'Hội An', 'Huế', 'Nha Trang', 'Đà Lạt',
+    'Phú Quốc', 'Vũng Tàu', 'Hạ Long', 'Sa Pa', 'Quy Nhơn', 'Cần Thơ', 'Phan Thiết'
+]
+STREETS = [
+    'Trần Phú', 'Lê Lợi', 'Nguyễn Huệ', 'Hai Bà Trưng', 'Lý Thường Kiệt', 'Bạch Đằng',
+    'Võ Nguyên Giáp', 'Điện Biên Phủ', 'Hùng Vương', 'Phạm Văn Đồng', 'Ngô Quyền'
+]
+NAME_PARTS = ['Khách sạn', 'Resort', 'Homestay', 'Boutique', 'Grand', 'Sunrise', 'Biển Xanh', 'Hoàng Gia', 'Mường Thanh']
+
+QUERIES = ['Đà Nẵng', 'Da Nang', 'da lat', 'Hoàng Gia', 'Trần Phú', 'resort', 'xyz không tồn tại', 'Hu']
+
+
+def seed_hotels(total, batch_size=10000):
+    rng = random.Random(42)
+    role = Role(role_name='hotel_owner', description='Hotel Owner')
+    db.session.add(role)
+    db.session.flush()
+    owner = User(email='bench-owner@example.com', full_name='Bench Owner', role_id=role.role_id)
+    owner.set_password('bench')
+    db.session.add(owner)
+    db.session.commit()
+
+    for start in range(0, total, batch_size):
+        rows = []
+        for i in range(start, min(start + batch_size, total)):
+            city = rng.choice(CITIES)
+            rows.append({
+                'owner_id': owner.user_id,
+                'hotel_name': f'{rng.choice(NAME_PARTS)} {rng.choice(NAME_PARTS)} {i}',
+                'address': f'{rng.randint(1, 500)} {rng.choice(STREETS)}, {city}',
+                'city': city,
+                'status': 'active'
+            })
+        db.session.execute(Hotel.__table__.insert(), rows)
+    db.session.commit()
+
+
+def timed(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def ilike_search(destination):
+    return Hotel.query.filter(
+        Hotel.status == 'active',
+        or_(
+            Hotel.city.ilike(f'%{destination}%'),
+            Hotel.address.ilike(f'%{destination}%'),
+            Hotel.hotel_name.ilike(f'%{destination}%')
+        )
+    ).with_entities(Hotel.hotel_id).all()
+
+
+def index_search(index, destination, max_ids):
+    hotel_ids = index.search(destination, limit=max_ids)
+    if hotel_ids is None:
+        return ilike_search(destination)
+    if not hotel_ids:
+        return []
+    return Hotel.query.filter(
+        Hotel.status == 'active',
+        Hotel.hotel_id.in_(sorted(hotel_ids))
+    ).with_entities(Hotel.hotel_id).all()
+
+
+def run(total, repeat=5):
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        try:
+            started = time.perf_counter()
+            seed_hotels(total)
+            print(f'Seeded {total} hotels in {time.perf_counter() - started:.1f}s')
+
+            index = DestinationIndex()
+            build_time, _ = timed(index.rebuild_from_db, 1)
+            print(f'Index build: {build_time * 1000:.0f} ms '
+                  f'({index.size} hotels, {len(index._trigrams)} trigrams, {len(index._tokens)} tokens)')
+
+            max_ids = app.config.get('DESTINATION_INDEX_MAX_IDS', 2000)
+            print(f'{"query":<22}{"ilike ms":>10}{"rows":>8}{"lookup ms":>11}{"index+IN ms":>13}{"rows":>8}')
+            for query in QUERIES:
+                ilike_time, ilike_rows = timed(lambda: ilike_search(query), repeat)
+                lookup_time, _ = timed(lambda: index.search(query), repeat)
+                index_time, index_rows = timed(lambda: index_search(index, query, max_ids), repeat)
+                print(f'{query:<22}{ilike_time * 1000:>10.1f}{len(ilike_rows):>8}'
+                      f'{lookup_time * 1000:>11.2f}{index_time * 1000:>13.1f}{len(index_rows):>8}')
+        finally:
+            db.session.remove()
+            db.drop_all()
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
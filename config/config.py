@@ -34,6 +34,57 @@ class Config:
     PAYPAL_MODE = os.environ.get('PAYPAL_MODE') or os.environ.get('PAYPAL_ENVIRONMENT', 'sandbox')
     PAYPAL_RETURN_URL = os.environ.get('PAYPAL_RETURN_URL') or 'http://localhost:5000/payment/paypal-return'
     PAYPAL_CANCEL_URL = os.environ.get('PAYPAL_CANCEL_URL') or 'http://localhost:5000/payment/paypal-cancel'
+    
+    # Chỉ mục điểm đến trong bộ nhớ (bỏ dấu tiếng Việt); khớp quá MAX_IDS khách sạn thì lọc bằng ilike
+    DESTINATION_INDEX_ENABLED = os.environ.get('DESTINATION_INDEX_ENABLED', 'True').lower() == 'true'
+    DESTINATION_INDEX_MAX_AGE = int(os.environ.get('DESTINATION_INDEX_MAX_AGE', 300))
+    DESTINATION_INDEX_MAX_IDS = int(os.environ.get('DESTINATION_INDEX_MAX_IDS', 2000))
+    
+    # Chỉ mục gợi ý tìm kiếm (autocomplete), dựng lại bởi luồng nền
+    SUGGESTION_INDEX_ENABLED = os.environ.get('SUGGESTION_INDEX_ENABLED', 'True').lower() == 'true'
+    SUGGESTION_INDEX_REFRESH_INTERVAL = int(os.environ.get('SUGGESTION_INDEX_REFRESH_INTERVAL', 300))
+    SUGGESTION_INDEX_DEBOUNCE = int(os.environ.get('SUGGESTION_INDEX_DEBOUNCE', 2))
+    
+    # Cache kết quả tìm kiếm (LRU + TTL, xóa theo điểm đến khi dữ liệu thay đổi)
+    SEARCH_CACHE_ENABLED = os.environ.get('SEARCH_CACHE_ENABLED', 'True').lower() == 'true'
+    SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 60))
+    SEARCH_CACHE_MAX_SIZE = int(os.environ.get('SEARCH_CACHE_MAX_SIZE', 1000))
+    # Đếm kết quả: chính xác đến ngưỡng này, lớn hơn thì hiển thị "N+"; cache riêng với TTL ngắn
+    SEARCH_COUNT_EXACT_LIMIT = int(os.environ.get('SEARCH_COUNT_EXACT_LIMIT', 1000))
+    SEARCH_COUNT_CACHE_ENABLED = os.environ.get('SEARCH_COUNT_CACHE_ENABLED', 'True').lower() == 'true'
+    SEARCH_COUNT_CACHE_TTL = int(os.environ.get('SEARCH_COUNT_CACHE_TTL', 30))
+    SEARCH_COUNT_CACHE_MAX_SIZE = int(os.environ.get('SEARCH_COUNT_CACHE_MAX_SIZE', 500))
+    # Tìm theo bản đồ: số ô lưới tối đa cho một mệnh đề IN và số marker tối đa mỗi lần trả về
+    GEO_SEARCH_MAX_CELLS = int(os.environ.get('GEO_SEARCH_MAX_CELLS', 400))
+    SEARCH_MAP_MAX_RESULTS = int(os.environ.get('SEARCH_MAP_MAX_RESULTS', 500))
+    # Chỉ mục khuyến mãi trong bộ nhớ: tuổi tối đa (giây) trước khi dựng lại để thấy thay đổi từ process khác
+    PROMOTION_INDEX_MAX_AGE = int(os.environ.get('PROMOTION_INDEX_MAX_AGE', 60))
+    # Ghi lịch sử tìm kiếm theo lô: mỗi N bản ghi hoặc sau T mili giây, hàng đợi có giới hạn
+    SEARCH_HISTORY_BUFFER_ENABLED = os.environ.get('SEARCH_HISTORY_BUFFER_ENABLED', 'True').lower() == 'true'
+    SEARCH_HISTORY_BATCH_SIZE = int(os.environ.get('SEARCH_HISTORY_BATCH_SIZE', 100))
+    SEARCH_HISTORY_FLUSH_INTERVAL_MS = int(os.environ.get('SEARCH_HISTORY_FLUSH_INTERVAL_MS', 1000))
+    SEARCH_HISTORY_QUEUE_SIZE = int(os.environ.get('SEARCH_HISTORY_QUEUE_SIZE', 10000))
+    # Ảnh chụp trang chủ: chu kỳ dựng lại (giây) và thời gian gom thay đổi
+    HOME_SNAPSHOT_ENABLED = os.environ.get('HOME_SNAPSHOT_ENABLED', 'True').lower() == 'true'
+    HOME_SNAPSHOT_REFRESH_INTERVAL = int(os.environ.get('HOME_SNAPSHOT_REFRESH_INTERVAL', 60))
+    HOME_SNAPSHOT_DEBOUNCE = int(os.environ.get('HOME_SNAPSHOT_DEBOUNCE', 2))
+    # Cache đoạn HTML đã render: số đoạn tối đa và TTL (giây) làm giới hạn trên
+    FRAGMENT_CACHE_ENABLED = os.environ.get('FRAGMENT_CACHE_ENABLED', 'True').lower() == 'true'
+    FRAGMENT_CACHE_MAX_SIZE = int(os.environ.get('FRAGMENT_CACHE_MAX_SIZE', 2000))
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 300))
+    # GET có điều kiện (ETag/Last-Modified, trả 304); đổi phiên bản khi định dạng phản hồi/template thay đổi
+    CONDITIONAL_GET_ENABLED = os.environ.get('CONDITIONAL_GET_ENABLED', 'True').lower() == 'true'
+    CONDITIONAL_GET_VERSION = os.environ.get('CONDITIONAL_GET_VERSION', '1')
+    # Giữ chỗ chờ thanh toán online: thời gian giữ (giây), chu kỳ và kích thước lô của luồng dọn hold hết hạn
+    # (luồng dọn mặc định tắt, run.py bật cho process web; khi tắt phải chạy `flask booking-holds sweep`
+    # và `flask idempotency-keys purge` từ cron)
+    BOOKING_HOLD_TTL = int(os.environ.get('BOOKING_HOLD_TTL', 900))
+    BOOKING_HOLD_SWEEP_ENABLED = os.environ.get('BOOKING_HOLD_SWEEP_ENABLED', 'False').lower() == 'true'
+    BOOKING_HOLD_SWEEP_INTERVAL = int(os.environ.get('BOOKING_HOLD_SWEEP_INTERVAL', 60))
+    BOOKING_HOLD_SWEEP_BATCH_SIZE = int(os.environ.get('BOOKING_HOLD_SWEEP_BATCH_SIZE', 200))
+    # Khóa idempotency của request tạo booking: thời gian lưu (giây) và kích thước lô khi xóa khóa hết hạn
+    IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 86400))
+    IDEMPOTENCY_PURGE_BATCH_SIZE = int(os.environ.get('IDEMPOTENCY_PURGE_BATCH_SIZE', 1000))
 config = {
     'development': Config,
     'production': Config,
@@ -0,0 +1,35 @@
+"""Add booking_holds table
+
+Revision ID: add_booking_holds
+Revises: add_room_nights
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_booking_holds'
+down_revision = 'add_room_nights'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('booking_holds',
+    sa.Column('booking_id', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['booking_id'], ['bookings.booking_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('booking_id')
+    )
+    with op.batch_alter_table('booking_holds', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_booking_holds_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('booking_holds', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_booking_holds_expires_at'))
+
+    op.drop_table('booking_holds')
@@ -0,0 +1,26 @@
+"""Add (amenity_id, hotel_id) index to hotel_amenities
+
+Revision ID: add_hotel_amenities_amenity_idx
+Revises: add_hotel_geo_cell
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_hotel_amenities_amenity_idx'
+down_revision = 'add_hotel_geo_cell'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('hotel_amenities', schema=None) as batch_op:
+        batch_op.create_index('ix_hotel_amenities_amenity_hotel', ['amenity_id', 'hotel_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('hotel_amenities', schema=None) as batch_op:
+        batch_op.drop_index('ix_hotel_amenities_amenity_hotel')
@@ -0,0 +1,34 @@
+"""Add geo_cell grid column to hotels
+
+Revision ID: add_hotel_geo_cell
+Revises: add_hotel_stats
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_hotel_geo_cell'
+down_revision = 'add_hotel_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('hotels', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('geo_cell', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_hotels_geo_cell'), ['geo_cell'], unique=False)
+
+    # Backfill theo cùng công thức với app.utils.geo.geo_cell (ô 0.05 độ, 7200 cột)
+    op.execute(sa.text(
+        'UPDATE hotels SET geo_cell = FLOOR((latitude + 90) / 0.05) * 7200 + FLOOR((longitude + 180) / 0.05) '
+        'WHERE latitude IS NOT NULL AND longitude IS NOT NULL'
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('hotels', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_hotels_geo_cell'))
+        batch_op.drop_column('geo_cell')
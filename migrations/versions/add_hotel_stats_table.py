@@ -0,0 +1,53 @@
+"""Add hotel_stats rollup table
+
+Revision ID: add_hotel_stats
+Revises: fa7076c38616
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_hotel_stats'
+down_revision = 'fa7076c38616'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('hotel_stats',
+    sa.Column('hotel_id', sa.Integer(), nullable=False),
+    sa.Column('min_price', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('max_price', sa.Numeric(precision=10, scale=2), nullable=True),
+    sa.Column('room_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('review_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('rating_sum', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('cleanliness_rating_sum', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('cleanliness_rating_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('service_rating_sum', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('service_rating_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('facilities_rating_sum', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('facilities_rating_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('location_rating_sum', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('location_rating_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('has_free_cancellation', sa.Boolean(), nullable=False, server_default=sa.false()),
+    sa.Column('active_promotion_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['hotel_id'], ['hotels.hotel_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('hotel_id')
+    )
+    with op.batch_alter_table('hotel_stats', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_hotel_stats_min_price'), ['min_price'], unique=False)
+        batch_op.create_index(batch_op.f('ix_hotel_stats_has_free_cancellation'), ['has_free_cancellation'], unique=False)
+
+    # Sau khi nâng cấp, chạy `flask hotel-stats rebuild` để backfill dữ liệu
+
+
+def downgrade():
+    with op.batch_alter_table('hotel_stats', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_hotel_stats_has_free_cancellation'))
+        batch_op.drop_index(batch_op.f('ix_hotel_stats_min_price'))
+
+    op.drop_table('hotel_stats')
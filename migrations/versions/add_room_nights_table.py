@@ -0,0 +1,55 @@
+"""Add room_nights ledger table
+
+Revision ID: add_room_nights
+Revises: add_hotel_amenities_amenity_idx
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_room_nights'
+down_revision = 'add_hotel_amenities_amenity_idx'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('room_nights',
+    sa.Column('room_id', sa.Integer(), nullable=False),
+    sa.Column('stay_date', sa.Date(), nullable=False),
+    sa.Column('booking_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['booking_id'], ['bookings.booking_id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['room_id'], ['rooms.room_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('room_id', 'stay_date')
+    )
+    with op.batch_alter_table('room_nights', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_room_nights_booking_id'), ['booking_id'], unique=False)
+        batch_op.create_index('ix_room_nights_date_room', ['stay_date', 'room_id'], unique=False)
+
+    # Backfill từ các booking đang giữ chỗ chưa kết thúc (cùng quy tắc với RoomNightService.rebuild_all):
+    # mỗi phòng của booking chiếm các đêm [check_in, check_out); booking cũ bị đặt trùng thì booking
+    # có id nhỏ hơn giữ đêm. MySQL 8: CTE đệ quy sinh từng đêm của booking
+    op.execute(sa.text(
+        "INSERT INTO room_nights (room_id, stay_date, booking_id) "
+        "WITH RECURSIVE nights (booking_id, room_id, stay_date, check_out_date) AS ("
+        "  SELECT b.booking_id, bd.room_id, b.check_in_date, b.check_out_date"
+        "  FROM bookings b JOIN booking_details bd ON bd.booking_id = b.booking_id"
+        "  WHERE b.status IN ('pending', 'confirmed', 'checked_in')"
+        "    AND b.check_out_date > CURDATE() AND b.check_in_date < b.check_out_date"
+        "  UNION ALL"
+        "  SELECT booking_id, room_id, DATE_ADD(stay_date, INTERVAL 1 DAY), check_out_date"
+        "  FROM nights WHERE DATE_ADD(stay_date, INTERVAL 1 DAY) < check_out_date"
+        ") "
+        "SELECT room_id, stay_date, MIN(booking_id) FROM nights GROUP BY room_id, stay_date"
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('room_nights', schema=None) as batch_op:
+        batch_op.drop_index('ix_room_nights_date_room')
+        batch_op.drop_index(batch_op.f('ix_room_nights_booking_id'))
+
+    op.drop_table('room_nights')
@@ -1,6 +1,11 @@
+import os
+
 from dotenv import load_dotenv
 load_dotenv()
 
+# Process web dọn giữ chỗ hết hạn ở luồng nền (tắt bằng BOOKING_HOLD_SWEEP_ENABLED=False để dùng cron)
+os.environ.setdefault('BOOKING_HOLD_SWEEP_ENABLED', 'True')
+
 from app import create_app
 from config.config import config
 
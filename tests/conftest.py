@@ -0,0 +1,112 @@
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models.booking import Booking
+from app.models.booking_detail import BookingDetail
+from app.models.hotel import Hotel
+from app.models.role import Role
+from app.models.room import Room
+from app.models.room_type import RoomType
+from app.models.user import User
+from app.services.promotion_index import promotion_index
+from config.config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_ECHO = False
+    # Luồng nền tắt trong test: dữ liệu được ghi/đọc đồng bộ trong request
+    SEARCH_HISTORY_BUFFER_ENABLED = False
+    SUGGESTION_INDEX_ENABLED = False
+    HOME_SNAPSHOT_ENABLED = False
+    BOOKING_HOLD_SWEEP_ENABLED = False
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App trên CSDL SQLite dạng file (nhiều luồng dùng chung được), tạo mới cho mỗi test"""
+    config = type('FileDatabaseConfig', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.db"}?timeout=30',
+        'SESSION_FILE_DIR': str(tmp_path / 'sessions')
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        # Chỉ mục khuyến mãi là singleton của process: bỏ dữ liệu của test trước
+        promotion_index.mark_changed()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def owner(app):
+    role = Role(role_name='hotel_owner', description='Hotel owner')
+    db.session.add(role)
+    db.session.flush()
+    user = User(email='owner@example.com', full_name='Owner', role_id=role.role_id)
+    user.set_password('secret')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def room_type(app):
+    room_type = RoomType(type_name='Standard')
+    db.session.add(room_type)
+    db.session.commit()
+    return room_type
+
+
+@pytest.fixture
+def make_hotel(owner, room_type):
+    def make_hotel(num_rooms=1, name='Khách sạn Test'):
+        hotel = Hotel(owner_id=owner.user_id, hotel_name=name, address='1 Trần Phú', city='Đà Nẵng',
+                      status='active')
+        db.session.add(hotel)
+        db.session.flush()
+        for index in range(num_rooms):
+            add_room(hotel, room_type, index)
+        db.session.commit()
+        return hotel
+    return make_hotel
+
+
+def add_room(hotel, room_type, index):
+    room = Room(hotel_id=hotel.hotel_id, room_type_id=room_type.type_id, room_name=f'Phòng {index}',
+                max_guests=2, base_price=500000, weekend_price=700000, status='available')
+    db.session.add(room)
+    db.session.flush()
+    return room
+
+
+def add_booking(user, room, check_in, num_nights=2, status='confirmed'):
+    """Booking một phòng ghi thẳng vào CSDL (không qua controller)"""
+    booking = Booking(
+        booking_code=f'TEST{room.room_id}{check_in:%Y%m%d}{status}',
+        user_id=user.user_id,
+        hotel_id=room.hotel_id,
+        check_in_date=check_in,
+        check_out_date=check_in + timedelta(days=num_nights),
+        num_guests=1,
+        total_amount=500000 * num_nights,
+        final_amount=500000 * num_nights,
+        status=status
+    )
+    db.session.add(booking)
+    db.session.flush()
+    db.session.add(BookingDetail(booking_id=booking.booking_id, room_id=room.room_id, quantity=1,
+                                 price_per_night=500000, num_nights=num_nights, subtotal=500000 * num_nights))
+    db.session.flush()
+    return booking
+
+
+def future(days):
+    return date.today() + timedelta(days=days)
@@ -0,0 +1,73 @@
+from flask import session
+from sqlalchemy import event
+
+from app import db
+from app.controllers.hotel_controller import HotelController
+from app.models.amenity import Amenity
+from app.models.hotel_image import HotelImage
+from app.models.review import Review
+from app.models.room_image import RoomImage
+from tests.conftest import add_booking, add_room, future
+
+
+def count_queries(app, user_id, hotel_id):
+    """Số câu lệnh SQL của một lần gọi get_hotel (không dùng dữ liệu đã nạp trong session)"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.session.expire_all()
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        with app.test_request_context(f'/api/hotels/{hotel_id}'):
+            session['user_id'] = user_id
+            response, status_code = HotelController.get_hotel(hotel_id)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert status_code == 200
+    return len(statements), response.get_json()['data']
+
+
+def add_stays(user, hotel, rooms, first_day, reviewed):
+    """Mỗi phòng một booking đã trả phòng; `reviewed` booking đầu tiên có đánh giá"""
+    for index, room in enumerate(rooms):
+        booking = add_booking(user, room, future(first_day - index * 3), status='checked_out')
+        if index < reviewed:
+            db.session.add(Review(booking_id=booking.booking_id, user_id=user.user_id, hotel_id=hotel.hotel_id,
+                                  rating=4, cleanliness_rating=5, comment='Phòng sạch'))
+    db.session.commit()
+
+
+def test_get_hotel_query_count_is_constant(app, owner, room_type, make_hotel):
+    """Số truy vấn của trang chi tiết khách sạn không tăng theo số phòng, đánh giá, booking"""
+    hotel = make_hotel(num_rooms=3)
+    amenity = Amenity(amenity_name='Wifi', category='both')
+    db.session.add(amenity)
+    hotel.amenities.append(amenity)
+    db.session.add(HotelImage(hotel_id=hotel.hotel_id, image_url='hotel.jpg'))
+
+    def furnish(rooms):
+        for room in rooms:
+            room.amenities.append(amenity)
+            db.session.add(RoomImage(room_id=room.room_id, image_url='room.jpg'))
+        db.session.commit()
+
+    furnish(hotel.rooms)
+    add_stays(owner, hotel, hotel.rooms, first_day=-10, reviewed=2)
+
+    baseline, data = count_queries(app, owner.user_id, hotel.hotel_id)
+    assert len(data['rooms']) == 3
+    assert len(data['reviews']) == 2
+    assert len(data['eligible_bookings']) == 1
+
+    new_rooms = [add_room(hotel, room_type, index) for index in range(3, 9)]
+    furnish(new_rooms)
+    add_stays(owner, hotel, new_rooms, first_day=-40, reviewed=4)
+
+    queries, data = count_queries(app, owner.user_id, hotel.hotel_id)
+    assert len(data['rooms']) == 9
+    assert len(data['reviews']) == 5
+    assert data['hotel']['review_count'] == 6
+    assert len(data['eligible_bookings']) == 3
+    assert queries == baseline
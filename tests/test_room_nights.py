@@ -0,0 +1,61 @@
+import threading
+from datetime import timedelta
+
+from flask import session
+
+from app import db
+from app.controllers.booking_controller import BookingController
+from app.models.booking import Booking
+from app.models.room_night import RoomNight
+from tests.conftest import future
+
+NUM_THREADS = 20
+
+
+def test_concurrent_bookings_claim_room_once(app, owner, make_hotel):
+    """Nhiều request đồng thời đặt cùng một phòng với khoảng ngày giao nhau: chỉ một booking thành công"""
+    hotel = make_hotel(num_rooms=1)
+    room_id = hotel.rooms[0].room_id
+    hotel_id, user_id = hotel.hotel_id, owner.user_id
+    check_in = future(10)
+    db.session.remove()
+
+    barrier = threading.Barrier(NUM_THREADS)
+    results = [None] * NUM_THREADS
+
+    def book(index):
+        # Khoảng ngày xen kẽ [d, d+2) và [d+1, d+3): mọi cặp request đều trùng ít nhất một đêm
+        start = check_in + timedelta(days=index % 2)
+        payload = {
+            'hotel_id': hotel_id,
+            'check_in_date': start.isoformat(),
+            'check_out_date': (start + timedelta(days=2)).isoformat(),
+            'num_guests': 1,
+            'rooms': [{'room_id': room_id, 'quantity': 1}]
+        }
+        with app.app_context(), app.test_request_context('/bookings/create', method='POST', json=payload):
+            session['user_id'] = user_id
+            barrier.wait()
+            try:
+                response, status_code = BookingController.create_booking()
+                results[index] = (status_code, response.get_json())
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=book, args=(index,)) for index in range(NUM_THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    status_codes = [status_code for status_code, _ in results]
+    assert status_codes.count(201) == 1, status_codes
+    assert status_codes.count(409) == NUM_THREADS - 1, status_codes
+
+    winner = next(body for status_code, body in results if status_code == 201)['data']['booking']
+    assert Booking.query.count() == 1
+
+    nights = RoomNight.query.filter_by(room_id=room_id).order_by(RoomNight.stay_date).all()
+    assert {night.booking_id for night in nights} == {winner['booking_id']}
+    assert len(nights) == 2
+    assert nights[0].stay_date.isoformat() == winner['check_in_date']